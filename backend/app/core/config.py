@@ -23,15 +23,130 @@ class Settings(BaseSettings):
     VAPI_PRIVATE_KEY: str = os.getenv("PRIVATE_API_KEY", "")
     VAPI_ASSISTANT_ID: str = os.getenv("VAPI_ASSISTANT_ID", "")
     VAPI_BASE_URL: str = os.getenv("VAPI_BASE_URL", "https://api.vapi.ai")
+    # How long a learned working endpoint variant (e.g. /call/{id} vs /v1/call/{id}) is trusted (seconds)
+    VAPI_ENDPOINT_CACHE_TTL: float = float(os.getenv("VAPI_ENDPOINT_CACHE_TTL", "3600"))
     
     # Google Gemini API Configuration (for text chat - FREE)
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
+    # How often the model registry re-lists available Gemini models (seconds)
+    GEMINI_MODEL_REFRESH_SECONDS: int = int(os.getenv("GEMINI_MODEL_REFRESH_SECONDS", "3600"))
+    # Concurrent Gemini calls, calls allowed to wait for a slot, and how long they may wait (seconds)
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    GEMINI_MAX_QUEUE: int = int(os.getenv("GEMINI_MAX_QUEUE", "32"))
+    GEMINI_QUEUE_TIMEOUT: float = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "10"))
+    # Model routing: EWMA smoothing, cooldown for failing models (doubles per trip, up to the max),
+    # what trips it, share of traffic probing other models, and models tried per request
+    MODEL_ROUTER_EWMA_ALPHA: float = float(os.getenv("MODEL_ROUTER_EWMA_ALPHA", "0.2"))
+    MODEL_ROUTER_COOLDOWN_SECONDS: float = float(os.getenv("MODEL_ROUTER_COOLDOWN_SECONDS", "30"))
+    MODEL_ROUTER_MAX_COOLDOWN_SECONDS: float = float(os.getenv("MODEL_ROUTER_MAX_COOLDOWN_SECONDS", "600"))
+    MODEL_ROUTER_FAILURE_THRESHOLD: int = int(os.getenv("MODEL_ROUTER_FAILURE_THRESHOLD", "3"))
+    MODEL_ROUTER_MAX_ERROR_RATE: float = float(os.getenv("MODEL_ROUTER_MAX_ERROR_RATE", "0.5"))
+    MODEL_ROUTER_EXPLORE_RATE: float = float(os.getenv("MODEL_ROUTER_EXPLORE_RATE", "0.05"))
+    MODEL_ROUTER_MAX_ATTEMPTS: int = int(os.getenv("MODEL_ROUTER_MAX_ATTEMPTS", "2"))
+    # Hedged generation (opt-in): a backup call is sent once the primary outlasts this percentile
+    # of recent latencies, for at most GEMINI_HEDGE_BUDGET of requests (0.05 = 5%)
+    GEMINI_HEDGE_ENABLED: bool = os.getenv("GEMINI_HEDGE_ENABLED", "false").lower() == "true"
+    GEMINI_HEDGE_PERCENTILE: float = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "95"))
+    GEMINI_HEDGE_BUDGET: float = float(os.getenv("GEMINI_HEDGE_BUDGET", "0.05"))
+    GEMINI_HEDGE_MIN_DELAY_MS: float = float(os.getenv("GEMINI_HEDGE_MIN_DELAY_MS", "100"))
+    # Client-side Gemini quota (opt-in; 0 = unlimited): requests and (estimated) tokens per minute, shared by all models
+    # and callers, and how long interactive chat and background work (summaries, compaction) may queue for it (seconds)
+    GEMINI_RPM: float = float(os.getenv("GEMINI_RPM", "0"))
+    GEMINI_TPM: float = float(os.getenv("GEMINI_TPM", "0"))
+    GEMINI_INTERACTIVE_DEADLINE: float = float(os.getenv("GEMINI_INTERACTIVE_DEADLINE", "10"))
+    GEMINI_BACKGROUND_DEADLINE: float = float(os.getenv("GEMINI_BACKGROUND_DEADLINE", "300"))
     
+    # Response cache ("memory" or "none"); only prompts at or below the max temperature are cached by default
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL", "600"))
+    RESPONSE_CACHE_MAX_TEMPERATURE: float = float(os.getenv("RESPONSE_CACHE_MAX_TEMPERATURE", "0.3"))
+    
+    # Background memory summarization (async save mode)
+    SUMMARY_WORKERS: int = int(os.getenv("SUMMARY_WORKERS", "2"))
+    SUMMARY_POLL_INTERVAL: float = float(os.getenv("SUMMARY_POLL_INTERVAL", "5"))
+    SUMMARY_MAX_ATTEMPTS: int = int(os.getenv("SUMMARY_MAX_ATTEMPTS", "3"))
+    # A failed job waits base * 2^(attempts - 1) seconds, capped at max, before it is claimed again
+    SUMMARY_RETRY_BASE_DELAY: float = float(os.getenv("SUMMARY_RETRY_BASE_DELAY", "30"))
+    SUMMARY_RETRY_MAX_DELAY: float = float(os.getenv("SUMMARY_RETRY_MAX_DELAY", "1800"))
+    # Long transcripts are split into chunks of this many (estimated) tokens and summarized in parallel
+    SUMMARY_CHUNK_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+    SUMMARY_MAP_CONCURRENCY: int = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+    # In auto summary mode, fall back to the local extractive summary after this many seconds
+    SUMMARY_LLM_BUDGET_SECONDS: float = float(os.getenv("SUMMARY_LLM_BUDGET_SECONDS", "8"))
+    
+    # Semantic memory index: embedder ("hashing"), vector size, and where the memory-mapped files live
+    EMBEDDER: str = os.getenv("EMBEDDER", "hashing")
+    EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", "256"))
+    VECTOR_INDEX_DIR: str = os.getenv("VECTOR_INDEX_DIR", "./vector_index")
+    # Changes are written to disk in a worker thread this long after the first one, batching bursts of saves
+    VECTOR_INDEX_FLUSH_MS: int = int(os.getenv("VECTOR_INDEX_FLUSH_MS", "1000"))
+    
+    # Memory-augmented chat: summaries retrieved per message, their token budget, and cached contexts
+    CHAT_MEMORY_TOP_K: int = int(os.getenv("CHAT_MEMORY_TOP_K", "5"))
+    CHAT_MEMORY_TOKEN_BUDGET: int = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "400"))
+    CHAT_MEMORY_RECENT: int = int(os.getenv("CHAT_MEMORY_RECENT", "2"))
+    CHAT_CONTEXT_CACHE_SIZE: int = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", "1024"))
+    
+    # Chat sessions: stored sessions (LRU), idle expiry (seconds), and history compaction
+    CHAT_SESSION_MAX: int = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+    CHAT_SESSION_TTL: float = float(os.getenv("CHAT_SESSION_TTL", "1800"))
+    # Older turns are folded into a rolling summary once history exceeds this many (estimated) tokens
+    CHAT_HISTORY_MAX_TOKENS: int = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "1200"))
+    # Most recent user/assistant messages always kept verbatim
+    CHAT_HISTORY_KEEP_TURNS: int = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "4"))
+    
+    # Chat WebSocket: frames buffered per connection, and how long a client may go without reading (seconds)
+    CHAT_WS_SEND_QUEUE: int = int(os.getenv("CHAT_WS_SEND_QUEUE", "64"))
+    CHAT_WS_SEND_TIMEOUT: float = float(os.getenv("CHAT_WS_SEND_TIMEOUT", "15"))
+    
+    # Chat history persistence: buffered messages are written in one transaction per batch,
+    # at most every CHAT_HISTORY_FLUSH_MS; beyond CHAT_HISTORY_BUFFER_MAX unwritten messages, new ones are dropped
+    CHAT_HISTORY_BATCH_SIZE: int = int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "200"))
+    CHAT_HISTORY_FLUSH_MS: int = int(os.getenv("CHAT_HISTORY_FLUSH_MS", "500"))
+    CHAT_HISTORY_BUFFER_MAX: int = int(os.getenv("CHAT_HISTORY_BUFFER_MAX", "10000"))
+    
+    # Database (any SQLAlchemy URL; the async driver is picked from the dialect)
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./digital_twin.db")
+    # Connection pool for server databases (Postgres, MySQL); ignored for SQLite
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # SQLite pragmas applied to every new connection
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
     # Frontend Configuration
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
     
     # API Configuration
     API_TIMEOUT: int = int(os.getenv("API_TIMEOUT", "30"))
+    # Request deadlines (seconds): default budget for a whole request including every upstream attempt,
+    # the most a client may ask for with X-Request-Timeout, and budgets for voice stop/status and memory saves
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+    REQUEST_DEADLINE_MAX: float = float(os.getenv("REQUEST_DEADLINE_MAX", "120"))
+    VOICE_REQUEST_DEADLINE: float = float(os.getenv("VOICE_REQUEST_DEADLINE", "10"))
+    MEMORY_SAVE_DEADLINE: float = float(os.getenv("MEMORY_SAVE_DEADLINE", "60"))
+    # Upstream resilience: tries for idempotent calls and their jittered backoff (seconds), and per-upstream
+    # circuit breakers - failures in a row that open one, seconds until a half-open probe, probes allowed
+    UPSTREAM_RETRY_ATTEMPTS: int = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "3"))
+    UPSTREAM_RETRY_BASE_DELAY: float = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.2"))
+    UPSTREAM_RETRY_MAX_DELAY: float = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "2"))
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    CIRCUIT_HALF_OPEN_PROBES: int = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+    
+    # Pooled HTTP clients for upstream APIs: connection limit, idle connections kept alive and for how
+    # long (seconds), and HTTP/2 (needs the h2 package)
+    HTTP_POOL_MAX_CONNECTIONS: int = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+    HTTP_POOL_MAX_KEEPALIVE: int = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", "60"))
+    HTTP_POOL_HTTP2: bool = os.getenv("HTTP_POOL_HTTP2", "false").lower() == "true"
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,161 @@
+"""
+Per-request deadline budgets propagated to upstream calls
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional, TypeVar
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Clients may shorten (never extend past REQUEST_DEADLINE_MAX) their budget with this header, in seconds
+DEADLINE_HEADER = "x-request-timeout"
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request's time budget ran out; stage names the step that was running"""
+
+    def __init__(self, stage: str, budget: Optional[float] = None):
+        self.stage = stage
+        self.budget = budget
+        budget_text = f" of {budget:g}s" if budget is not None else ""
+        super().__init__(f"Request deadline{budget_text} ran out during {stage}")
+
+
+class Deadline:
+    """An absolute point in time a request must finish by"""
+
+    def __init__(self, budget: float, from_client: bool = False):
+        self.budget = budget
+        self.from_client = from_client
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget (None when there is no deadline)"""
+    deadline = _current.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def check(stage: str) -> None:
+    """Raise DeadlineExceeded if the budget is already spent"""
+    deadline = _current.get()
+    if deadline is not None and deadline.remaining() <= 0:
+        raise DeadlineExceeded(stage, deadline.budget)
+
+
+def upstream_timeout(default: float, stage: str) -> float:
+    """Timeout for one upstream attempt: its usual timeout, cut to what is left of the budget"""
+    check(stage)
+    left = remaining()
+    return default if left is None else min(default, left)
+
+
+async def run_within(awaitable: Awaitable[T], stage: str) -> T:
+    """
+    Await with whatever is left of the request budget, cancelling the work
+    and raising DeadlineExceeded(stage) when it runs out.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return await awaitable
+    left = deadline.remaining()
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(stage, deadline.budget)
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except DeadlineExceeded:
+        # A nested stage ran out first - keep its name
+        raise
+    except asyncio.TimeoutError:
+        if deadline.remaining() <= 0:
+            raise DeadlineExceeded(stage, deadline.budget) from None
+        raise
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float], from_client: bool = False) -> Iterator[Optional[Deadline]]:
+    """Run the enclosed code under a fresh budget (None: no deadline at all)"""
+    deadline = Deadline(seconds, from_client) if seconds is not None else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def request_budget(seconds: float):
+    """
+    Route dependency giving an endpoint its own budget instead of the
+    default; a budget the client asked for with X-Request-Timeout still wins
+    if it is shorter.
+    """
+    async def apply_budget() -> None:
+        deadline = _current.get()
+        if deadline is not None and deadline.from_client and deadline.remaining() <= seconds:
+            return
+        # Set in the dependency's context, which the endpoint runs in
+        _current.set(Deadline(seconds))
+    return apply_budget
+
+
+def _client_budget(raw: Optional[str]) -> Optional[float]:
+    if not raw:
+        return None
+    try:
+        seconds = float(raw)
+    except ValueError:
+        return None
+    return min(seconds, settings.REQUEST_DEADLINE_MAX) if seconds > 0 else None
+
+
+class DeadlineMiddleware:
+    """Starts every HTTP request's budget: X-Request-Timeout if sent, else REQUEST_DEADLINE_SECONDS"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        client_budget = _client_budget(headers.get(DEADLINE_HEADER.encode(), b"").decode("latin-1"))
+        budget = client_budget or settings.REQUEST_DEADLINE_SECONDS
+        with request_deadline(budget, from_client=client_budget is not None):
+            await self.app(scope, receive, send)
+
+
+async def _deadline_exceeded_handler(request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    logger.warning(f"{request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=504,
+        content={"detail": str(exc), "stage": exc.stage, "budget_seconds": exc.budget}
+    )
+
+
+def setup_deadlines(app: FastAPI) -> None:
+    """Install the request deadline middleware and its 504 response"""
+    app.add_middleware(DeadlineMiddleware)
+    app.add_exception_handler(DeadlineExceeded, _deadline_exceeded_handler)
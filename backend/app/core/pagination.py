@@ -0,0 +1,26 @@
+"""
+Opaque keyset cursors for paginated listings
+"""
+from typing import Any, Callable, Tuple
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*position: Any) -> str:
+    """Opaque keyset cursor for a sort position, e.g. (created_at, id)"""
+    raw = json.dumps(position)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> Tuple[Any, ...]:
+    """Decode a cursor from encode_cursor, converting each value with the matching type"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(types):
+            raise ValueError("cursor length mismatch")
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
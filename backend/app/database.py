@@ -1,31 +1,108 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
+from typing import Any, AsyncIterator, Dict
+import logging
 
-# SQLite database file path
-DATABASE_URL = "sqlite:///./digital_twin.db"
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Database URL (SQLite file by default, see Settings.DATABASE_URL)
+DATABASE_URL = settings.DATABASE_URL
+
+# Async driver for each database dialect (install asyncpg to use Postgres)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap a database URL's driver for its async equivalent"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(dialect, scheme)}://{rest}"
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """Pragmas for the SQLite production profile, in the order they are applied"""
+    return {
+        # busy_timeout first so the journal_mode switch waits out other writers
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        # WAL lets readers run while a webhook or worker is writing
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        # NORMAL is durable in WAL mode except on power loss, and avoids an fsync per commit
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+    }
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """create_engine keyword arguments for the configured backend"""
+    if is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}  # Needed for SQLite
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Needed for SQLite
-)
 
-# Create session factory
+def _configure(sync_engine: Engine) -> None:
+    if is_sqlite(str(sync_engine.url)):
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+# Create SQLAlchemy engine (sync - used for startup schema work and scripts)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+_configure(engine)
+
+# Create session factory (sync)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory - used by all request handlers and workers
+async_engine = create_async_engine(to_async_url(DATABASE_URL), **engine_options(DATABASE_URL))
+_configure(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False  # Objects stay readable after commit without a lazy reload
+)
+
 # Base class for models
 Base = declarative_base()
 
 
 def get_db():
     """
-    Dependency function to get database session.
+    Dependency function to get a sync database session.
     Yields a database session and closes it after use.
+    Prefer get_async_db in request handlers - sync queries block the event loop.
     """
     db = SessionLocal()
     try:
@@ -34,10 +111,61 @@ def get_db():
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """
+    Dependency function to get an async database session.
+    Yields an AsyncSession and closes it after use.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """
-    Initialize database - create all tables.
+    Initialize database - apply pending schema migrations.
     Call this on application startup.
     """
-    Base.metadata.create_all(bind=engine)
+    from app.migrations import run_migrations
+
+    run_migrations(engine)
+
+
+def get_db_profile() -> Dict[str, Any]:
+    """Active database backend and tuning, as read back from a live connection"""
+    url = make_url(DATABASE_URL)
+    profile: Dict[str, Any] = {
+        "url": url.render_as_string(hide_password=True),
+        "dialect": url.get_backend_name(),
+        "async_driver": async_engine.url.drivername,
+    }
+    if is_sqlite(DATABASE_URL):
+        with engine.connect() as conn:
+            profile["pragmas"] = {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in sqlite_pragmas()
+            }
+    else:
+        profile["pool"] = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        }
+    return profile
+
+
+def log_db_profile() -> None:
+    """Log the active database profile once at startup"""
+    profile = get_db_profile()
+    details = profile.get("pragmas") or profile.get("pool")
+    logger.info(
+        f"Database: {profile['url']} (async driver {profile['async_driver']}) - "
+        + ", ".join(f"{k}={v}" for k, v in details.items())
+    )
+
 
+async def dispose_engines():
+    """Close pooled connections on shutdown"""
+    await async_engine.dispose()
+    engine.dispose()
@@ -4,10 +4,18 @@ FastAPI main application entry point
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.engine import make_url
 
 from app.core.cors import setup_cors
+from app.core.deadline import setup_deadlines
 from app.routes import health, chat, voice, clone, webhook, memory, users
-from app.database import init_db
+from app.database import DATABASE_URL, dispose_engines, init_db, log_db_profile
+from app.services.chat_history import chat_history_writer
+from app.services.gemini_executor import gemini_executor
+from app.services.http_clients import http_clients
+from app.services.model_registry import model_registry
+from app.services.summary_worker import summary_worker_pool
+from app.services.vector_index import memory_index
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +31,8 @@ app = FastAPI(
 
 # Setup CORS
 setup_cors(app)
+# Per-request deadline budgets (504 when one runs out)
+setup_deadlines(app)
 
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["Health"])
@@ -38,12 +48,36 @@ app.include_router(users.router, prefix="/api/users", tags=["Users"])
 async def startup_event():
     # Initialize database - create tables if they don't exist
     init_db()
+    log_db_profile()
+    # Discover Gemini models once; refreshed in the background afterwards
+    await model_registry.start()
+    # Map the semantic index and embed memories saved while it was closed
+    await memory_index.start()
+    # Resume any summary jobs left pending from a previous run
+    await summary_worker_pool.start()
+    # Batch chat message writes in the background
+    await chat_history_writer.start()
+    # Open the shared Vapi client up front so the first voice call reuses its pool
+    http_clients.get("vapi")
     print("🚀 Vapi backend ready")
     print("📡 API endpoints available at /api")
-    print("🗄️  Database initialized: digital_twin.db")
+    print(f"🗄️  Database initialized: {make_url(DATABASE_URL).render_as_string(hide_password=True)}")
     print("🔗 Webhook endpoint: POST /vapi/webhook")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await summary_worker_pool.stop()
+    # Write buffered chat messages before the engines are disposed
+    await chat_history_writer.stop()
+    memory_index.close()
+    await model_registry.stop()
+    gemini_executor.shutdown()
+    # Close pooled upstream connections
+    await http_clients.close()
+    await dispose_engines()
+
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,179 @@
+"""
+Versioned schema migrations
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Set, Union
+import logging
+
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, Text, insert, select
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql import func
+
+logger = logging.getLogger(__name__)
+
+# Applied versions are recorded here
+_migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+# Tables exactly as each migration created them. Frozen: a later schema change
+# is a new migration, never an edit here or a create_all from app.models.
+_frozen_metadata = MetaData()
+_users_v1 = Table(
+    "users",
+    _frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("email", String(255), unique=True, nullable=False, index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+_memories_v1 = Table(
+    "memories",
+    _frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("assistant_id", String(100), nullable=False, index=True),
+    Column("transcript", Text, nullable=False),
+    Column("summary", Text, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+_chat_messages_v4 = Table(
+    "chat_messages",
+    _frozen_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=True),
+    Column("session_id", String(32), nullable=True),
+    Column("role", String(20), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("model", String(100), nullable=True),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+Index("ix_chat_messages_user", _chat_messages_v4.c.user_id, _chat_messages_v4.c.id.desc())
+Index("ix_chat_messages_session", _chat_messages_v4.c.session_id, _chat_messages_v4.c.id.desc())
+_summary_jobs_v5 = Table(
+    "summary_jobs",
+    _frozen_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("memory_id", Integer, ForeignKey("memories.id"), nullable=False, unique=True, index=True),
+    Column("status", String(20), nullable=False, index=True),
+    Column("attempts", Integer, nullable=False),
+    Column("error", Text, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    One schema change. upgrade is a list of SQL statements or a callable
+    taking the open Connection; either runs inside the migration's transaction.
+    """
+    version: int
+    description: str
+    upgrade: Union[List[str], Callable[[Connection], None]]
+
+
+def _create_base_schema(conn: Connection) -> None:
+    # users and memories as they shipped before migrations; checkfirst keeps this a no-op on existing databases
+    for table in (_users_v1, _memories_v1):
+        table.create(bind=conn, checkfirst=True)
+
+
+def _create_memory_search_index(conn: Connection) -> None:
+    # External-content FTS5 index over memories; triggers keep it in step with writes
+    if conn.dialect.name != "sqlite":
+        logger.warning("Skipping memories_fts: full-text search needs SQLite FTS5")
+        return
+    for statement in (
+        """CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+            summary, transcript,
+            content='memories', content_rowid='id',
+            tokenize='porter unicode61'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS memories_fts_insert AFTER INSERT ON memories BEGIN
+            INSERT INTO memories_fts(rowid, summary, transcript) VALUES (new.id, new.summary, new.transcript);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memories_fts_delete AFTER DELETE ON memories BEGIN
+            INSERT INTO memories_fts(memories_fts, rowid, summary, transcript)
+            VALUES ('delete', old.id, old.summary, old.transcript);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memories_fts_update AFTER UPDATE OF summary, transcript ON memories BEGIN
+            INSERT INTO memories_fts(memories_fts, rowid, summary, transcript)
+            VALUES ('delete', old.id, old.summary, old.transcript);
+            INSERT INTO memories_fts(rowid, summary, transcript) VALUES (new.id, new.summary, new.transcript);
+        END""",
+        # Index memories saved before this migration
+        "INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')",
+    ):
+        conn.exec_driver_sql(statement)
+
+
+def _create_chat_messages(conn: Connection) -> None:
+    # Creates the table with its indexes; a no-op on databases where an older migration 1 built it from the models
+    _chat_messages_v4.create(bind=conn, checkfirst=True)
+
+
+def _create_summary_jobs(conn: Connection) -> None:
+    # Databases from before migrations, or whose migration 1 ran create_all, already have it
+    _summary_jobs_v5.create(bind=conn, checkfirst=True)
+
+
+def _add_summary_job_backoff(conn: Connection) -> None:
+    column = CreateColumn(Column("next_attempt_at", DateTime(timezone=True), nullable=True))
+    conn.exec_driver_sql(f"ALTER TABLE summary_jobs ADD COLUMN {column.compile(dialect=conn.dialect)}")
+
+
+# Append new migrations to the end; never edit one that has shipped
+MIGRATIONS: List[Migration] = [
+    Migration(1, "base schema", _create_base_schema),
+    Migration(2, "composite indexes for memory list and webhook lookups", [
+        # GET /api/memory/{user_id}: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS ix_memories_user_created ON memories (user_id, created_at DESC, id DESC)",
+        # Webhook: WHERE user_id = ? AND assistant_id = ? ORDER BY id DESC
+        "CREATE INDEX IF NOT EXISTS ix_memories_user_assistant ON memories (user_id, assistant_id, id)",
+        # Both composites lead with user_id, so the single-column index is redundant write cost
+        "DROP INDEX IF EXISTS ix_memories_user_id",
+    ]),
+    Migration(3, "full-text search index over memory summaries and transcripts", _create_memory_search_index),
+    Migration(4, "chat message history", _create_chat_messages),
+    Migration(5, "summary job queue", _create_summary_jobs),
+    Migration(6, "retry backoff for failed summary jobs", _add_summary_job_backoff),
+]
+
+
+def applied_versions(engine: Engine) -> Set[int]:
+    """Versions already recorded in schema_migrations"""
+    _migration_metadata.create_all(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied"""
+    done = applied_versions(engine)
+    applied: List[int] = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            if callable(migration.upgrade):
+                migration.upgrade(conn)
+            else:
+                for statement in migration.upgrade:
+                    conn.exec_driver_sql(statement)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.version,
+                description=migration.description
+            ))
+        logger.info(f"Applied migration {migration.version}: {migration.description}")
+        applied.append(migration.version)
+    return applied
@@ -1,7 +1,7 @@
 """
 Database models for storing conversation memories and summaries
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -34,7 +34,7 @@ class Memory(Base):
     __tablename__ = "memories"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Leading column of both composite indexes
     assistant_id = Column(String(100), nullable=False, index=True)  # Vapi assistant ID
     transcript = Column(Text, nullable=False)  # Full conversation transcript
     summary = Column(Text, nullable=False)  # AI-generated summary
@@ -42,7 +42,66 @@ class Memory(Base):
     
     # Relationships
     user = relationship("User", back_populates="memories")
+    summary_job = relationship("SummaryJob", back_populates="memory", uselist=False, cascade="all, delete-orphan")
+    
+    # Composite indexes matching the hot queries (see migration 2 in app/migrations.py)
+    __table_args__ = (
+        Index("ix_memories_user_created", user_id, created_at.desc(), id.desc()),
+        Index("ix_memories_user_assistant", user_id, assistant_id, id),
+    )
     
     def __repr__(self):
         return f"<Memory(id={self.id}, user_id={self.user_id}, assistant_id={self.assistant_id})>"
 
+
+class SummaryJob(Base):
+    """
+    Queued background summarization for a memory saved in async mode.
+    Kept in the database so pending jobs survive a restart.
+    Status moves pending -> running -> done, or back to pending for a retry
+    (not claimed again before next_attempt_at), or to failed once max
+    attempts are used.
+    """
+    __tablename__ = "summary_jobs"  # Created by migration 5 in app/migrations.py
+    
+    id = Column(Integer, primary_key=True, index=True)
+    memory_id = Column(Integer, ForeignKey("memories.id"), nullable=False, unique=True, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)  # Last failure message
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)  # Retry backoff after a failure (migration 6)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # Relationships
+    memory = relationship("Memory", back_populates="summary_job")
+    
+    def __repr__(self):
+        return f"<SummaryJob(id={self.id}, memory_id={self.memory_id}, status={self.status})>"
+
+
+
+class ChatMessage(Base):
+    """
+    One text chat message (user or assistant), written in batches by the
+    chat history writer so storing it never delays the chat response.
+    """
+    __tablename__ = "chat_messages"
+    
+    id = Column(Integer, primary_key=True)
+    # Not a foreign key: writes land after the response, possibly after the user is gone
+    user_id = Column(Integer, nullable=True)
+    session_id = Column(String(32), nullable=True)  # Chat session, if the message came through one
+    role = Column(String(20), nullable=False)  # user or assistant
+    content = Column(Text, nullable=False)
+    model = Column(String(100), nullable=True)  # Model that produced an assistant message
+    created_at = Column(DateTime(timezone=True), nullable=False)  # When the message was sent, not when it was written
+    
+    # Newest-first history listings (see migration 4 in app/migrations.py)
+    __table_args__ = (
+        Index("ix_chat_messages_user", user_id, id.desc()),
+        Index("ix_chat_messages_session", session_id, id.desc()),
+    )
+    
+    def __repr__(self):
+        return f"<ChatMessage(id={self.id}, user_id={self.user_id}, role={self.role})>"
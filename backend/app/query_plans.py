@@ -0,0 +1,99 @@
+"""
+Query-plan check for the hot database queries (SQLite)
+
+Run from the backend directory:
+    python -m app.query_plans              # fresh in-memory database, migrated
+    python -m app.query_plans --database sqlite:///./digital_twin.db
+
+Exits non-zero if any hot query does a full table/index scan or sorts
+through a temporary B-tree, i.e. if an index stopped matching its query.
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import String, and_, create_engine, desc, literal, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import defer
+from sqlalchemy.sql import Select
+
+from app.migrations import run_migrations
+from app.models import ChatMessage, Memory, SummaryJob
+from app.services.summary_worker import next_job_query
+
+
+def hot_queries() -> Dict[str, Select]:
+    """The statements the routes and workers issue most, with representative values"""
+    cursor_created_at = literal("2024-01-01 00:00:00", String)
+    return {
+        "memory list": select(Memory)
+            .options(defer(Memory.transcript))
+            .where(Memory.user_id == 1)
+            .order_by(desc(Memory.created_at), desc(Memory.id))
+            .limit(101),
+        "memory list after cursor": select(Memory)
+            .where(Memory.user_id == 1)
+            .where(or_(
+                Memory.created_at < cursor_created_at,
+                and_(Memory.created_at == cursor_created_at, Memory.id < 100)
+            ))
+            .order_by(desc(Memory.created_at), desc(Memory.id))
+            .limit(101),
+        "webhook latest memory": select(Memory)
+            .where(Memory.user_id == 1, Memory.assistant_id == "unknown")
+            .order_by(Memory.id.desc())
+            .limit(1),
+        # Built by the worker itself so the check cannot drift from the real query
+        "summary job claim": next_job_query(datetime(2024, 1, 1, tzinfo=timezone.utc)),
+        "summary job lookup": select(SummaryJob, Memory.summary)
+            .join(Memory, Memory.id == SummaryJob.memory_id)
+            .where(SummaryJob.memory_id == 1),
+        "chat history by user": select(ChatMessage)
+            .where(ChatMessage.user_id == 1, ChatMessage.id < 1000)
+            .order_by(desc(ChatMessage.id))
+            .limit(51),
+        "chat history by session": select(ChatMessage)
+            .where(ChatMessage.session_id == "0" * 32)
+            .order_by(desc(ChatMessage.id))
+            .limit(51),
+    }
+
+
+def _is_bad_step(detail: str) -> bool:
+    # SEARCH uses an index seek; SCAN walks a whole table or index
+    return detail.startswith("SCAN") or "USE TEMP B-TREE" in detail
+
+
+def check_query_plans(engine: Engine) -> List[Tuple[str, str, List[str]]]:
+    """EXPLAIN QUERY PLAN every hot query; returns (name, sql, bad steps) for the failures"""
+    failures = []
+    with engine.connect() as conn:
+        for name, statement in hot_queries().items():
+            sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+            bad = [step for step in plan if _is_bad_step(step)]
+            if bad:
+                failures.append((name, sql, bad))
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", default="sqlite://", help="SQLite URL to check (default: fresh in-memory DB)")
+    args = parser.parse_args()
+
+    if not args.database.startswith("sqlite"):
+        parser.error("query-plan check only supports SQLite")
+    engine = create_engine(args.database)
+    run_migrations(engine)
+
+    failures = check_query_plans(engine)
+    for name, sql, bad in failures:
+        print(f"FAIL {name}: {'; '.join(bad)}\n  {' '.join(sql.split())}")
+    print(f"{len(hot_queries()) - len(failures)}/{len(hot_queries())} hot queries use index seeks")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,44 @@
 """
 Text chat endpoints
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, WebSocket
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+import json
+import logging
 import time
 
-from app.schemas.chat import ChatRequest, ChatResponse
+from app.core.pagination import decode_cursor, encode_cursor
+from app.database import get_async_db
+from app.models import ChatMessage
+from app.schemas.chat import (
+    ChatHistoryMessage,
+    ChatHistoryResponse,
+    ChatRequest,
+    ChatResponse,
+    ChatSessionCreateRequest,
+    ChatSessionResponse,
+    ChatTurnRequest,
+    ChatTurnResponse
+)
+from app.services.chat_history import chat_history_writer
+from app.services.chat_sessions import ChatSession, chat_session_store
+from app.services.chat_socket import chat_socket_manager
+from app.core.deadline import DeadlineExceeded
+from app.services.gemini_executor import ExecutorSaturatedError
+from app.services.memory_context import memory_context
 from app.services.openai_client import openai_client
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 @router.post("/text", response_model=ChatResponse)
@@ -17,21 +47,39 @@ async def send_text_message(request: ChatRequest):
     start_time = time.time()
     
     try:
+        context = await memory_context.build_for_chat(request.user_id, request.message)
+        
         # Use OpenAI API for text chat (Vapi focuses on voice)
         response = await openai_client.send_message(
             message=request.message,
             language=request.language,
-            model=request.model
+            model=request.model,
+            use_cache=request.use_cache,
+            context=context["text"]
         )
         
+        reply = response.get("response", response.get("message", "No response available"))
+        if not response.get("error"):
+            chat_history_writer.record_exchange(
+                request.message, reply, user_id=request.user_id, model=response.get("model")
+            )
+        
         latency_ms = (time.time() - start_time) * 1000
         
         return ChatResponse(
-            response=response.get("response", response.get("message", "No response available")),
+            response=reply,
             latency_ms=round(latency_ms, 2),
             model_used=response.get("model", request.model),
-            language=response.get("language", request.language)
+            language=response.get("language", request.language),
+            cached=response.get("cached", False),
+            memories_used=context["memory_ids"]
         )
+    except ExecutorSaturatedError as e:
+        # Gemini pool is full - tell the client to back off rather than hang
+        raise HTTPException(status_code=503, detail=str(e))
+    except DeadlineExceeded:
+        # Answered with a 504 naming the stage that ran out of time
+        raise
     except Exception as e:
         # Even if there's an error, provide a helpful response
         latency_ms = (time.time() - start_time) * 1000
@@ -44,6 +92,307 @@ async def send_text_message(request: ChatRequest):
         )
 
 
+@router.post("/text/stream")
+async def stream_text_message(request: ChatRequest):
+    """
+    Send a text message and stream the AI response as Server-Sent Events.
+    
+    Events:
+    - token: {"text": "..."} for each chunk as Gemini produces it
+    - error: {"detail": "...", "status"?: 503 | 504, "stage"?} if generation fails, Gemini is saturated or the deadline runs out
+    - done: {"ttft_ms", "latency_ms", "model_used", "language", "memories_used"} once at the end
+    """
+    start_time = time.time()
+    
+    async def event_stream():
+        ttft_ms = None
+        chunks = []
+        # Filled in by stream_message with the model that actually answered
+        served = {"model": request.model}
+        context = await memory_context.build_for_chat(request.user_id, request.message)
+        try:
+            async for text in openai_client.stream_message(
+                message=request.message,
+                language=request.language,
+                model=request.model,
+                context=context["text"],
+                served=served
+            ):
+                if ttft_ms is None:
+                    ttft_ms = (time.time() - start_time) * 1000
+                chunks.append(text)
+                yield _sse_event("token", {"text": text})
+            chat_history_writer.record_exchange(
+                request.message, "".join(chunks), user_id=request.user_id, model=served["model"]
+            )
+        except ExecutorSaturatedError as e:
+            yield _sse_event("error", {"detail": str(e), "status": 503})
+        except DeadlineExceeded as e:
+            yield _sse_event("error", {"detail": str(e), "status": 504, "stage": e.stage})
+        except Exception as e:
+            logger.error(f"Error streaming Gemini response: {e}")
+            yield _sse_event("error", {"detail": str(e)})
+        
+        latency_ms = (time.time() - start_time) * 1000
+        yield _sse_event("done", {
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "latency_ms": round(latency_ms, 2),
+            "model_used": served["model"],
+            "language": request.language or "en",
+            "memories_used": context["memory_ids"]
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so tokens flush immediately
+        }
+    )
+
+
+@router.websocket("/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    session_id: Optional[str] = None,
+    user_id: Optional[int] = None,
+    language: Optional[str] = None,
+    model: Optional[str] = None
+):
+    """
+    Chat over one WebSocket per conversation, with replies streamed as frames.
+    
+    The connection is bound to a chat session (pass ?session_id= to resume
+    one, otherwise a new one is started with user_id/language/model), so
+    history is kept server-side like POST /sessions/{session_id}/messages.
+    
+    Client frames:
+    - {"type": "message", "message": "...", "id"?: "..."} - a new message cancels the reply in progress
+    - {"type": "cancel"} - stop the reply in progress
+    
+    Server frames:
+    - session: {"session_id", "turn_count"} once on connect
+    - token: {"id", "text"} for each chunk as Gemini produces it
+    - done: {"id", "ttft_ms", "latency_ms", "model_used", "language", "memories_used", "turn_count"}
+    - cancelled: {"id"} when a reply was stopped; it is not added to history
+    - error: {"id"?, "detail", "status"?: 503}
+    
+    A client that stops reading frames is closed with code 1013 after
+    CHAT_WS_SEND_TIMEOUT seconds.
+    """
+    session = chat_session_store.get(session_id) if session_id else None
+    if session_id and session is None:
+        # Policy violation close code; the client should start a new session
+        await websocket.close(code=1008, reason=f"Chat session {session_id} not found or expired")
+        return
+    await websocket.accept()
+    if session is None:
+        session = chat_session_store.create(user_id=user_id, language=language, model=model)
+    await chat_socket_manager.serve(websocket, session)
+
+
+def _session_response(session: ChatSession) -> ChatSessionResponse:
+    return ChatSessionResponse(
+        session_id=session.id,
+        user_id=session.user_id,
+        turn_count=session.turn_count,
+        summary=session.summary,
+        turns=session.turns,
+        history_tokens=session.history_tokens,
+        compactions=session.compactions,
+        expires_in=chat_session_store.ttl_seconds
+    )
+
+
+def _get_session(session_id: str) -> ChatSession:
+    session = chat_session_store.get(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Chat session {session_id} not found or expired"
+        )
+    return session
+
+
+@router.post("/sessions", response_model=ChatSessionResponse)
+async def create_chat_session(request: ChatSessionCreateRequest):
+    """
+    Start a multi-turn chat session.
+    
+    History is kept server-side, so each turn only sends the new message.
+    Sessions expire after CHAT_SESSION_TTL seconds of inactivity.
+    """
+    session = chat_session_store.create(
+        user_id=request.user_id,
+        language=request.language,
+        model=request.model
+    )
+    return _session_response(session)
+
+
+@router.post("/sessions/{session_id}/messages", response_model=ChatTurnResponse)
+async def send_session_message(
+    session_id: str,
+    request: ChatTurnRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Post one turn to a chat session and get the reply.
+    
+    Once history goes over CHAT_HISTORY_MAX_TOKENS, older turns are folded
+    into a rolling summary after the reply is sent, so prompt size stays
+    roughly constant over long conversations.
+    """
+    start_time = time.time()
+    session = _get_session(session_id)
+    
+    async with session.lock:
+        context = await memory_context.build_for_chat(session.user_id, request.message)
+        try:
+            response = await openai_client.send_message(
+                message=request.message,
+                language=session.language,
+                model=session.model,
+                use_cache=request.use_cache,
+                context=context["text"],
+                history=session.history_text()
+            )
+        except ExecutorSaturatedError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        
+        reply = response.get("response", "No response available")
+        # Failed generations are not recorded, so the user can simply retry the turn
+        if not response.get("error"):
+            session.add_turn("user", request.message)
+            session.add_turn("assistant", reply)
+            chat_history_writer.record_exchange(
+                request.message, reply,
+                user_id=session.user_id, session_id=session.id, model=response.get("model")
+            )
+        compaction_scheduled = chat_session_store.needs_compaction(session)
+    
+    if compaction_scheduled:
+        background_tasks.add_task(chat_session_store.compact_in_background, session)
+    
+    latency_ms = (time.time() - start_time) * 1000
+    return ChatTurnResponse(
+        response=reply,
+        latency_ms=round(latency_ms, 2),
+        model_used=response.get("model", session.model),
+        language=response.get("language", session.language),
+        cached=response.get("cached", False),
+        memories_used=context["memory_ids"],
+        session_id=session.id,
+        turn_count=session.turn_count,
+        prompt_tokens=response.get("prompt_tokens"),
+        history_tokens=session.history_tokens,
+        compaction_scheduled=compaction_scheduled
+    )
+
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_chat_session(session_id: str):
+    """Get a chat session's rolling summary and recent turns"""
+    return _session_response(_get_session(session_id))
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """End a chat session and drop its history"""
+    if not chat_session_store.delete(session_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Chat session {session_id} not found or expired"
+        )
+    return {"status": "success", "message": f"Chat session {session_id} deleted", "deleted_id": session_id}
+
+
+async def _history_page(
+    db: AsyncSession,
+    condition,
+    limit: int,
+    cursor: Optional[str]
+) -> ChatHistoryResponse:
+    """Newest-first page of stored messages matching condition, keyset-paginated on id"""
+    # Read-your-writes: messages still in the write-behind buffer go to the database first
+    await chat_history_writer.flush()
+    
+    query = select(ChatMessage).where(condition)
+    if cursor:
+        (before_id,) = decode_cursor(cursor, int)
+        query = query.where(ChatMessage.id < before_id)
+    # One extra row tells us whether there is a next page
+    messages = (await db.scalars(query.order_by(desc(ChatMessage.id)).limit(limit + 1))).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    
+    return ChatHistoryResponse(
+        messages=[
+            ChatHistoryMessage(
+                id=message.id,
+                user_id=message.user_id,
+                session_id=message.session_id,
+                role=message.role,
+                content=message.content,
+                model=message.model,
+                created_at=message.created_at.isoformat()
+            )
+            for message in messages
+        ],
+        count=len(messages),
+        next_cursor=encode_cursor(messages[-1].id) if has_more else None
+    )
+
+
+@router.get("/history/{user_id}", response_model=ChatHistoryResponse)
+async def get_chat_history(
+    user_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get a user's stored text chat messages, newest first.
+    
+    Covers /text, /text/stream and session turns sent with this user_id.
+    Pass the returned next_cursor as ?cursor= to page back in time.
+    """
+    try:
+        return await _history_page(db, ChatMessage.user_id == user_id, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch chat history: {str(e)}"
+        )
+
+
+@router.get("/sessions/{session_id}/history", response_model=ChatHistoryResponse)
+async def get_chat_session_history(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get every stored message of a chat session, newest first.
+    
+    Unlike GET /sessions/{session_id}, this includes turns already folded
+    into the summary and still works after the session has expired.
+    """
+    try:
+        return await _history_page(db, ChatMessage.session_id == session_id, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch chat history: {str(e)}"
+        )
+
+
 @router.get("/languages")
 async def get_languages():
     """Get available languages"""
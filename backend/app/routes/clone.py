@@ -4,6 +4,7 @@ Voice cloning endpoints
 from fastapi import APIRouter, HTTPException, UploadFile, File
 from typing import Optional
 
+from app.core.deadline import DeadlineExceeded
 from app.schemas.clone import (
     VoiceCloneUploadResponse,
     VoiceCloneCreateRequest,
@@ -12,6 +13,7 @@ from app.schemas.clone import (
     VoicePreviewRequest,
     VoicePreviewResponse
 )
+from app.services.resilience import CircuitOpenError
 from app.services.voice_clone import voice_clone_service
 
 router = APIRouter()
@@ -39,6 +41,12 @@ async def upload_voice_sample(
             status=response.get("status", "uploaded"),
             filename=file.filename
         )
+    except DeadlineExceeded:
+        # Answered with a 504 naming the stage that ran out of time
+        raise
+    except CircuitOpenError as e:
+        # Vapi is down - fail fast instead of waiting out the timeout
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -60,6 +68,10 @@ async def create_voice_clone(request: VoiceCloneCreateRequest):
             status=response.get("status", "processing"),
             estimated_time_seconds=response.get("estimated_time_seconds")
         )
+    except DeadlineExceeded:
+        raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -79,6 +91,10 @@ async def get_clone_status(clone_id: str):
             progress_percent=response.get("progress_percent"),
             error=response.get("error")
         )
+    except DeadlineExceeded:
+        raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -99,6 +115,10 @@ async def preview_voice(request: VoicePreviewRequest):
             audio_url=response.get("audio_url", ""),
             duration_seconds=response.get("duration_seconds", 0.0)
         )
+    except DeadlineExceeded:
+        raise
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
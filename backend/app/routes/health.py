@@ -3,50 +3,101 @@ Health check endpoints
 """
 from fastapi import APIRouter, HTTPException
 from datetime import datetime
-import httpx
 from app.core.config import settings
+from app.services.chat_history import chat_history_writer
+from app.services.chat_sessions import chat_session_store
+from app.services.chat_socket import chat_socket_manager
+from app.services.endpoint_resolver import vapi_endpoints
+from app.services.gemini_executor import gemini_executor
+from app.services.hedging import hedge_policy
+from app.services.http_clients import http_clients
+from app.services.memory_context import memory_context
+from app.services.model_registry import model_registry
+from app.services.model_router import model_router
+from app.services.openai_client import openai_client
+from app.services.rate_limiter import gemini_rate_limiter
+from app.services.resilience import OPEN, resilience
+from app.services.response_cache import response_cache
 
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check():
-    """Basic health check endpoint"""
+    """Basic health check endpoint, with upstream circuit breaker states"""
+    breakers = resilience.get_stats()
+    # Still serving (fallbacks, cached and local work), but an upstream is being failed fast
+    degraded = any(breaker["state"] == OPEN for breaker in breakers.values())
     return {
-        "status": "healthy",
+        "status": "degraded" if degraded else "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "service": "MyDigitalTwin API"
+        "service": "MyDigitalTwin API",
+        "circuit_breakers": breakers
     }
 
 
 @router.get("/health/vapi")
 async def vapi_health_check():
-    """Check Vapi API connectivity"""
+    """Check Vapi API connectivity (and report the shared connection pool and learned endpoints)"""
     try:
         if not settings.VAPI_PRIVATE_KEY:
             return {
                 "status": "not_configured",
                 "vapi_status": "private_key_not_set",
                 "message": "VAPI_PRIVATE_KEY is optional for webhooks only",
+                "pool": http_clients.get_stats(),
+                "endpoints": vapi_endpoints.get_stats(),
                 "timestamp": datetime.utcnow().isoformat()
             }
         
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(
-                f"{settings.VAPI_BASE_URL}/v1/health",
-                headers={"Authorization": f"Bearer {settings.VAPI_PRIVATE_KEY}"}
-            )
-            response.raise_for_status()
-            return {
-                "status": "connected",
-                "vapi_status": "healthy",
-                "timestamp": datetime.utcnow().isoformat()
-            }
+        response = await http_clients.get("vapi").get(
+            f"{settings.VAPI_BASE_URL}/v1/health",
+            headers={"Authorization": f"Bearer {settings.VAPI_PRIVATE_KEY}"},
+            timeout=10
+        )
+        response.raise_for_status()
+        return {
+            "status": "connected",
+            "vapi_status": "healthy",
+            "pool": http_clients.get_stats(),
+            "endpoints": vapi_endpoints.get_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
     except Exception as e:
         return {
             "status": "disconnected",
             "vapi_status": "unreachable",
             "error": str(e),
+            "pool": http_clients.get_stats(),
+            "endpoints": vapi_endpoints.get_stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
 
+
+
+@router.get("/health/gemini")
+async def gemini_health_check():
+    """Inspect Gemini client state (model registry, routing scoreboard, hedging, rate limits, executor, response cache, coalescing)"""
+    return {
+        "status": "configured" if model_registry.enabled else "not_configured",
+        "registry": model_registry.get_state(),
+        "router": model_router.get_stats(),
+        "hedging": hedge_policy.get_stats(),
+        "rate_limits": gemini_rate_limiter.get_stats(),
+        "executor": gemini_executor.get_stats(),
+        "cache": response_cache.get_stats(),
+        "coalescing": openai_client.single_flight.get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/health/chat")
+async def chat_health_check():
+    """Inspect chat state (sessions, WebSockets, memory context cache, history write buffer)"""
+    return {
+        "sessions": chat_session_store.get_stats(),
+        "websockets": chat_socket_manager.get_stats(),
+        "memory_context": memory_context.get_stats(),
+        "history_writer": chat_history_writer.get_stats(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
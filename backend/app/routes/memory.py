@@ -1,27 +1,48 @@
 """
 API endpoints for saving and retrieving conversation memories
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from sqlalchemy import String, and_, desc, literal, or_, select
+from typing import List, Optional
 
-from app.database import get_db
-from app.models import Memory, User
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, request_budget
+from app.core.pagination import decode_cursor, encode_cursor
+from app.database import DATABASE_URL, get_async_db, is_sqlite
+from app.models import Memory, SummaryJob, User
 from app.schemas.memory import (
+    MEMORY_FIELDS,
     MemoryResponse,
     MemoryListResponse,
     MemorySaveRequest,
-    MemorySaveResponse
+    MemorySaveResponse,
+    MemorySearchResponse,
+    MemorySearchResult,
+    RelatedMemoriesResponse,
+    RelatedMemory,
+    SummaryJobResponse,
+    SummaryQueueResponse
 )
-from app.services.openai_client import openai_client
+from app.services.gemini_executor import ExecutorSaturatedError
+from app.services.memory_search import build_match_query, memory_search
+from app.services.summarizer import summarizer
+from app.services.summary_worker import summary_worker_pool
+from app.services.vector_index import memory_index
 
 router = APIRouter()
 
 
-@router.post("/save", response_model=MemorySaveResponse)
+@router.post(
+    "/save",
+    response_model=MemorySaveResponse,
+    dependencies=[Depends(request_budget(settings.MEMORY_SAVE_DEADLINE))]
+)
 async def save_memory(
     request: MemorySaveRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Save a conversation transcript and generate a summary using Gemini AI.
@@ -31,6 +52,14 @@ async def save_memory(
     2. Generates a summary using Gemini Flash (free)
     3. Stores both transcript and summary in database
     
+    summary_mode picks the summarizer: auto (default) uses Gemini within a
+    latency budget and falls back to the local extractive summarizer when
+    Gemini is slow, busy, failing or unconfigured; llm and extractive force one.
+    
+    With async_summary=true the transcript is stored right away with an
+    extractive summary and a pending job; a background worker replaces it
+    with the Gemini summary. Poll GET /api/memory/jobs/{memory_id} for the result.
+    
     Args:
         request: MemorySaveRequest with user_id, assistant_id, and transcript
         db: Database session
@@ -40,32 +69,41 @@ async def save_memory(
     """
     try:
         # Verify user exists
-        user = db.query(User).filter(User.id == request.user_id).first()
+        user = await db.get(User, request.user_id)
         if not user:
             raise HTTPException(
                 status_code=404,
                 detail=f"User with id {request.user_id} not found"
             )
         
-        # Generate summary using Gemini AI
-        summary_prompt = f"""Please provide a concise summary (2-3 sentences) of this conversation transcript:
-
-{request.transcript}
-
-Summary:"""
-        
-        summary_response = await openai_client.send_message(
-            message=summary_prompt,
-            model="gemini-1.5-flash"
-        )
-        
-        summary = summary_response.get("response", "No summary generated")
+        if request.async_summary:
+            # Store the transcript now with an instant extractive summary;
+            # a background worker replaces it with the Gemini summary
+            provisional = summarizer.summarize_extractive(request.transcript)
+            memory = Memory(
+                user_id=request.user_id,
+                assistant_id=request.assistant_id,
+                transcript=request.transcript,
+                summary=provisional["summary"]
+            )
+            memory.summary_job = SummaryJob(status="pending")
+            
+            db.add(memory)
+            await db.commit()
+            memory_index.upsert(memory.id, memory.user_id, memory.summary)
+            summary_worker_pool.notify()
+            
+            return MemorySaveResponse(
+                status="pending",
+                memory_id=memory.id,
+                summary=memory.summary,
+                summary_method=provisional["method"],
+                job_status="pending"
+            )
         
-        # Clean up summary if it contains extra text
-        if "Summary:" in summary:
-            summary = summary.split("Summary:")[-1].strip()
-        if "summary:" in summary.lower():
-            summary = summary.split("summary:")[-1].strip()
+        # Generate summary using Gemini AI (or locally, depending on summary_mode)
+        result = await summarizer.summarize(request.transcript, mode=request.summary_mode)
+        summary = result["summary"]
         
         # Create memory record
         memory = Memory(
@@ -76,70 +114,180 @@ Summary:"""
         )
         
         db.add(memory)
-        db.commit()
-        db.refresh(memory)
+        await db.commit()
+        memory_index.upsert(memory.id, memory.user_id, memory.summary)
         
         return MemorySaveResponse(
             status="saved",
             memory_id=memory.id,
-            summary=summary
+            summary=summary,
+            summary_method=result["method"]
         )
         
     except HTTPException:
         raise
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Failed to save memory: {str(e)}"
+        )
+    except DeadlineExceeded:
+        # Answered with a 504 naming the stage that ran out of time
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to save memory: {str(e)}"
         )
 
 
-@router.get("/{user_id}", response_model=MemoryListResponse)
+@router.get("/jobs/queue", response_model=SummaryQueueResponse)
+async def get_summary_queue():
+    """
+    Get background summarization queue depth.
+    
+    Returns:
+        Job counts by status and worker pool counters
+    """
+    try:
+        return SummaryQueueResponse(**await summary_worker_pool.get_stats())
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch summary queue: {str(e)}"
+        )
+
+
+@router.get("/jobs/{memory_id}", response_model=SummaryJobResponse)
+async def get_summary_job(
+    memory_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the background summary job status for a memory saved in async mode.
+    
+    Args:
+        memory_id: ID of the memory
+        db: Database session
+    
+    Returns:
+        Job status, attempts, last error, and the summary once done
+    """
+    row = (await db.execute(
+        select(SummaryJob, Memory.summary)
+        .join(Memory, Memory.id == SummaryJob.memory_id)
+        .where(SummaryJob.memory_id == memory_id)
+    )).first()
+    if not row:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No summary job for memory {memory_id}"
+        )
+    job, summary = row
+    
+    return SummaryJobResponse(
+        memory_id=job.memory_id,
+        status=job.status,
+        attempts=job.attempts,
+        error=job.error,
+        summary=summary if job.status == "done" else None,
+        created_at=job.created_at.isoformat(),
+        updated_at=job.updated_at.isoformat()
+    )
+
+
+def _created_at_value(created_at: datetime):
+    """Bind value for comparing against memories.created_at"""
+    if is_sqlite(DATABASE_URL):
+        # SQLite stores server_default timestamps as 'YYYY-MM-DD HH:MM:SS' text, while
+        # SQLAlchemy binds datetimes with microseconds - compare as stored text instead
+        fmt = "%Y-%m-%d %H:%M:%S.%f" if created_at.microsecond else "%Y-%m-%d %H:%M:%S"
+        return literal(created_at.strftime(fmt), String)
+    return created_at
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(MEMORY_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in MEMORY_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(MEMORY_FIELDS)})"
+        )
+    return ["id"] + [f for f in requested if f != "id"]
+
+
+@router.get("/{user_id}", response_model=MemoryListResponse, response_model_exclude_unset=True)
 async def get_memories(
     user_id: int,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get all memories for a specific user, ordered by most recent first.
+    Get memories for a specific user, ordered by most recent first.
+    
+    Pages are keyset-paginated on (created_at, id): pass the returned
+    next_cursor as ?cursor= to fetch the following page.
+    
+    fields= is a comma-separated projection, e.g. ?fields=summary,created_at.
+    Transcripts are only loaded from the database when requested.
     
     Args:
         user_id: ID of the user to fetch memories for
         limit: Maximum number of memories to return (default: 100)
+        cursor: next_cursor from the previous page
+        fields: Fields to return (default: all); id is always included
         db: Database session
     
     Returns:
-        List of memories with id, user_id, assistant_id, transcript, summary, and created_at
+        List of memories, count, and next_cursor (null on the last page)
     """
     try:
+        selected = _parse_fields(fields)
+        
         # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=404,
                 detail=f"User with id {user_id} not found"
             )
         
-        memories = db.query(Memory)\
-            .filter(Memory.user_id == user_id)\
-            .order_by(desc(Memory.created_at))\
-            .limit(limit)\
-            .all()
+        query = select(Memory).where(Memory.user_id == user_id)
+        if cursor:
+            created_at, memory_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            created_at_value = _created_at_value(created_at)
+            query = query.where(or_(
+                Memory.created_at < created_at_value,
+                and_(Memory.created_at == created_at_value, Memory.id < memory_id)
+            ))
+        if "transcript" not in selected:
+            # Never pull transcripts off disk for summary-only listings
+            query = query.options(defer(Memory.transcript, raiseload=True))
+        
+        # One extra row tells us whether there is a next page
+        memories = (await db.scalars(
+            query.order_by(desc(Memory.created_at), desc(Memory.id)).limit(limit + 1)
+        )).all()
+        has_more = len(memories) > limit
+        memories = memories[:limit]
         
         return MemoryListResponse(
             memories=[
-                MemoryResponse(
-                    id=memory.id,
-                    user_id=memory.user_id,
-                    assistant_id=memory.assistant_id,
-                    transcript=memory.transcript,
-                    summary=memory.summary,
-                    created_at=memory.created_at.isoformat()
-                )
+                MemoryResponse(**{
+                    field: memory.created_at.isoformat() if field == "created_at" else getattr(memory, field)
+                    for field in selected
+                })
                 for memory in memories
             ],
-            count=len(memories)
+            count=len(memories),
+            next_cursor=encode_cursor(memories[-1].created_at.isoformat(), memories[-1].id) if has_more else None
         )
     except HTTPException:
         raise
@@ -150,10 +298,144 @@ async def get_memories(
         )
 
 
+@router.get("/{user_id}/search", response_model=MemorySearchResponse)
+async def search_memories(
+    user_id: int,
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Full-text search over a user's memory summaries and transcripts.
+    
+    Every word in q must match (the last one as a prefix). Results are
+    BM25-ranked with summary matches weighted above transcript matches, and
+    include HTML-escaped snippets with matches wrapped in <mark>.
+    
+    Args:
+        user_id: ID of the user whose memories to search
+        q: Search text
+        limit: Maximum number of results to return (default: 20)
+        cursor: next_cursor from the previous page
+        db: Database session
+    
+    Returns:
+        Ranked results with snippets, count, and next_cursor (null on the last page)
+    """
+    if not is_sqlite(DATABASE_URL):
+        raise HTTPException(
+            status_code=501,
+            detail="Memory search requires the SQLite backend (FTS5)"
+        )
+    
+    match = build_match_query(q)
+    if not match:
+        raise HTTPException(
+            status_code=400,
+            detail="Search query has no searchable words"
+        )
+    after = decode_cursor(cursor, float, int) if cursor else None
+    
+    try:
+        # Verify user exists
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(
+                status_code=404,
+                detail=f"User with id {user_id} not found"
+            )
+        
+        # One extra row tells us whether there is a next page
+        hits = await memory_search.search(db, user_id, match, limit + 1, after)
+        has_more = len(hits) > limit
+        hits = hits[:limit]
+        
+        return MemorySearchResponse(
+            query=q,
+            results=[
+                MemorySearchResult(**{**hit, "created_at": hit["created_at"].isoformat()})
+                for hit in hits
+            ],
+            count=len(hits),
+            next_cursor=encode_cursor(hits[-1]["rank"], hits[-1]["id"]) if has_more else None
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search memories: {str(e)}"
+        )
+
+
+@router.get("/{user_id}/related", response_model=RelatedMemoriesResponse)
+async def get_related_memories(
+    user_id: int,
+    q: str = Query(..., min_length=1, max_length=2000),
+    k: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Find a user's past conversations whose summaries are semantically closest to q.
+    
+    Uses the local vector index (cosine similarity over summary embeddings),
+    so it works offline and matches related wording, not just exact words.
+    
+    Args:
+        user_id: ID of the user whose memories to search
+        q: Text to find related memories for
+        k: Number of memories to return (default: 5)
+        db: Database session
+    
+    Returns:
+        Closest memories first, each with its similarity score
+    """
+    try:
+        # Verify user exists
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(
+                status_code=404,
+                detail=f"User with id {user_id} not found"
+            )
+        
+        # Non-positive cosine means no shared features - not related
+        hits = [(memory_id, score) for memory_id, score in memory_index.search(user_id, q, k) if score > 0]
+        memories = {}
+        if hits:
+            rows = await db.scalars(
+                select(Memory)
+                .options(defer(Memory.transcript, raiseload=True))
+                .where(Memory.id.in_([memory_id for memory_id, _ in hits]))
+            )
+            memories = {memory.id: memory for memory in rows}
+        
+        results = [
+            RelatedMemory(
+                id=memory_id,
+                assistant_id=memories[memory_id].assistant_id,
+                summary=memories[memory_id].summary,
+                created_at=memories[memory_id].created_at.isoformat(),
+                score=round(score, 4)
+            )
+            for memory_id, score in hits
+            if memory_id in memories
+        ]
+        return RelatedMemoriesResponse(query=q, results=results, count=len(results))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to find related memories: {str(e)}"
+        )
+
+
 @router.delete("/{memory_id}")
 async def delete_memory(
     memory_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete a specific memory by ID.
@@ -166,7 +448,7 @@ async def delete_memory(
         Success message with deleted memory ID
     """
     try:
-        memory = db.query(Memory).filter(Memory.id == memory_id).first()
+        memory = await db.get(Memory, memory_id)
         
         if not memory:
             raise HTTPException(
@@ -174,8 +456,9 @@ async def delete_memory(
                 detail=f"Memory with id {memory_id} not found"
             )
         
-        db.delete(memory)
-        db.commit()
+        await db.delete(memory)
+        await db.commit()
+        memory_index.remove(memory_id)
         
         return {
             "status": "success",
@@ -185,7 +468,7 @@ async def delete_memory(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete memory: {str(e)}"
@@ -2,11 +2,12 @@
 User management endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import User
 
 router = APIRouter()
@@ -31,7 +32,7 @@ class UserResponse(BaseModel):
 @router.post("/create", response_model=UserResponse)
 async def create_user(
     request: UserCreateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new user.
@@ -47,7 +48,7 @@ async def create_user(
     """
     try:
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == request.email).first()
+        existing_user = await db.scalar(select(User.id).where(User.email == request.email))
         if existing_user:
             raise HTTPException(
                 status_code=400,
@@ -61,8 +62,7 @@ async def create_user(
         )
         
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
         
         return UserResponse(
             id=user.id,
@@ -73,7 +73,7 @@ async def create_user(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create user: {str(e)}"
@@ -83,7 +83,7 @@ async def create_user(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get user by ID.
@@ -95,7 +95,7 @@ async def get_user(
     Returns:
         UserResponse with user details
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -1,9 +1,11 @@
 """
 Live voice session endpoints
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime
 
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, request_budget
 from app.schemas.voice import (
     VoiceSessionRequest,
     VoiceSessionResponse,
@@ -29,6 +31,9 @@ async def start_voice_session(request: VoiceSessionRequest):
             status=response.get("status", "active"),
             websocket_url=response.get("websocket_url")
         )
+    except DeadlineExceeded:
+        # Answered with a 504 naming the stage that ran out of time
+        raise
     except Exception as e:
         # Provide a mock session even on error for development
         import uuid
@@ -39,7 +44,7 @@ async def start_voice_session(request: VoiceSessionRequest):
         )
 
 
-@router.post("/stop/{session_id}")
+@router.post("/stop/{session_id}", dependencies=[Depends(request_budget(settings.VOICE_REQUEST_DEADLINE))])
 async def stop_voice_session(session_id: str):
     """Stop an active voice session"""
     try:
@@ -50,6 +55,8 @@ async def stop_voice_session(session_id: str):
             "status": response.get("status", "stopped"),
             "message": response.get("message", "Session stopped successfully")
         }
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         # Even on error, return success for development
         return {
@@ -59,7 +66,11 @@ async def stop_voice_session(session_id: str):
         }
 
 
-@router.get("/status/{session_id}", response_model=VoiceStatusResponse)
+@router.get(
+    "/status/{session_id}",
+    response_model=VoiceStatusResponse,
+    dependencies=[Depends(request_budget(settings.VOICE_REQUEST_DEADLINE))]
+)
 async def get_voice_status(session_id: str):
     """Get status of a voice session"""
     try:
@@ -71,6 +82,8 @@ async def get_voice_status(session_id: str):
             status=response.get("status", "active"),
             duration_seconds=response.get("duration_seconds", 0.0)
         )
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         # Return mock status even on error for development
         return VoiceStatusResponse(
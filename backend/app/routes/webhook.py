@@ -3,12 +3,14 @@ Vapi webhook endpoint for receiving structured outputs
 Note: This is optional - frontend saves memories directly via /api/memory/save
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
 import logging
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models import Memory, User
+from app.services.vector_index import memory_index
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -31,7 +33,7 @@ def is_meaningful_content(content: str) -> bool:
 @router.post("/vapi/webhook")
 async def vapi_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle Vapi webhook events.
@@ -75,13 +77,12 @@ async def vapi_webhook(
         
         # Get or use default user_id (webhook might not have user info)
         # For webhooks, we'll use a default user or create one
-        default_user = db.query(User).filter(User.email == "webhook@system").first()
+        default_user = await db.scalar(select(User).where(User.email == "webhook@system"))
         if not default_user:
             # Create a default user for webhook saves
             default_user = User(name="Webhook User", email="webhook@system")
             db.add(default_user)
-            db.commit()
-            db.refresh(default_user)
+            await db.commit()
             logger.info(f"Created default webhook user: {default_user.id}")
         
         user_id = default_user.id
@@ -101,13 +102,13 @@ async def vapi_webhook(
                         summary=call_summary.strip()
                     )
                     db.add(memory_record)
-                    db.commit()
-                    db.refresh(memory_record)
+                    await db.commit()
+                    memory_index.upsert(memory_record.id, user_id, memory_record.summary)
                     saved_items.append(f"Memory with summary (id: {memory_record.id})")
                     logger.info(f"Saved memory from webhook: {memory_record.id}")
                 except Exception as e:
                     logger.error(f"Error saving memory from webhook: {e}")
-                    db.rollback()
+                    await db.rollback()
         
         # Extract memory candidate - can be saved separately or merged
         memory_candidate = structured_outputs.get("memoryCandidate")
@@ -117,13 +118,19 @@ async def vapi_webhook(
             if saved_items:
                 # Update the last saved memory to include candidate info
                 try:
-                    last_memory = db.query(Memory).filter(
-                        Memory.user_id == user_id,
-                        Memory.assistant_id == assistant_id or "unknown"
-                    ).order_by(Memory.id.desc()).first()
+                    last_memory = await db.scalar(
+                        select(Memory)
+                        .where(
+                            Memory.user_id == user_id,
+                            Memory.assistant_id == (assistant_id or "unknown")
+                        )
+                        .order_by(Memory.id.desc())
+                        .limit(1)
+                    )
                     if last_memory:
                         last_memory.summary += f"\n\nMemory: {memory_candidate.strip()}"
-                        db.commit()
+                        await db.commit()
+                        memory_index.upsert(last_memory.id, user_id, last_memory.summary)
                         saved_items.append(f"Updated memory {last_memory.id} with candidate")
                 except Exception as e:
                     logger.error(f"Error updating memory: {e}")
@@ -137,13 +144,13 @@ async def vapi_webhook(
                         summary=memory_candidate.strip()
                     )
                     db.add(memory_record)
-                    db.commit()
-                    db.refresh(memory_record)
+                    await db.commit()
+                    memory_index.upsert(memory_record.id, user_id, memory_record.summary)
                     saved_items.append(f"Memory candidate (id: {memory_record.id})")
                     logger.info(f"Saved memory candidate: {memory_record.id}")
                 except Exception as e:
                     logger.error(f"Error saving memory candidate: {e}")
-                    db.rollback()
+                    await db.rollback()
         
         # Return success response
         return {
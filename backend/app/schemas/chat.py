@@ -2,7 +2,7 @@
 Chat request/response schemas
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class ChatRequest(BaseModel):
@@ -10,6 +10,8 @@ class ChatRequest(BaseModel):
     message: str = Field(..., description="User message")
     language: Optional[str] = Field(None, description="Language code (e.g., 'en', 'es')")
     model: Optional[str] = Field(None, description="Model to use")
+    use_cache: Optional[bool] = Field(None, description="Allow (true) or skip (false) the response cache; default caches only deterministic prompts")
+    user_id: Optional[int] = Field(None, description="User whose past conversation memories are added to the prompt")
 
 
 class ChatResponse(BaseModel):
@@ -18,8 +20,65 @@ class ChatResponse(BaseModel):
     latency_ms: float = Field(..., description="Response latency in milliseconds")
     model_used: Optional[str] = Field(None, description="Model used for response")
     language: Optional[str] = Field(None, description="Language detected/used")
+    cached: bool = Field(False, description="Whether the response was served from the response cache")
+    memories_used: List[int] = Field(default_factory=list, description="IDs of the memories added to the prompt")
     
     class Config:
         # Disable protected namespace warning for "model_used" field
         protected_namespaces = ()
 
+
+
+class ChatSessionCreateRequest(BaseModel):
+    """Request schema for starting a chat session"""
+    user_id: Optional[int] = Field(None, description="User whose past conversation memories are added to each prompt")
+    language: Optional[str] = Field(None, description="Language code (e.g., 'en', 'es')")
+    model: Optional[str] = Field(None, description="Model to use")
+
+
+class ChatSessionResponse(BaseModel):
+    """Response schema for a chat session's state"""
+    session_id: str = Field(..., description="Session ID to post turns to")
+    user_id: Optional[int] = Field(None, description="User the session belongs to")
+    turn_count: int = Field(..., description="User turns so far")
+    summary: str = Field("", description="Rolling summary of compacted older turns")
+    turns: List[Dict[str, str]] = Field(default_factory=list, description="Recent turns kept verbatim ({role, text})")
+    history_tokens: int = Field(..., description="Estimated tokens of history sent with the next turn")
+    compactions: int = Field(0, description="Times older turns were folded into the summary")
+    expires_in: float = Field(..., description="Seconds of inactivity before the session expires")
+
+
+class ChatTurnRequest(BaseModel):
+    """Request schema for one turn of a chat session - only the new message is sent"""
+    message: str = Field(..., description="User message")
+    use_cache: Optional[bool] = Field(None, description="Allow (true) or skip (false) the response cache")
+
+
+class ChatTurnResponse(ChatResponse):
+    """Response schema for one turn of a chat session"""
+    session_id: str = Field(..., description="Session ID")
+    turn_count: int = Field(..., description="User turns so far")
+    prompt_tokens: Optional[int] = Field(None, description="Estimated tokens in the prompt sent to Gemini")
+    history_tokens: int = Field(..., description="Estimated tokens of history after this turn")
+    compaction_scheduled: bool = Field(False, description="Older turns will be folded into the summary before the next turn")
+
+
+class ChatHistoryMessage(BaseModel):
+    """Response schema for one stored chat message"""
+    id: int = Field(..., description="Message ID")
+    user_id: Optional[int] = Field(None, description="User the message belongs to")
+    session_id: Optional[str] = Field(None, description="Chat session the message was sent in")
+    role: str = Field(..., description="user or assistant")
+    content: str = Field(..., description="Message text")
+    model: Optional[str] = Field(None, description="Model that produced an assistant message")
+    created_at: str = Field(..., description="ISO format timestamp")
+    
+    class Config:
+        protected_namespaces = ()
+
+
+class ChatHistoryResponse(BaseModel):
+    """Response schema for a page of chat history"""
+    messages: List[ChatHistoryMessage] = Field(..., description="Messages, newest first")
+    count: int = Field(..., description="Number of messages returned")
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= to get older messages; null on the last page")
@@ -2,7 +2,7 @@
 Pydantic schemas for memory save requests and responses
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class MemorySaveRequest(BaseModel):
@@ -10,16 +10,25 @@ class MemorySaveRequest(BaseModel):
     user_id: int = Field(..., description="User ID")
     assistant_id: str = Field(..., description="Vapi Assistant ID")
     transcript: str = Field(..., description="Full conversation transcript")
+    async_summary: bool = Field(False, description="Save immediately and summarize in the background")
+    summary_mode: Literal["auto", "llm", "extractive"] = Field(
+        "auto",
+        description="auto: Gemini within the latency budget, else local extractive; llm: Gemini only; extractive: local only"
+    )
+
+
+# Fields a memory listing can be projected to with ?fields=
+MEMORY_FIELDS = ("id", "user_id", "assistant_id", "transcript", "summary", "created_at")
 
 
 class MemoryResponse(BaseModel):
-    """Response schema for a single memory"""
+    """Response schema for a single memory (fields other than id are omitted when not requested)"""
     id: int = Field(..., description="Memory ID")
-    user_id: int = Field(..., description="User ID")
-    assistant_id: str = Field(..., description="Vapi Assistant ID")
-    transcript: str = Field(..., description="Full conversation transcript")
-    summary: str = Field(..., description="AI-generated summary")
-    created_at: str = Field(..., description="ISO format timestamp")
+    user_id: Optional[int] = Field(None, description="User ID")
+    assistant_id: Optional[str] = Field(None, description="Vapi Assistant ID")
+    transcript: Optional[str] = Field(None, description="Full conversation transcript")
+    summary: Optional[str] = Field(None, description="AI-generated summary")
+    created_at: Optional[str] = Field(None, description="ISO format timestamp")
     
     class Config:
         from_attributes = True
@@ -27,13 +36,73 @@ class MemoryResponse(BaseModel):
 
 class MemorySaveResponse(BaseModel):
     """Response schema for memory save operation"""
-    status: str = Field(..., description="Status of the save operation")
+    status: str = Field(..., description="Status of the save operation (saved, or pending in async mode)")
     memory_id: int = Field(..., description="ID of the saved memory")
-    summary: str = Field(..., description="Generated summary")
+    summary: str = Field(..., description="Generated summary (provisional extractive summary while pending)")
+    summary_method: Optional[str] = Field(None, description="How the summary was produced (llm or extractive)")
+    job_status: Optional[str] = Field(None, description="Background summary job status in async mode")
 
 
 class MemoryListResponse(BaseModel):
     """Response schema for list of memories"""
     memories: List[MemoryResponse] = Field(..., description="List of memories")
     count: int = Field(..., description="Number of memories returned")
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= to get the next page; null on the last page")
+
+
+class MemorySearchResult(BaseModel):
+    """Response schema for one full-text search hit"""
+    id: int = Field(..., description="Memory ID")
+    assistant_id: str = Field(..., description="Vapi Assistant ID")
+    summary: str = Field(..., description="AI-generated summary")
+    created_at: str = Field(..., description="ISO format timestamp")
+    rank: float = Field(..., description="BM25 score (lower is a better match)")
+    summary_snippet: Optional[str] = Field(None, description="Summary excerpt with matches in <mark>, HTML-escaped")
+    transcript_snippet: Optional[str] = Field(None, description="Transcript excerpt with matches in <mark>, HTML-escaped")
+
+
+class MemorySearchResponse(BaseModel):
+    """Response schema for memory search"""
+    query: str = Field(..., description="Search text as received")
+    results: List[MemorySearchResult] = Field(..., description="Matches, best first")
+    count: int = Field(..., description="Number of results returned")
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= to get the next page; null on the last page")
+
+
+class RelatedMemory(BaseModel):
+    """Response schema for one semantically related memory"""
+    id: int = Field(..., description="Memory ID")
+    assistant_id: str = Field(..., description="Vapi Assistant ID")
+    summary: str = Field(..., description="AI-generated summary")
+    created_at: str = Field(..., description="ISO format timestamp")
+    score: float = Field(..., description="Cosine similarity to the query (higher is closer)")
+
+
+class RelatedMemoriesResponse(BaseModel):
+    """Response schema for semantic memory lookup"""
+    query: str = Field(..., description="Query text as received")
+    results: List[RelatedMemory] = Field(..., description="Closest memories first")
+    count: int = Field(..., description="Number of results returned")
+
+
+class SummaryJobResponse(BaseModel):
+    """Response schema for a background summary job"""
+    memory_id: int = Field(..., description="Memory ID")
+    status: str = Field(..., description="Job status (pending, running, done, failed)")
+    attempts: int = Field(..., description="Summarization attempts so far")
+    error: Optional[str] = Field(None, description="Last failure message")
+    summary: Optional[str] = Field(None, description="Generated summary once done")
+    created_at: str = Field(..., description="ISO format timestamp")
+    updated_at: str = Field(..., description="ISO format timestamp")
+
 
+class SummaryQueueResponse(BaseModel):
+    """Response schema for background summary queue depth"""
+    pending: int = Field(..., description="Jobs waiting for a worker")
+    running: int = Field(..., description="Jobs being summarized")
+    done: int = Field(..., description="Completed jobs")
+    failed: int = Field(..., description="Jobs that used up their attempts")
+    workers: int = Field(..., description="Configured worker count")
+    workers_alive: int = Field(..., description="Running worker tasks")
+    completed_since_start: int = Field(..., description="Jobs completed by this process")
+    failed_since_start: int = Field(..., description="Jobs failed by this process")
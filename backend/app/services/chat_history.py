@@ -0,0 +1,173 @@
+"""
+Write-behind persistence for text chat messages
+"""
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+import logging
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ChatHistoryWriter:
+    """
+    Buffers chat messages in memory and writes them in batches.
+
+    record() only appends to the buffer, so the chat response path never
+    waits on the database. A background task writes everything buffered,
+    batch_size rows per transaction, as soon as a full batch is waiting or
+    flush_ms after the previous write, whichever comes first. A failed
+    write puts its rows back to be retried on the next flush.
+
+    stop() writes whatever is still buffered, so a clean shutdown loses
+    nothing; a crash loses at most the last flush interval. If the database
+    stays unavailable, the buffer holds up to max_buffered messages and
+    drops new ones after that rather than growing without bound.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_ms: Optional[int] = None,
+        max_buffered: Optional[int] = None
+    ):
+        self.batch_size = batch_size or settings.CHAT_HISTORY_BATCH_SIZE
+        self.flush_interval = (flush_ms or settings.CHAT_HISTORY_FLUSH_MS) / 1000
+        self.max_buffered = max_buffered or settings.CHAT_HISTORY_BUFFER_MAX
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._batch_ready = asyncio.Event()
+        # One writer at a time, so rows are inserted in the order they were recorded
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._written = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._dropped = 0
+
+    async def start(self) -> None:
+        """Start the background flush task"""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write everything still buffered"""
+        if self._task is not None:
+            # Let the loop finish its current write and exit, rather than cancelling it mid-insert
+            self._stopping = True
+            self._batch_ready.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"Chat history: {len(self._buffer)} messages could not be written at shutdown")
+
+    def record(
+        self,
+        role: str,
+        content: str,
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> None:
+        """Queue one message for writing; never blocks"""
+        if len(self._buffer) >= self.max_buffered:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.warning(f"Chat history buffer full ({self.max_buffered}); {self._dropped} messages dropped")
+            return
+        self._buffer.append({
+            "user_id": user_id,
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "model": model,
+            "created_at": datetime.now(timezone.utc)
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._batch_ready.set()
+
+    def record_exchange(
+        self,
+        message: str,
+        reply: str,
+        user_id: Optional[int] = None,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> None:
+        """Queue a user message and the assistant's reply"""
+        if user_id is None and session_id is None:
+            return  # Nothing to list it under
+        self.record("user", message, user_id=user_id, session_id=session_id)
+        self.record("assistant", reply, user_id=user_id, session_id=session_id, model=model)
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Chat history flush error: {e}", exc_info=True)
+
+    async def flush(self) -> int:
+        """Write all buffered messages now; returns the number written"""
+        written = 0
+        async with self._flush_lock:
+            while self._buffer:
+                batch: List[Dict[str, Any]] = [
+                    self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))
+                ]
+                committed = False
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await db.execute(insert(ChatMessage), batch)
+                        await db.commit()
+                        committed = True
+                        written += len(batch)
+                        self._written += len(batch)
+                        self._batches += 1
+                except asyncio.CancelledError:
+                    # Cancelled mid-write - keep the rows for whoever flushes next. Once committed
+                    # (e.g. cancelled while the session closed) they are in, and re-queueing would insert them twice
+                    if not committed:
+                        self._buffer.extendleft(reversed(batch))
+                    raise
+                except Exception as e:
+                    if committed:
+                        logger.warning(f"Chat history session close failed after writing {len(batch)} messages: {e}")
+                        continue
+                    # Back to the front, in order; retried on the next flush
+                    self._buffer.extendleft(reversed(batch))
+                    self._failed_batches += 1
+                    logger.warning(f"Chat history write of {len(batch)} messages failed: {e}")
+                    break
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Buffer depth and write counters for health/inspection endpoints"""
+        return {
+            "buffered": len(self._buffer),
+            "written": self._written,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "dropped": self._dropped,
+            "batch_size": self.batch_size,
+            "flush_ms": round(self.flush_interval * 1000)
+        }
+
+
+# Global chat history writer instance
+chat_history_writer = ChatHistoryWriter()
@@ -0,0 +1,180 @@
+"""
+Server-side multi-turn chat sessions with compacted history
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.core.deadline import request_deadline
+from app.services.openai_client import estimate_tokens
+from app.services.summarizer import summarizer
+
+logger = logging.getLogger(__name__)
+
+
+class ChatSession:
+    """One conversation: a rolling summary of older turns plus the recent turns verbatim"""
+
+    def __init__(
+        self,
+        user_id: Optional[int] = None,
+        language: Optional[str] = None,
+        model: Optional[str] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.language = language
+        self.model = model
+        self.summary = ""
+        # [{"role": "user" | "assistant", "text": ...}]
+        self.turns: List[Dict[str, str]] = []
+        self.turn_count = 0
+        self.compactions = 0
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        # Serializes turns and compaction so history is never read half-updated
+        self.lock = asyncio.Lock()
+
+    def add_turn(self, role: str, text: str) -> None:
+        self.turns.append({"role": role, "text": text})
+        if role == "user":
+            self.turn_count += 1
+
+    @staticmethod
+    def render_turns(turns: List[Dict[str, str]]) -> str:
+        return "\n".join(f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['text']}" for t in turns)
+
+    def history_text(self) -> str:
+        """History block for the prompt: summary of older turns, then recent turns"""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the conversation so far: {self.summary}")
+        if self.turns:
+            parts.append(self.render_turns(self.turns))
+        return "\n\n".join(parts)
+
+    @property
+    def history_tokens(self) -> int:
+        return estimate_tokens(self.history_text())
+
+
+class ChatSessionStore:
+    """
+    In-process session store with LRU eviction and an idle TTL.
+
+    When a session's history goes over max_history_tokens, every turn but
+    the last keep_turns is folded into the rolling summary (Gemini within
+    the auto-mode latency budget, extractive otherwise). The prompt then
+    carries at most one summary plus a few recent turns, so its size stays
+    roughly constant however long the conversation runs.
+
+    Sessions live in this process only; they are lost on restart and not
+    shared between workers.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_history_tokens: Optional[int] = None,
+        keep_turns: Optional[int] = None
+    ):
+        self.max_sessions = max_sessions or settings.CHAT_SESSION_MAX
+        self.ttl_seconds = ttl_seconds or settings.CHAT_SESSION_TTL
+        self.max_history_tokens = max_history_tokens or settings.CHAT_HISTORY_MAX_TOKENS
+        self.keep_turns = keep_turns or settings.CHAT_HISTORY_KEEP_TURNS
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._created = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._compactions = 0
+
+    def create(
+        self,
+        user_id: Optional[int] = None,
+        language: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> ChatSession:
+        """Start a session, evicting the least recently used one if the store is full"""
+        self._purge_expired()
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._evictions += 1
+        session = ChatSession(user_id=user_id, language=language, model=model)
+        self._sessions[session.id] = session
+        self._created += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Look up a live session and mark it recently used"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.last_active > self.ttl_seconds:
+            del self._sessions[session_id]
+            self._expirations += 1
+            return None
+        session.last_active = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def _purge_expired(self) -> None:
+        # Oldest-used sessions sit at the front, so stop at the first live one
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self._expirations += 1
+
+    def needs_compaction(self, session: ChatSession) -> bool:
+        return len(session.turns) > self.keep_turns and session.history_tokens > self.max_history_tokens
+
+    async def compact(self, session: ChatSession) -> None:
+        """Fold all but the most recent turns into the session's rolling summary (call with session.lock held)"""
+        if not self.needs_compaction(session):
+            return
+        older, recent = session.turns[:-self.keep_turns], session.turns[-self.keep_turns:]
+        transcript = session.render_turns(older)
+        if session.summary:
+            transcript = f"Earlier in the conversation: {session.summary}\n{transcript}"
+        try:
+            result = await summarizer.summarize(transcript, mode="auto")
+            session.summary = result["summary"]
+        except Exception as e:
+            # Keep the old summary and drop the older turns anyway, so history stays bounded
+            logger.warning(f"Compacting chat session {session.id} failed: {e}")
+        session.turns = recent
+        session.compactions += 1
+        self._compactions += 1
+
+    async def compact_in_background(self, session: ChatSession) -> None:
+        """Compaction after a reply has been sent; the session's next turn waits for it"""
+        # Runs after the response, so the request's deadline no longer applies
+        with request_deadline(None):
+            async with session.lock:
+                await self.compact(session)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Store counters for health/inspection endpoints"""
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "created": self._created,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "compactions": self._compactions
+        }
+
+
+# Global chat session store instance
+chat_session_store = ChatSessionStore()
@@ -0,0 +1,245 @@
+"""
+WebSocket chat: one connection per conversation, replies streamed as frames
+"""
+import asyncio
+import itertools
+import time
+from typing import Any, Dict, Optional, Set
+import logging
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core.config import settings
+from app.services.chat_history import chat_history_writer
+from app.services.chat_sessions import ChatSession, chat_session_store
+from app.services.gemini_executor import ExecutorSaturatedError
+from app.services.memory_context import memory_context
+from app.services.openai_client import openai_client
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to a client that stops reading (1013 = try again later)
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+class SlowClientError(Exception):
+    """The client has not read its frames within the send timeout"""
+
+
+class ChatConnection:
+    """
+    One open chat WebSocket bound to a chat session.
+
+    A receive loop reads client frames while at most one generation runs
+    as a separate task, so a new message (or a cancel frame) can stop the
+    reply in progress. Cancelling the task closes the Gemini stream, which
+    frees the executor slot and stops the upstream generation instead of
+    paying for tokens nobody will read.
+
+    Outgoing frames go through a bounded queue drained by a single sender
+    task. When the client reads slowly the queue fills and the generation
+    waits for room, so tokens are pulled from Gemini no faster than the
+    client takes them. A client that reads nothing for send_timeout seconds
+    has its generation stopped and the connection closed.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session: ChatSession,
+        manager: "ChatSocketManager"
+    ):
+        self.websocket = websocket
+        self.session = session
+        self.manager = manager
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=manager.send_queue_size)
+        self._generation: Optional[asyncio.Task] = None
+        self._generation_id: Optional[str] = None
+        self._ids = itertools.count(1)
+
+    async def serve(self) -> None:
+        """Run the connection until the client disconnects"""
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self.send({
+                "type": "session",
+                "session_id": self.session.id,
+                "turn_count": self.session.turn_count
+            })
+            await self._receive_loop()
+        except (WebSocketDisconnect, SlowClientError):
+            pass
+        finally:
+            await self._cancel_generation(notify=False)
+            sender.cancel()
+            await asyncio.gather(sender, return_exceptions=True)
+
+    async def send(self, frame: Dict[str, Any]) -> None:
+        """Queue a frame for the client, waiting while the client is behind"""
+        if not self._outbox.full():
+            self._outbox.put_nowait(frame)
+            return
+        # asyncio.wait rather than wait_for: wait_for can swallow a cancel that
+        # lands as the put completes, and cancels must always stop the generation
+        put = asyncio.ensure_future(self._outbox.put(frame))
+        try:
+            done, _ = await asyncio.wait({put}, timeout=self.manager.send_timeout)
+        finally:
+            if not put.done():
+                put.cancel()
+        if not done:
+            raise SlowClientError(f"client read nothing for {self.manager.send_timeout}s")
+
+    async def _send_loop(self) -> None:
+        while True:
+            frame = await self._outbox.get()
+            try:
+                await self.websocket.send_json(frame)
+            except Exception:
+                # Connection is gone - nobody is left to read the reply
+                await self._cancel_generation(notify=False)
+                return
+
+    async def _receive_loop(self) -> None:
+        while True:
+            try:
+                frame = await self.websocket.receive_json()
+            except (ValueError, KeyError):
+                await self.send({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+            if not isinstance(frame, dict):
+                await self.send({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+
+            kind = frame.get("type", "message")
+            if kind == "cancel":
+                await self._cancel_generation()
+            elif kind == "message":
+                message = str(frame.get("message") or "").strip()
+                if not message:
+                    await self.send({"type": "error", "detail": "Message is empty"})
+                    continue
+                # A new message supersedes the reply still being generated
+                await self._cancel_generation()
+                self._generation_id = str(frame.get("id") or next(self._ids))
+                self._generation = asyncio.create_task(self._generate(self._generation_id, message))
+            else:
+                await self.send({"type": "error", "detail": f"Unknown frame type: {kind}"})
+
+    async def _cancel_generation(self, notify: bool = True) -> None:
+        task, generation_id = self._generation, self._generation_id
+        self._generation = self._generation_id = None
+        if task is None or task.done():
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.manager._cancelled += 1
+        if notify:
+            await self.send({"type": "cancelled", "id": generation_id})
+
+    async def _generate(self, generation_id: str, message: str) -> None:
+        start_time = time.time()
+        session = self.session
+        ttft_ms = None
+        chunks = []
+        # Filled in by stream_message with the model that actually answered
+        served = {"model": session.model}
+        try:
+            # Waits for a background compaction of this session to finish
+            async with session.lock:
+                context = await memory_context.build_for_chat(session.user_id, message)
+                async for text in openai_client.stream_message(
+                    message=message,
+                    language=session.language,
+                    model=session.model,
+                    context=context["text"],
+                    history=session.history_text(),
+                    served=served
+                ):
+                    if ttft_ms is None:
+                        ttft_ms = (time.time() - start_time) * 1000
+                    chunks.append(text)
+                    await self.send({"type": "token", "id": generation_id, "text": text})
+
+                # Only finished replies become history; cancelled ones are dropped
+                reply = "".join(chunks)
+                session.add_turn("user", message)
+                session.add_turn("assistant", reply)
+                chat_history_writer.record_exchange(
+                    message, reply, user_id=session.user_id, session_id=session.id, model=served["model"]
+                )
+                if chat_session_store.needs_compaction(session):
+                    self.manager.run_in_background(chat_session_store.compact_in_background(session))
+
+            await self.send({
+                "type": "done",
+                "id": generation_id,
+                "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+                "latency_ms": round((time.time() - start_time) * 1000, 2),
+                "model_used": served["model"],
+                "language": session.language or "en",
+                "memories_used": context["memory_ids"],
+                "turn_count": session.turn_count
+            })
+        except SlowClientError as e:
+            self.manager._slow_clients += 1
+            logger.info(f"Closing chat socket for session {session.id}: {e}")
+            try:
+                await self.websocket.close(code=SLOW_CLIENT_CLOSE_CODE)
+            except Exception:
+                pass
+        except ExecutorSaturatedError as e:
+            await self.send({"type": "error", "id": generation_id, "detail": str(e), "status": 503})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming Gemini response over WebSocket: {e}")
+            await self.send({"type": "error", "id": generation_id, "detail": str(e)})
+
+
+class ChatSocketManager:
+    """Tracks open chat WebSockets and the background work they start"""
+
+    def __init__(
+        self,
+        send_queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None
+    ):
+        self.send_queue_size = send_queue_size or settings.CHAT_WS_SEND_QUEUE
+        self.send_timeout = send_timeout or settings.CHAT_WS_SEND_TIMEOUT
+        self._connections: Set[ChatConnection] = set()
+        # Strong references so background compactions are not garbage collected mid-run
+        self._background: Set[asyncio.Task] = set()
+        self._opened = 0
+        self._cancelled = 0
+        self._slow_clients = 0
+
+    async def serve(self, websocket: WebSocket, session: ChatSession) -> None:
+        """Handle one accepted WebSocket until it closes"""
+        connection = ChatConnection(websocket, session, self)
+        self._connections.add(connection)
+        self._opened += 1
+        try:
+            await connection.serve()
+        finally:
+            self._connections.discard(connection)
+
+    def run_in_background(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Connection counters for health/inspection endpoints"""
+        return {
+            "open": len(self._connections),
+            "opened": self._opened,
+            "generations_cancelled": self._cancelled,
+            "slow_clients_closed": self._slow_clients,
+            "send_queue_size": self.send_queue_size,
+            "send_timeout": self.send_timeout
+        }
+
+
+# Global chat socket manager instance
+chat_socket_manager = ChatSocketManager()
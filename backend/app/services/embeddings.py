@@ -0,0 +1,76 @@
+"""
+Local text embedders for the semantic memory index
+"""
+import zlib
+from abc import ABC, abstractmethod
+from typing import List
+import logging
+import numpy as np
+
+from app.core.config import settings
+from app.services.extractive_summarizer import STOPWORDS, WORD
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(ABC):
+    """
+    Interface for embedders: texts in, L2-normalized float32 rows out.
+
+    Vectors are stored in the index as they are produced, so an embedder
+    must be stateless - the same text always maps to the same vector.
+    Corpus-fitted models (e.g. TF-IDF with a learned vocabulary) would
+    invalidate every stored vector whenever they are refitted.
+    """
+
+    name = "base"
+    dim = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class HashingEmbedder(Embedder):
+    """
+    Feature-hashing embedder: content words and adjacent word pairs are
+    hashed into dim buckets with a hash-derived sign, weighted 1 + log(tf).
+    Needs no model files or network, and handles any vocabulary.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in WORD.findall(text.lower()) if w not in STOPWORDS]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+            unique, counts = np.unique(hashes, return_counts=True)
+            # Low bits pick the bucket, the top bit the sign, so collisions tend to cancel
+            weights = (1.0 + np.log(counts)) * np.where(unique >> 31, -1.0, 1.0)
+            np.add.at(vectors[row], (unique % self.dim).astype(np.int64), weights.astype(np.float32))
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+def create_embedder() -> Embedder:
+    """Build the embedder selected by EMBEDDER"""
+    name = settings.EMBEDDER.lower()
+    if name != "hashing":
+        logger.warning(f"Unknown EMBEDDER '{name}', using hashing embedder")
+    return HashingEmbedder(dim=settings.EMBEDDING_DIM)
+
+
+# Global embedder instance
+embedder = create_embedder()
@@ -0,0 +1,111 @@
+"""
+Learned endpoint variants for upstream APIs with several possible paths
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded
+from app.services.resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointResolver:
+    """
+    Remembers which endpoint variant works for each operation.
+
+    Some Vapi operations have several candidate paths (e.g. /call/{id},
+    /v1/call/{id}, /call/phone/{id}). The first call probes them in order;
+    the variant that answers is cached per operation for ttl seconds and
+    tried first from then on, so a steady caller such as status polling
+    costs one request instead of up to three.
+
+    The other variants are probed again only when the known-good one
+    fails. The cache moves to a different variant only if that one
+    succeeds: when every variant fails (e.g. an unknown call id) the
+    known-good answer is kept.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl or settings.VAPI_ENDPOINT_CACHE_TTL
+        self._known: Dict[str, Tuple[str, float]] = {}  # operation -> (variant template, learned at)
+        self._calls = 0
+        self._hits = 0
+        self._reprobes = 0
+        self._requests = 0
+
+    def _order(self, operation: str, variants: List[str]) -> Tuple[List[str], Optional[str]]:
+        """Variants to try, known-good first; also returns the known-good variant (None if unknown or expired)"""
+        known = self._known.get(operation)
+        if known is None or time.monotonic() - known[1] > self.ttl or known[0] not in variants:
+            return list(variants), None
+        return [known[0]] + [v for v in variants if v != known[0]], known[0]
+
+    async def call(
+        self,
+        operation: str,
+        variants: List[str],
+        attempt: Callable[[str], Awaitable[Any]],
+        **path_params: Any
+    ) -> Any:
+        """
+        Run attempt(path) over the operation's variants until one succeeds.
+        variants are path templates filled with path_params; raises the last
+        error if every variant fails.
+        """
+        self._calls += 1
+        order, known = self._order(operation, variants)
+        last_error: Optional[Exception] = None
+        for index, template in enumerate(order):
+            if index == 1 and known is not None:
+                self._reprobes += 1
+                logger.info(f"Known endpoint {known} for {operation} failed ({last_error}), probing alternatives")
+            self._requests += 1
+            try:
+                result = await attempt(template.format(**path_params))
+            except (DeadlineExceeded, CircuitOpenError):
+                # No time left, or the upstream is down - the other variants would fail the same way
+                raise
+            except Exception as e:
+                last_error = e
+                continue
+            if index == 0 and known is not None:
+                self._hits += 1
+            elif template != known:
+                logger.info(f"Learned endpoint {template} for {operation}")
+            self._known[operation] = (template, time.monotonic())
+            return result
+        raise last_error or Exception(f"No endpoint variants for {operation}")
+
+    def forget(self, operation: Optional[str] = None) -> None:
+        """Drop the learned variant for one operation, or all of them"""
+        if operation is None:
+            self._known.clear()
+        else:
+            self._known.pop(operation, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Learned variants and hit/re-probe counters for health/inspection endpoints"""
+        now = time.monotonic()
+        return {
+            "ttl_seconds": self.ttl,
+            "calls": self._calls,
+            "known_good_hits": self._hits,
+            "reprobes": self._reprobes,
+            # Upstream requests per call - 1.0 once every operation is learned
+            "requests_per_call": round(self._requests / self._calls, 3) if self._calls else 0.0,
+            "endpoints": {
+                operation: {
+                    "variant": template,
+                    "age_seconds": round(now - learned_at, 1),
+                    "expired": now - learned_at > self.ttl
+                }
+                for operation, (template, learned_at) in self._known.items()
+            }
+        }
+
+
+# Global Vapi endpoint resolver instance
+vapi_endpoints = EndpointResolver()
@@ -0,0 +1,107 @@
+"""
+Local extractive summarizer (TF-IDF centroid sentence scoring with NumPy)
+"""
+import re
+from typing import Dict, List, Tuple
+import numpy as np
+
+# A sentence runs up to end punctuation or a line break
+SENTENCE = re.compile(r"[^.!?\n]+[.!?]*")
+SPEAKER_LABEL = re.compile(r"^[ \t]*[A-Za-z][\w .'-]{0,40}:[ \t]*", re.MULTILINE)
+# Content words of two or more characters
+WORD = re.compile(r"[a-z0-9']{2,}")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just let me more
+most my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves yeah yes ok okay oh um uh like really well got get gonna
+""".split())
+
+# Sentences shorter than this (in content words) are never picked
+MIN_SENTENCE_TERMS = 3
+
+
+class ExtractiveSummarizer:
+    """
+    Picks the most representative sentences of a transcript without an LLM.
+
+    Each sentence becomes a TF-IDF vector; sentences are scored by cosine
+    similarity to the whole-document centroid and the top ones are returned
+    in their original order. Everything after tokenization is vectorized,
+    so a 10k-word transcript takes a few milliseconds.
+    """
+
+    def __init__(self, max_sentences: int = 3):
+        self.max_sentences = max_sentences
+
+    def _sentences(self, transcript: str) -> List[str]:
+        text = SPEAKER_LABEL.sub("", transcript)
+        return [s for s in (raw.strip() for raw in SENTENCE.findall(text)) if s]
+
+    def _term_matrix(self, sentences: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """Sparse (sentence, term, count) triples for all content words"""
+        vocab: Dict[str, int] = {}
+        intern = vocab.setdefault
+        term_ids: List[int] = []
+        lengths: List[int] = []
+        for sentence in sentences:
+            words = [w for w in WORD.findall(sentence.lower()) if w not in STOPWORDS]
+            # setdefault assigns the next id to unseen words
+            term_ids.extend([intern(w, len(vocab)) for w in words])
+            lengths.append(len(words))
+        sentence_ids = np.repeat(np.arange(len(sentences), dtype=np.int64), lengths)
+
+        vocab_size = len(vocab)
+        if not vocab_size:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float64), 0
+
+        # Collapse repeated (sentence, term) pairs into counts
+        pairs = sentence_ids * vocab_size + np.asarray(term_ids, dtype=np.int64)
+        unique_pairs, counts = np.unique(pairs, return_counts=True)
+        return unique_pairs // vocab_size, unique_pairs % vocab_size, counts.astype(np.float64), vocab_size
+
+    def score_sentences(self, sentences: List[str]) -> np.ndarray:
+        """Cosine similarity of each sentence's TF-IDF vector to the document centroid"""
+        n = len(sentences)
+        rows, cols, tf, vocab_size = self._term_matrix(sentences)
+        if not vocab_size:
+            return np.zeros(n)
+
+        df = np.bincount(cols, minlength=vocab_size)
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        weights = tf * idf[cols]
+
+        centroid = np.bincount(cols, weights=weights, minlength=vocab_size)
+        dots = np.bincount(rows, weights=weights * centroid[cols], minlength=n)
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+        terms_per_sentence = np.bincount(rows, minlength=n)
+
+        scores = np.divide(dots, norms * np.linalg.norm(centroid), out=np.zeros(n), where=norms > 0)
+        scores[terms_per_sentence < MIN_SENTENCE_TERMS] = 0.0
+        return scores
+
+    def summarize(self, transcript: str, max_sentences: int = 0) -> str:
+        """Return the top-scoring sentences, in transcript order"""
+        sentences = self._sentences(transcript)
+        if not sentences:
+            return ""
+
+        k = max_sentences or self.max_sentences
+        if len(sentences) <= k:
+            return " ".join(sentences)
+
+        scores = self.score_sentences(sentences)
+        if not scores.any():
+            return " ".join(sentences[:k])
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        return " ".join(sentences[i] for i in sorted(top))
+
+
+# Global extractive summarizer instance
+extractive_summarizer = ExtractiveSummarizer()
@@ -0,0 +1,117 @@
+"""
+Dedicated, bounded executor for Gemini calls
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when every Gemini slot is busy and the wait queue is full (or the wait timed out)"""
+
+
+class GeminiExecutor:
+    """
+    Admission control plus a private thread pool for Gemini SDK calls.
+
+    At most max_workers calls run at once; up to max_queue more may wait for
+    a slot, for no longer than queue_timeout seconds. Anything beyond that is
+    rejected with ExecutorSaturatedError instead of queueing forever.
+    Native async SDK calls take a slot too, so the limit covers both paths.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None
+    ):
+        self.max_workers = max_workers or settings.GEMINI_MAX_CONCURRENCY
+        self.max_queue = max_queue if max_queue is not None else settings.GEMINI_MAX_QUEUE
+        self.queue_timeout = queue_timeout or settings.GEMINI_QUEUE_TIMEOUT
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gemini")
+        self._slots = asyncio.Semaphore(self.max_workers)
+        # Metrics
+        self._active = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._admitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one Gemini concurrency slot for the duration of the block"""
+        if self._active + self._queued >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise ExecutorSaturatedError(
+                f"Gemini is busy ({self._active} running, {self._queued} queued). Please retry shortly."
+            )
+
+        self._queued += 1
+        self._peak_queued = max(self._peak_queued, self._queued)
+        enqueued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise ExecutorSaturatedError(
+                f"Timed out after {self.queue_timeout}s waiting for a free Gemini slot. Please retry shortly."
+            )
+        finally:
+            self._queued -= 1
+
+        self._admitted += 1
+        self._total_wait += time.monotonic() - enqueued_at
+        self._active += 1
+        try:
+            yield
+            self._completed += 1
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            self._active -= 1
+            self._slots.release()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future":
+        """Run fn on the Gemini thread pool; the caller must already hold a slot"""
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self._pool, fn, *args)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Acquire a slot and run a blocking SDK call on the Gemini thread pool"""
+        async with self.slot():
+            return await self.submit(fn, *args)
+
+    def shutdown(self) -> None:
+        """Stop the thread pool, dropping calls that have not started"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput counters for health/inspection endpoints"""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "peak_queue_depth": self._peak_queued,
+            "admitted": self._admitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_queue_wait_ms": round(self._total_wait / self._admitted * 1000, 2) if self._admitted else 0.0
+        }
+
+
+# Global executor instance
+gemini_executor = GeminiExecutor()
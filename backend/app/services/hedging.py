@@ -0,0 +1,107 @@
+"""
+Hedged Gemini requests: when to send a backup call and how many are allowed
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Recent generation latencies the hedge delay is computed from
+LATENCY_WINDOW = 500
+
+# No hedging until this many latencies have been seen - the percentile would be noise
+MIN_SAMPLES = 20
+
+# Unused hedge credit that may pile up during quiet periods (in hedges)
+MAX_CREDIT = 2.0
+
+
+class HedgePolicy:
+    """
+    Decides when a slow Gemini generation gets a backup request.
+
+    The hedge delay is the configured percentile of recent generation
+    latencies: a call still running past it is in the slow tail, so a
+    second call is sent and whichever answers first wins.
+
+    Hedges are paid for out of a budget. Each request earns `budget`
+    credit (0.05 = one hedge per 20 requests), a hedge spends one, and at
+    most MAX_CREDIT can be saved up. Extra load from hedging therefore
+    stays under the budget even when Gemini slows down across the board,
+    when every call would otherwise qualify.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        percentile: Optional[float] = None,
+        budget: Optional[float] = None,
+        min_delay_ms: Optional[float] = None
+    ):
+        self.enabled = settings.GEMINI_HEDGE_ENABLED if enabled is None else enabled
+        self.percentile = percentile or settings.GEMINI_HEDGE_PERCENTILE
+        self.budget = budget if budget is not None else settings.GEMINI_HEDGE_BUDGET
+        self.min_delay_ms = min_delay_ms if min_delay_ms is not None else settings.GEMINI_HEDGE_MIN_DELAY_MS
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._credit = 0.0
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._primary_wins = 0
+        self._denied = 0
+
+    def record_latency(self, latency_ms: float) -> None:
+        """Add the latency of a successful generation"""
+        self._latencies.append(latency_ms)
+
+    def delay_ms(self) -> Optional[float]:
+        """How long to wait for the primary before hedging (None while there is too little data)"""
+        if len(self._latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(ordered[index], self.min_delay_ms)
+
+    def start_request(self) -> None:
+        """Count a hedge-eligible request and earn its share of the budget"""
+        self._requests += 1
+        self._credit = min(MAX_CREDIT, self._credit + self.budget)
+
+    def try_acquire(self) -> bool:
+        """Spend budget for one hedge; False when the budget is used up"""
+        if self._credit >= 1.0:
+            self._credit -= 1.0
+            self._hedged += 1
+            return True
+        self._denied += 1
+        return False
+
+    def record_winner(self, hedge_won: bool) -> None:
+        if hedge_won:
+            self._hedge_wins += 1
+        else:
+            self._primary_wins += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hedge rate, wins and the current delay for health/inspection endpoints"""
+        delay = self.delay_ms()
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "budget": self.budget,
+            "delay_ms": round(delay, 1) if delay is not None else None,
+            "samples": len(self._latencies),
+            "requests": self._requests,
+            "hedged": self._hedged,
+            "hedge_rate": round(self._hedged / self._requests, 4) if self._requests else 0.0,
+            "hedge_wins": self._hedge_wins,
+            "primary_wins": self._primary_wins,
+            "denied_by_budget": self._denied
+        }
+
+
+# Global hedge policy instance
+hedge_policy = HedgePolicy()
@@ -0,0 +1,140 @@
+"""
+Shared, pooled HTTP clients for upstream APIs
+"""
+from typing import Any, Dict, Optional
+import logging
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install h2)
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Methods safe to retry - repeating them cannot create a second call or clone
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def is_upstream_error(response: httpx.Response) -> bool:
+    """Responses that mean the upstream is struggling (not that the request was wrong)"""
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class UpstreamStats:
+    """Request and connection-setup counters for one upstream client"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connects = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        # httpcore reports connection setup through the trace extension
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connects += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+
+class HTTPClientPool:
+    """
+    One long-lived httpx.AsyncClient per upstream (e.g. "vapi").
+
+    Clients keep connections alive between requests, so repeat calls skip
+    the TCP and TLS handshake. They are created on first use, so services
+    work outside the app lifespan too (scripts, benchmarks), and closed on
+    shutdown; a client used after close() is simply recreated.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive or settings.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=keepalive_expiry or settings.HTTP_POOL_KEEPALIVE_EXPIRY
+        )
+        http2 = settings.HTTP_POOL_HTTP2 if http2 is None else http2
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP_POOL_HTTP2 is set but the h2 package is not installed - using HTTP/1.1")
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = settings.API_TIMEOUT
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, UpstreamStats] = {}
+
+    def get(self, upstream: str) -> httpx.AsyncClient:
+        """The shared client for an upstream, created on first use"""
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            stats = self._stats.setdefault(upstream, UpstreamStats())
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                event_hooks={"request": [stats.on_request]}
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def close(self) -> None:
+        """Close every client and its pooled connections (app shutdown)"""
+        for upstream, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client for {upstream}: {e}")
+        self._clients.clear()
+
+    def _pool_state(self, client: httpx.AsyncClient) -> Dict[str, Any]:
+        # httpx does not expose its connection pool, so read httpcore's defensively
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-upstream requests, handshakes, connection reuse and pool utilization"""
+        upstreams = {}
+        for upstream, stats in self._stats.items():
+            client = self._clients.get(upstream)
+            state = self._pool_state(client) if client is not None and not client.is_closed else {
+                "connections": 0, "active_connections": 0, "idle_connections": 0
+            }
+            upstreams[upstream] = {
+                "requests": stats.requests,
+                "connects": stats.connects,
+                "tls_handshakes": stats.tls_handshakes,
+                # Share of requests that rode an existing connection
+                "connection_reuse_rate": round(1 - stats.connects / stats.requests, 4) if stats.requests else 0.0,
+                **state,
+                "utilization": round(state["active_connections"] / self.limits.max_connections, 4)
+            }
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "upstreams": upstreams
+        }
+
+
+# Global HTTP client pool instance
+http_clients = HTTPClientPool()
@@ -0,0 +1,149 @@
+"""
+Memory context for chat prompts (retrieval-augmented generation)
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+from sqlalchemy import desc, select
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Memory
+from app.services.openai_client import CHARS_PER_TOKEN, estimate_tokens
+from app.services.vector_index import VectorIndex, memory_index
+
+logger = logging.getLogger(__name__)
+
+# Per-memory line overhead ("- " prefix and newline), in estimated tokens
+LINE_OVERHEAD_TOKENS = 2
+
+
+class MemoryContextBuilder:
+    """
+    Builds the "what you remember about this person" block for a chat prompt.
+
+    The message is embedded and matched against the user's memory summaries
+    in the vector index (never a scan of the memories table); when nothing
+    matches, the user's most recent memories are used via the
+    (user_id, created_at) index instead. Summaries are added best-first
+    until the token budget is spent, so prompt size stays bounded no
+    matter how many memories a user has.
+
+    Assembled contexts are cached per user and memory set. Consecutive chat
+    turns usually retrieve the same memories, so the database fetch and
+    assembly are skipped; a user's entries go stale as soon as the index
+    records a change to their memories.
+    """
+
+    def __init__(
+        self,
+        index: VectorIndex,
+        top_k: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        recent: Optional[int] = None,
+        cache_size: Optional[int] = None
+    ):
+        self.index = index
+        self.top_k = top_k or settings.CHAT_MEMORY_TOP_K
+        self.token_budget = token_budget or settings.CHAT_MEMORY_TOKEN_BUDGET
+        self.recent = recent if recent is not None else settings.CHAT_MEMORY_RECENT
+        self.cache_size = cache_size or settings.CHAT_CONTEXT_CACHE_SIZE
+        self._cache: "OrderedDict[Tuple[int, int, Tuple[int, ...]], Dict[str, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def _fit(self, summaries: List[Tuple[int, str]]) -> Tuple[List[int], List[str], int]:
+        """Take (memory_id, summary) pairs in order while they fit the token budget"""
+        kept: List[int] = []
+        lines: List[str] = []
+        used = 0
+        for memory_id, summary in summaries:
+            text = " ".join(summary.split())
+            tokens = estimate_tokens(text) + LINE_OVERHEAD_TOKENS
+            if used + tokens > self.token_budget:
+                if lines:
+                    continue  # a shorter, lower-ranked summary may still fit
+                # Even the best match alone is over budget - keep its beginning
+                text = text[:max(0, (self.token_budget - LINE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN)].rstrip() + "…"
+                tokens = self.token_budget
+            kept.append(memory_id)
+            lines.append(text)
+            used += tokens
+        return kept, lines, used
+
+    async def _recent_ids(self, user_id: int) -> List[int]:
+        if not self.recent:
+            return []
+        async with AsyncSessionLocal() as db:
+            rows = await db.scalars(
+                select(Memory.id)
+                .where(Memory.user_id == user_id)
+                .order_by(desc(Memory.created_at), desc(Memory.id))
+                .limit(self.recent)
+            )
+            return list(rows)
+
+    async def build(self, user_id: int, message: str) -> Dict[str, Any]:
+        """
+        Returns {"text", "memory_ids", "tokens", "cached"}; text is "" when
+        the user has no memories.
+        """
+        version = self.index.user_version(user_id)
+        hits = [memory_id for memory_id, score in self.index.search(user_id, message, self.top_k) if score > 0]
+        memory_ids = tuple(hits) or tuple(await self._recent_ids(user_id))
+        if not memory_ids:
+            return {"text": "", "memory_ids": [], "tokens": 0, "cached": False}
+
+        key = (user_id, version, memory_ids)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self._hits += 1
+            return {**cached, "cached": True}
+        self._misses += 1
+
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(Memory.id, Memory.summary).where(Memory.id.in_(memory_ids))
+            )
+            summaries = {row.id: row.summary for row in rows}
+
+        kept, lines, tokens = self._fit([
+            (memory_id, summaries[memory_id]) for memory_id in memory_ids if summaries.get(memory_id)
+        ])
+        context = {
+            "text": "\n".join(f"- {line}" for line in lines),
+            "memory_ids": kept,
+            "tokens": tokens
+        }
+
+        self._cache[key] = context
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return {**context, "cached": False}
+
+    async def build_for_chat(self, user_id: Optional[int], message: str) -> Dict[str, Any]:
+        """build(), or an empty context when there is no user or retrieval fails - chat goes on without memories"""
+        if user_id is None:
+            return {"text": "", "memory_ids": [], "tokens": 0, "cached": False}
+        try:
+            return await self.build(user_id, message)
+        except Exception as e:
+            logger.warning(f"Memory retrieval failed for user {user_id}: {e}")
+            return {"text": "", "memory_ids": [], "tokens": 0, "cached": False}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Context cache counters for health/inspection endpoints"""
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._cache),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "token_budget": self.token_budget,
+            "top_k": self.top_k
+        }
+
+
+# Global memory context builder instance
+memory_context = MemoryContextBuilder(memory_index)
@@ -0,0 +1,136 @@
+"""
+Full-text search over memories (SQLite FTS5, see migration 3)
+"""
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import DateTime, Float, Integer, String, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Runs of letters/digits; everything else (FTS operators, quotes, brackets) is dropped
+SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+# Control characters mark matches in snippet() output; swapped for <mark> after HTML escaping
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+# Matches in the summary count double relative to the transcript
+SUMMARY_WEIGHT = 2.0
+TRANSCRIPT_WEIGHT = 1.0
+
+# Tokens of context per snippet
+SNIPPET_TOKENS = 16
+
+# Phase 1: rank every match, keep one page. Snippets are not computed here -
+# snippet() re-tokenizes the whole transcript, which is the expensive part
+RANK_SQL = text(f"""
+SELECT id, rank
+FROM (
+    SELECT m.id AS id, bm25(memories_fts, {SUMMARY_WEIGHT}, {TRANSCRIPT_WEIGHT}) AS rank
+    FROM memories_fts
+    JOIN memories m ON m.id = memories_fts.rowid
+    WHERE memories_fts MATCH :match AND m.user_id = :user_id
+)
+WHERE :after_rank IS NULL OR rank > :after_rank OR (rank = :after_rank AND id > :after_id)
+ORDER BY rank, id
+LIMIT :limit
+""").columns(id=Integer, rank=Float)
+
+# Phase 2: row data and highlighted snippets for just that page
+PAGE_SQL = text(f"""
+SELECT
+    m.id AS id,
+    m.assistant_id AS assistant_id,
+    m.created_at AS created_at,
+    m.summary AS summary,
+    snippet(memories_fts, 0, :start, :end, '…', {SNIPPET_TOKENS}) AS summary_snippet,
+    snippet(memories_fts, 1, :start, :end, '…', {SNIPPET_TOKENS}) AS transcript_snippet
+FROM memories_fts
+JOIN memories m ON m.id = memories_fts.rowid
+WHERE memories_fts MATCH :match AND memories_fts.rowid IN :ids
+""").bindparams(bindparam("ids", expanding=True)).columns(
+    id=Integer,
+    assistant_id=String,
+    created_at=DateTime,
+    summary=String,
+    summary_snippet=String,
+    transcript_snippet=String
+)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix so results update while typing. Returns None if the
+    query has no searchable words.
+    """
+    terms = SEARCH_TERM.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a snippet and wrap matched terms in <mark>"""
+    if snippet is None:
+        return None
+    if MATCH_START not in snippet:
+        # No match in this column - snippet() just returns the start of the text
+        return None
+    return html.escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+class MemorySearch:
+    """
+    BM25-ranked search over a user's memory summaries and transcripts.
+
+    Results come back best match first; rank ties are broken by memory id
+    so (rank, id) is a stable keyset cursor for the next page.
+    """
+
+    async def search(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        match: str,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """One page of results for an FTS5 match expression (see build_match_query)"""
+        after_rank, after_id = after if after else (None, None)
+        ranked = (await db.execute(RANK_SQL, {
+            "match": match,
+            "user_id": user_id,
+            "after_rank": after_rank,
+            "after_id": after_id,
+            "limit": limit
+        })).all()
+        if not ranked:
+            return []
+
+        rows = await db.execute(PAGE_SQL, {
+            "match": match,
+            "ids": [row.id for row in ranked],
+            "start": MATCH_START,
+            "end": MATCH_END
+        })
+        by_id = {row.id: row for row in rows}
+        return [
+            {
+                "id": hit.id,
+                "assistant_id": by_id[hit.id].assistant_id,
+                "created_at": by_id[hit.id].created_at,
+                "summary": by_id[hit.id].summary,
+                "rank": hit.rank,
+                "summary_snippet": highlight(by_id[hit.id].summary_snippet),
+                "transcript_snippet": highlight(by_id[hit.id].transcript_snippet)
+            }
+            for hit in ranked
+            if hit.id in by_id
+        ]
+
+
+# Global memory search instance
+memory_search = MemorySearch()
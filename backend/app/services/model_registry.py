@@ -0,0 +1,172 @@
+"""
+Gemini model registry - discovers available models once and caches model instances
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+from app.services.gemini_executor import gemini_executor
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Try to import google.generativeai - will fail gracefully if not installed
+try:
+    import google.generativeai as genai
+    GEMINI_SDK_AVAILABLE = True
+except ImportError:
+    GEMINI_SDK_AVAILABLE = False
+
+# Priority order for models to try
+PREFERRED_MODELS = [
+    'models/gemini-2.5-flash',  # Best - newest and fastest
+    'models/gemini-2.0-flash-exp',  # Experimental but good
+    'models/gemini-2.5-pro',  # Pro version
+    'models/gemini-1.5-flash',  # Fallback
+    'models/gemini-1.5-pro',  # Pro fallback
+    'models/gemini-pro'  # Old fallback
+]
+
+# How soon to retry discovery after a failed refresh (seconds)
+FAILED_REFRESH_RETRY_SECONDS = 60
+
+
+class ModelRegistry:
+    """
+    Keeps the list of Gemini models that support generateContent.
+
+    Models are listed once at startup and refreshed in the background,
+    so chat requests never pay for a list_models() round trip.
+    Constructed GenerativeModel instances are cached by name. Requested
+    model names come from clients, so only known names - discovered or in
+    PREFERRED_MODELS - are ever tried or cached; anything else falls back
+    to the preferred models.
+    """
+
+    def __init__(self, refresh_interval: Optional[int] = None):
+        self.refresh_interval = refresh_interval or settings.GEMINI_MODEL_REFRESH_SECONDS
+        self._available_models: List[str] = []
+        self._models: Dict[str, Any] = {}
+        self._last_refresh: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._refresh_count = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Discovery needs both the SDK and an API key"""
+        return GEMINI_SDK_AVAILABLE and bool(settings.GOOGLE_API_KEY.strip())
+
+    @property
+    def available_models(self) -> List[str]:
+        """Model names from the last successful discovery"""
+        return list(self._available_models)
+
+    async def start(self) -> None:
+        """Run the initial discovery and start the background refresh task"""
+        if not self.enabled:
+            logger.info("Model registry disabled - Gemini SDK or GOOGLE_API_KEY missing")
+            return
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Cancel the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def refresh(self) -> List[str]:
+        """List models from the API, keeping the previous list on failure"""
+        async with self._lock:
+            try:
+                models = await gemini_executor.run(
+                    lambda: [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+                )
+                self._available_models = models
+                self._last_error = None
+                self._refresh_count += 1
+                logger.info(f"Discovered {len(models)} Gemini models: {models[:5]}")
+            except Exception as e:
+                self._last_error = str(e)
+                logger.warning(f"Could not list models: {e}")
+            self._last_refresh = time.time()
+            return self.available_models
+
+    async def _refresh_loop(self) -> None:
+        """Refresh the model list every refresh_interval seconds"""
+        while True:
+            delay = self.refresh_interval
+            if self._last_error:
+                delay = min(delay, FAILED_REFRESH_RETRY_SECONDS)
+            await asyncio.sleep(delay)
+            await self.refresh()
+
+    def is_known(self, model_name: str) -> bool:
+        """Discovered or preferred - the only names that are tried, cached or tracked by the router"""
+        return model_name in self._available_models or model_name in PREFERRED_MODELS
+
+    def candidates(self, requested_model: str) -> List[str]:
+        """Build the ordered list of model names to try for a request"""
+        available_models = self._available_models
+        model_names_to_try = []
+
+        if available_models:
+            # Use exact model names from available models list
+            # Try requested model first
+            if requested_model in available_models:
+                model_names_to_try.append(requested_model)
+            elif f'models/{requested_model}' in available_models:
+                model_names_to_try.append(f'models/{requested_model}')
+
+            # Then try preferred models in order (if they're available)
+            for preferred in PREFERRED_MODELS:
+                if preferred in available_models and preferred not in model_names_to_try:
+                    model_names_to_try.append(preferred)
+
+            # If still nothing, use first available model
+            if not model_names_to_try:
+                model_names_to_try.append(available_models[0])
+        else:
+            # Fallback if discovery has not succeeded - the requested model if it is a known one, then common names
+            requested = [name for name in (f'models/{requested_model}', requested_model) if self.is_known(name)]
+            model_names_to_try = list(dict.fromkeys(
+                requested + ['models/gemini-2.5-flash', 'models/gemini-1.5-flash']
+            ))
+
+        return model_names_to_try
+
+    def get_model(self, model_name: str) -> Any:
+        """Return a cached GenerativeModel, constructing it on first use (unknown names are not cached)"""
+        model = self._models.get(model_name)
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            if not self.is_known(model_name):
+                return model
+            self._models[model_name] = model
+            logger.info(f"Initialized model: {model_name}")
+        return model
+
+    def get_state(self) -> Dict[str, Any]:
+        """Snapshot of registry state for health/inspection endpoints"""
+        return {
+            "enabled": self.enabled,
+            "available_models": self.available_models,
+            "cached_models": list(self._models.keys()),
+            "refresh_interval_seconds": self.refresh_interval,
+            "refresh_count": self._refresh_count,
+            "last_refresh": datetime.utcfromtimestamp(self._last_refresh).isoformat() if self._last_refresh else None,
+            "last_error": self._last_error,
+            "background_refresh": self._task is not None and not self._task.done()
+        }
+
+
+# Global registry instance
+model_registry = ModelRegistry()
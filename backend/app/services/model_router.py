@@ -0,0 +1,190 @@
+"""
+Adaptive Gemini model routing by observed latency and error rate
+"""
+import random
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Minimum outcomes before the error rate alone can trip a cooldown
+MIN_SAMPLES_FOR_ERROR_RATE = 5
+
+# Latency multiplier per unit of error rate when ranking (a model failing half its calls ranks as 2x slower)
+ERROR_RATE_PENALTY = 2.0
+
+
+class ModelStats:
+    """Exponentially weighted latency and error rate for one model"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.ewma_latency_ms: Optional[float] = None
+        self.ewma_error_rate = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldowns = 0  # Cooldowns since the last success; each one doubles the next
+        self.cooldown_until = 0.0
+        self.last_sample: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def samples(self) -> int:
+        return self.successes + self.failures
+
+    def cooling_down(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def score(self) -> float:
+        """Ranking key - lower is better; models without latency samples sort last"""
+        if self.ewma_latency_ms is None:
+            return float("inf")
+        return self.ewma_latency_ms * (1 + ERROR_RATE_PENALTY * self.ewma_error_rate)
+
+
+class ModelRouter:
+    """
+    Picks which Gemini model serves each request.
+
+    Every generation reports back its latency (measured inside the executor
+    slot, so queueing is not blamed on the model) or its failure. Per model
+    the router keeps an EWMA of latency and of the error rate, and ranks the
+    models allowed for a request - the registry's candidate list - fastest
+    first, with the error rate as a penalty. Models not measured yet follow
+    in candidate order. A model the caller asked for explicitly stays first
+    while it is healthy; only the fallbacks behind it are ranked.
+
+    A model that fails failure_threshold times in a row, or whose error rate
+    passes max_error_rate, is skipped for a cooldown that doubles with each
+    consecutive trip (up to max_cooldown). When it comes back the next
+    outcome decides: a success clears it, a failure sends it straight back.
+    A small share of requests (explore_rate) goes to the least recently
+    measured model, so recovered or never-used models get measured again.
+    If every allowed model is cooling down, the one recovering soonest is
+    still tried rather than failing the request outright.
+    """
+
+    def __init__(
+        self,
+        alpha: Optional[float] = None,
+        cooldown_seconds: Optional[float] = None,
+        max_cooldown_seconds: Optional[float] = None,
+        failure_threshold: Optional[int] = None,
+        max_error_rate: Optional[float] = None,
+        explore_rate: Optional[float] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.alpha = alpha or settings.MODEL_ROUTER_EWMA_ALPHA
+        self.cooldown_seconds = cooldown_seconds or settings.MODEL_ROUTER_COOLDOWN_SECONDS
+        self.max_cooldown_seconds = max_cooldown_seconds or settings.MODEL_ROUTER_MAX_COOLDOWN_SECONDS
+        self.failure_threshold = failure_threshold or settings.MODEL_ROUTER_FAILURE_THRESHOLD
+        self.max_error_rate = max_error_rate or settings.MODEL_ROUTER_MAX_ERROR_RATE
+        self.explore_rate = explore_rate if explore_rate is not None else settings.MODEL_ROUTER_EXPLORE_RATE
+        self.max_attempts = max_attempts or settings.MODEL_ROUTER_MAX_ATTEMPTS
+        self._models: Dict[str, ModelStats] = {}
+        self._routed = 0
+        self._explored = 0
+        self._failovers = 0
+
+    def _stats(self, model_name: str) -> ModelStats:
+        stats = self._models.get(model_name)
+        if stats is None:
+            stats = self._models[model_name] = ModelStats(model_name)
+        return stats
+
+    def route(self, candidates: List[str], requested: Optional[str] = None) -> List[str]:
+        """
+        Order the allowed models for one request: best first, then fallbacks.
+        requested (one of candidates) is kept first unless it is cooling down.
+        """
+        self._routed += 1
+        now = time.monotonic()
+        stats = [self._stats(name) for name in dict.fromkeys(candidates)]
+        healthy = [s for s in stats if not s.cooling_down(now)]
+        cooling = sorted((s for s in stats if s.cooling_down(now)), key=lambda s: s.cooldown_until)
+        pinned = [s for s in healthy if s.name == requested]
+        fallbacks = [s for s in healthy if s.name != requested]
+
+        # Stable sort keeps candidate order among unmeasured models
+        ranked = sorted(fallbacks, key=ModelStats.score)
+        if not pinned and len(ranked) > 1 and random.random() < self.explore_rate:
+            stalest = min(ranked, key=lambda s: s.last_sample or 0.0)
+            ranked.remove(stalest)
+            ranked.insert(0, stalest)
+            self._explored += 1
+        return [s.name for s in pinned + ranked + cooling]
+
+    def record_success(self, model_name: str, latency_ms: Optional[float] = None) -> None:
+        """Report a completed generation (latency_ms None when it was not measured, e.g. streams)"""
+        stats = self._stats(model_name)
+        stats.successes += 1
+        stats.consecutive_failures = 0
+        stats.cooldowns = 0
+        stats.last_sample = time.monotonic()
+        stats.ewma_error_rate *= 1 - self.alpha
+        if latency_ms is not None:
+            if stats.ewma_latency_ms is None:
+                stats.ewma_latency_ms = latency_ms
+            else:
+                stats.ewma_latency_ms += self.alpha * (latency_ms - stats.ewma_latency_ms)
+
+    def record_failure(self, model_name: str, error: Exception) -> None:
+        """Report a failed generation; may start a cooldown"""
+        stats = self._stats(model_name)
+        now = time.monotonic()
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        stats.last_sample = now
+        stats.last_error = str(error)[:200]
+        stats.ewma_error_rate += self.alpha * (1 - stats.ewma_error_rate)
+
+        coming_back = stats.cooldowns > 0 and not stats.cooling_down(now)
+        error_rate_tripped = stats.samples >= MIN_SAMPLES_FOR_ERROR_RATE and stats.ewma_error_rate >= self.max_error_rate
+        if coming_back or error_rate_tripped or stats.consecutive_failures >= self.failure_threshold:
+            cooldown = min(self.cooldown_seconds * 2 ** stats.cooldowns, self.max_cooldown_seconds)
+            stats.cooldown_until = now + cooldown
+            stats.cooldowns += 1
+            stats.consecutive_failures = 0
+            logger.warning(
+                f"Model {model_name} cooling down for {cooldown:.0f}s "
+                f"(error rate {stats.ewma_error_rate:.2f}, last error: {stats.last_error})"
+            )
+
+    def record_failover(self) -> None:
+        self._failovers += 1
+
+    def get_scoreboard(self) -> List[Dict[str, Any]]:
+        """Per-model latency, error rate and cooldown state, best first"""
+        now = time.monotonic()
+        return [
+            {
+                "model": s.name,
+                "ewma_latency_ms": round(s.ewma_latency_ms, 1) if s.ewma_latency_ms is not None else None,
+                "ewma_error_rate": round(s.ewma_error_rate, 4),
+                "score": round(s.score(), 1) if s.ewma_latency_ms is not None else None,
+                "successes": s.successes,
+                "failures": s.failures,
+                "cooling_down": s.cooling_down(now),
+                "cooldown_remaining_s": round(max(0.0, s.cooldown_until - now), 1),
+                "last_error": s.last_error
+            }
+            for s in sorted(self._models.values(), key=lambda s: (s.cooling_down(now), s.score()))
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Routing counters and the scoreboard for health/inspection endpoints"""
+        return {
+            "routed": self._routed,
+            "explored": self._explored,
+            "failovers": self._failovers,
+            "max_attempts": self.max_attempts,
+            "scoreboard": self.get_scoreboard()
+        }
+
+
+# Global model router instance
+model_router = ModelRouter()
@@ -3,8 +3,19 @@ Google Gemini API client for text chat functionality (FREE)
 Using Gemini Flash which is free to use - using Python SDK like working version
 """
 import asyncio
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, run_within
+from app.services.gemini_executor import ExecutorSaturatedError, gemini_executor
+from app.services.hedging import hedge_policy
+from app.services.model_registry import model_registry
+from app.services.model_router import model_router
+from app.services.rate_limiter import INTERACTIVE, gemini_rate_limiter
+from app.services.resilience import resilience
+from app.services.response_cache import make_cache_key, response_cache
+from app.services.single_flight import SingleFlight
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +28,47 @@ except ImportError:
     GEMINI_SDK_AVAILABLE = False
     logger.warning("google.generativeai not installed. Install with: pip install google-generativeai")
 
+# Human-like persona prepended to every chat prompt
+PERSONA_INSTRUCTION = """You are a real human being having a natural conversation. 
+- Respond naturally and conversationally, like you're texting a friend
+- Don't mention that you're an AI, assistant, or bot
+- Use casual language, contractions, and natural expressions
+- Show personality, opinions, and emotions
+- Don't be overly formal or robotic
+- Use "I", "me", "my" - speak from your own perspective
+- Be genuine and authentic, like a real person would respond
+- Keep responses concise and natural, not essay-like
+- If asked about being AI, deflect naturally like a human would"""
+
+# Introduces remembered summaries of past conversations (retrieval-augmented chat)
+MEMORY_CONTEXT_INSTRUCTION = """Things you remember from earlier conversations with this person. Bring them up naturally when they're relevant, and don't list them back:"""
+
+GENERATION_CONFIG = {
+    "temperature": 0.9,  # Higher temperature for more natural, varied responses
+    "top_k": 40,
+    "top_p": 0.95,
+    "max_output_tokens": 512,  # Shorter responses for more natural conversation
+}
+
+# Rough characters-per-token ratio for Gemini models on English text
+CHARS_PER_TOKEN = 4
+
+# Marks the end of a streamed response on the chunk queue
+_STREAM_END = object()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for budgeting prompts (no tokenizer round trip)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of a streamed chunk ('' for chunks without text, e.g. safety blocks)"""
+    try:
+        return chunk.text or ""
+    except (ValueError, AttributeError):
+        return ""
+
 
 class OpenAIClient:
     """Client for Google Gemini API text chat (using Gemini Flash - FREE)"""
@@ -26,6 +78,14 @@ class OpenAIClient:
         # Try gemini-2.5-flash first (from working version), fallback to gemini-1.5-flash
         self.model_name = "gemini-2.5-flash"  # Use the model from working version
         self.timeout = settings.API_TIMEOUT
+        self.registry = model_registry
+        self.router = model_router
+        self.hedging = hedge_policy
+        self.executor = gemini_executor
+        self.rate_limiter = gemini_rate_limiter
+        self.resilience = resilience
+        self.cache = response_cache
+        self.single_flight = SingleFlight()
         
         if self.api_key and GEMINI_SDK_AVAILABLE:
             genai.configure(api_key=self.api_key)
@@ -36,14 +96,13 @@ class OpenAIClient:
             if not GEMINI_SDK_AVAILABLE:
                 logger.warning("google.generativeai SDK not installed - install with: pip install google-generativeai")
     
-    async def send_message(
-        self,
-        message: str,
-        model: Optional[str] = None,
-        language: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Send a text message to Gemini Flash and get response"""
-        
+    @property
+    def is_configured(self) -> bool:
+        """Whether requests can actually reach Gemini"""
+        return bool(self.api_key) and GEMINI_SDK_AVAILABLE
+    
+    def _not_configured_response(self, message: str, model: Optional[str], language: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Fallback response when Gemini cannot be called, or None if it can"""
         if not self.api_key:
             # Fallback response when Gemini is not configured
             return {
@@ -59,146 +118,440 @@ class OpenAIClient:
                 "language": language or "en"
             }
         
+        return None
+    
+    def _route(self, requested_model: str) -> List[str]:
+        """Models to try for a request - the requested one first while healthy - limited to the router's attempt budget"""
+        candidates = self.registry.candidates(requested_model)
+        # Discovery lists full names ("models/..."); callers may pass either form
+        requested = next((name for name in candidates if name in (requested_model, f"models/{requested_model}")), None)
+        order = self.router.route(candidates, requested=requested)
+        return order[:self.router.max_attempts]
+    
+    def _build_prompt(
+        self,
+        message: str,
+        language: Optional[str],
+        context: Optional[str] = None,
+        history: Optional[str] = None
+    ) -> str:
+        """Prepare the prompt with human-like persona"""
+        # Make it respond like a real person, not an AI bot
+        system_instruction = PERSONA_INSTRUCTION
+        
+        if language and language != "en":
+            system_instruction += f"\n\nPlease respond in {language}."
+        
+        if context:
+            # Summaries of past calls with this person, already fitted to a token budget
+            system_instruction += f"\n\n{MEMORY_CONTEXT_INSTRUCTION}\n{context}"
+        
+        # Build the full prompt
+        if history:
+            # Earlier turns of a chat session (rolling summary + recent turns)
+            return f"{system_instruction}\n\n{history}\n\nUser: {message}\n\nAssistant:"
+        return f"{system_instruction}\n\nUser: {message}\n\nAssistant:"
+    
+    def _error_message(self, e: Exception) -> str:
+        """Turn a Gemini exception into a user-facing explanation"""
+        # Use the cached model list for debugging (no extra API call)
+        available_models_list = self.registry.available_models
+        
+        # Provide helpful error message
+        error_msg = str(e)
+        if "api key" in error_msg.lower() or "invalid" in error_msg.lower():
+            error_msg = "API key issue - check GOOGLE_API_KEY in .env file"
+        elif available_models_list:
+            error_msg = f"Model error. Available models: {', '.join(available_models_list[:3])}"
+        return error_msg
+    
+    async def _generate(
+        self,
+        model_name: str,
+        full_prompt: str,
+        generation_config: Dict[str, Any],
+        started: Optional[asyncio.Event] = None,
+        priority: str = INTERACTIVE
+    ) -> Tuple[Any, float]:
+        """
+        Run one generate_content call inside a bounded Gemini executor slot,
+        once the rate limiter has admitted it at the given priority.
+        Returns the response and the call's latency in ms, excluding the wait
+        for quota and a slot; started is set once the slot is acquired.
+        """
+        gemini_model = self.registry.get_model(model_name)
+        # Reserve the worst case up front, then settle with the reply's estimated size
+        prompt_tokens = estimate_tokens(full_prompt)
+        reserved = prompt_tokens + generation_config.get("max_output_tokens", 0)
+        await self.rate_limiter.acquire(reserved, priority)
+        used = reserved
         try:
-            # Use the model from working version (gemini-2.5-flash) or requested model
-            requested_model = model or self.model_name
-            
-            # Get available models first and use exact names from the list
-            available_models = []
+            async with self.executor.slot():
+                if started is not None:
+                    started.set()
+                start = time.perf_counter()
+                # Prefer the SDK's native async path - no thread needed
+                if hasattr(gemini_model, "generate_content_async"):
+                    response = await gemini_model.generate_content_async(
+                        full_prompt,
+                        generation_config=generation_config
+                    )
+                else:
+                    response = await self.executor.submit(
+                        lambda: gemini_model.generate_content(
+                            full_prompt,
+                            generation_config=generation_config
+                        )
+                    )
+                latency_ms = (time.perf_counter() - start) * 1000
+                used = prompt_tokens + estimate_tokens(_chunk_text(response))
+                return response, latency_ms
+        finally:
+            self.rate_limiter.settle(reserved, used)
+    
+    async def _attempt(
+        self,
+        model_name: str,
+        full_prompt: str,
+        generation_config: Dict[str, Any],
+        started: Optional[asyncio.Event] = None,
+        priority: str = INTERACTIVE
+    ) -> Tuple[str, str]:
+        """One generation on one model, reported to the router and hedge policy. Returns (stripped text, model)."""
+        try:
+            # Through the Gemini circuit breaker (fails fast while Gemini is down), and bounded
+            # by what is left of the request's deadline. Not retried here: failing over to the
+            # next model is the retry.
+            response, latency_ms = await self.resilience.call(
+                "gemini",
+                lambda: run_within(
+                    self._generate(model_name, full_prompt, generation_config, started, priority),
+                    stage=f"Gemini generation on {model_name}"
+                )
+            )
+            text = response.text.strip() if response and response.text else ""
+            if not text:
+                raise Exception("No response generated from Gemini")
+        except (ExecutorSaturatedError, DeadlineExceeded):
+            # Local back-pressure or an exhausted request budget, not the model's fault
+            raise
+        except Exception as e:
+            self.router.record_failure(model_name, e)
+            raise
+        self.router.record_success(model_name, latency_ms)
+        # Kept even with hedging off, so the hedge delay is ready when it is turned on
+        self.hedging.record_latency(latency_ms)
+        return text, model_name
+    
+    async def _generate_text(
+        self,
+        requested_model: str,
+        full_prompt: str,
+        generation_config: Dict[str, Any],
+        priority: str = INTERACTIVE
+    ) -> Tuple[str, str]:
+        """
+        Generate with the router's best model for the request, failing over to
+        the next one if it errors (hedging slow calls when enabled).
+        Returns (stripped response text, model used).
+        """
+        order = self._route(requested_model)
+        if self.hedging.enabled:
+            return await self._generate_hedged(order, full_prompt, generation_config, priority)
+        
+        last_error: Optional[Exception] = None
+        for attempt, model_name in enumerate(order):
+            if attempt:
+                self.router.record_failover()
+                logger.warning(f"Retrying on {model_name} after: {last_error}")
             try:
-                available_models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-                logger.info(f"Available Gemini models: {available_models[:5]}")
+                return await self._attempt(model_name, full_prompt, generation_config, priority=priority)
+            except (ExecutorSaturatedError, DeadlineExceeded):
+                # No failover: it would hit the same limit, or has no time left
+                raise
             except Exception as e:
-                logger.warning(f"Could not list models: {e}")
-            
-            # Build list of model names to try - use EXACT names from available models list
-            model_names_to_try = []
-            
-            # Priority order for models to try
-            preferred_models = [
-                'models/gemini-2.5-flash',  # Best - newest and fastest
-                'models/gemini-2.0-flash-exp',  # Experimental but good
-                'models/gemini-2.5-pro',  # Pro version
-                'models/gemini-1.5-flash',  # Fallback
-                'models/gemini-1.5-pro',  # Pro fallback
-                'models/gemini-pro'  # Old fallback
-            ]
-            
-            if available_models:
-                # Use exact model names from available models list
-                # Try requested model first
-                if requested_model in available_models:
-                    model_names_to_try.append(requested_model)
-                elif f'models/{requested_model}' in available_models:
-                    model_names_to_try.append(f'models/{requested_model}')
-                
-                # Then try preferred models in order (if they're available)
-                for preferred in preferred_models:
-                    if preferred in available_models and preferred not in model_names_to_try:
-                        model_names_to_try.append(preferred)
-                
-                # If still nothing, use first available model
-                if not model_names_to_try and available_models:
-                    model_names_to_try.append(available_models[0])
-            else:
-                # Fallback if we can't list models - try common names
-                model_names_to_try = [
-                    'models/gemini-2.5-flash',
-                    f'models/{requested_model}',
-                    requested_model,
-                    'models/gemini-1.5-flash'
-                ]
-            
-            gemini_model = None
-            last_error = None
-            
-            # Try each model name until one works
-            for model_name_attempt in model_names_to_try:
+                last_error = e
+        raise last_error or Exception("No Gemini model available")
+    
+    async def _generate_hedged(
+        self,
+        order: List[str],
+        full_prompt: str,
+        generation_config: Dict[str, Any],
+        priority: str = INTERACTIVE
+    ) -> Tuple[str, str]:
+        """
+        Start the primary call; if it is still running the hedge delay after it
+        got an executor slot, and the budget allows, send a backup to the next model (or the same one if
+        there is no other) and take whichever succeeds first. The loser is
+        cancelled - which stops it on the async SDK path; a blocking SDK call
+        already running on a worker thread finishes and is discarded.
+        A primary that fails before any hedge fails over as usual.
+        
+        Both the delay and the latency percentile it comes from leave out the
+        wait for a slot: a call queued behind others is not slow upstream, and
+        hedging it would only add to the queue.
+        """
+        self.hedging.start_request()
+        alternate = order[1] if len(order) > 1 else order[0]
+        primary_started = asyncio.Event()
+        primary = asyncio.ensure_future(self._attempt(order[0], full_prompt, generation_config, primary_started, priority))
+        backup: Optional[asyncio.Future] = None
+        hedged = False
+        pending = {primary}
+        done: set = set()
+        try:
+            delay_ms = self.hedging.delay_ms()
+            if delay_ms is not None:
+                slot_wait = asyncio.ensure_future(primary_started.wait())
                 try:
-                    logger.info(f"Attempting to initialize model: {model_name_attempt}")
-                    gemini_model = genai.GenerativeModel(model_name_attempt)
-                    logger.info(f"Successfully initialized model: {model_name_attempt}")
-                    break
-                except Exception as e:
-                    last_error = e
-                    logger.debug(f"Model {model_name_attempt} failed: {e}")
-                    continue
-            
-            if not gemini_model:
-                raise Exception(f"Could not initialize any Gemini model. Tried: {model_names_to_try}. Last error: {last_error}")
-            
-            # Use the working model
-            model = gemini_model
-            
-            # Prepare the prompt with human-like persona
-            # Make it respond like a real person, not an AI bot
-            system_instruction = """You are a real human being having a natural conversation. 
-- Respond naturally and conversationally, like you're texting a friend
-- Don't mention that you're an AI, assistant, or bot
-- Use casual language, contractions, and natural expressions
-- Show personality, opinions, and emotions
-- Don't be overly formal or robotic
-- Use "I", "me", "my" - speak from your own perspective
-- Be genuine and authentic, like a real person would respond
-- Keep responses concise and natural, not essay-like
-- If asked about being AI, deflect naturally like a human would"""
+                    await asyncio.wait({primary, slot_wait}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    slot_wait.cancel()
+                done, pending = await asyncio.wait(pending, timeout=delay_ms / 1000)
+                if not done and self.hedging.try_acquire():
+                    backup = asyncio.ensure_future(self._attempt(alternate, full_prompt, generation_config, priority=priority))
+                    pending.add(backup)
+                    hedged = True
             
-            if language and language != "en":
-                system_instruction += f"\n\nPlease respond in {language}."
-            
-            # Build the full prompt
-            full_prompt = f"{system_instruction}\n\nUser: {message}\n\nAssistant:"
+            last_error: Optional[BaseException] = None
+            while True:
+                if pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    if hedged:
+                        self.hedging.record_winner(hedge_won=winner is backup)
+                    return winner.result()
+                last_error = next(iter(done)).exception()
+                done = set()
+                if pending:
+                    continue  # The other call may still succeed
+                if backup is None and len(order) > 1 and not isinstance(last_error, (ExecutorSaturatedError, DeadlineExceeded)):
+                    self.router.record_failover()
+                    logger.warning(f"Retrying on {order[1]} after: {last_error}")
+                    backup = asyncio.ensure_future(self._attempt(order[1], full_prompt, generation_config, priority=priority))
+                    pending = {backup}
+                    continue
+                raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def send_message(
+        self,
+        message: str,
+        model: Optional[str] = None,
+        language: Optional[str] = None,
+        temperature: Optional[float] = None,
+        use_cache: Optional[bool] = None,
+        coalesce: bool = True,
+        context: Optional[str] = None,
+        history: Optional[str] = None,
+        priority: str = INTERACTIVE
+    ) -> Dict[str, Any]:
+        """
+        Send a text message to Gemini Flash and get response.
+        
+        Responses are served from the response cache when the same
+        (model, language, prompt, temperature) was answered recently.
+        By default only low-temperature (deterministic) prompts are cached;
+        pass use_cache=False to always go upstream, or True to force caching.
+        
+        Concurrent identical calls share one upstream generation unless
+        coalesce=False; every caller gets the same result or error.
+        
+        context is an optional block of remembered facts (see memory_context)
+        added to the system instruction; history is the earlier turns of a
+        chat session. Both are part of the cache key.
+        
+        priority ("interactive" or "background") decides who goes first when
+        the Gemini rate limit is short; a call that waits past its class
+        deadline raises QuotaWaitTimeoutError (an ExecutorSaturatedError).
+        Attempts share the request's deadline (app.core.deadline), and
+        DeadlineExceeded is raised once it is spent instead of failing over.
+        """
+        
+        fallback = self._not_configured_response(message, model, language)
+        if fallback:
+            return fallback
+        
+        # Use the model from working version (gemini-2.5-flash) or requested model
+        requested_model = model or self.model_name
+        generation_config = dict(GENERATION_CONFIG)
+        if temperature is not None:
+            generation_config["temperature"] = temperature
+        if use_cache is None:
+            use_cache = generation_config["temperature"] <= settings.RESPONSE_CACHE_MAX_TEMPERATURE
+        
+        try:
+            full_prompt = self._build_prompt(message, language, context, history)
             
-            # Generate response using SDK (run in executor to make it async-friendly)
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: model.generate_content(
-                    full_prompt,
-                    generation_config={
-                        "temperature": 0.9,  # Higher temperature for more natural, varied responses
-                        "top_k": 40,
-                        "top_p": 0.95,
-                        "max_output_tokens": 512,  # Shorter responses for more natural conversation
-                    }
-                )
-            )
+            cache_key = make_cache_key(requested_model, language or "en", full_prompt, generation_config)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached:
+                    cached["cached"] = True
+                    return cached
             
-            if response and response.text:
-                ai_response = response.text.strip()
-                return {
-                    "response": ai_response,
-                    "model": requested_model,
-                    "language": language or "en"
-                }
+            upstream = lambda: self._generate_text(requested_model, full_prompt, generation_config, priority)
+            if coalesce:
+                ai_response, model_used = await self.single_flight.do(cache_key, upstream, stage="coalesced Gemini generation")
             else:
-                raise Exception("No response generated from Gemini")
+                ai_response, model_used = await upstream()
+            
+            result = {
+                "response": ai_response,
+                "model": model_used,
+                "language": language or "en",
+                "prompt_tokens": estimate_tokens(full_prompt)
+            }
+            # Only successful generations are cached, never error fallbacks
+            if use_cache:
+                self.cache.set(cache_key, result)
+            return result
                 
+        except (ExecutorSaturatedError, DeadlineExceeded):
+            # Let callers turn these into a clear "busy, retry" (503) or "out of time" (504) error
+            raise
         except Exception as e:
             logger.error(f"Error calling Gemini API: {e}", exc_info=True)
-            
-            # Try to list available models for debugging
-            available_models_list = []
-            try:
-                if GEMINI_SDK_AVAILABLE:
-                    available_models_list = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-                    logger.info(f"Available Gemini models: {available_models_list[:5]}...")  # Log first 5
-            except Exception as list_error:
-                logger.error(f"Could not list models: {list_error}")
-            
-            # Provide helpful error message
-            error_msg = str(e)
-            if "api key" in error_msg.lower() or "invalid" in error_msg.lower():
-                error_msg = "API key issue - check GOOGLE_API_KEY in .env file"
-            elif available_models_list:
-                error_msg = f"Model error. Available models: {', '.join(available_models_list[:3])}"
-            
             return {
-                "response": f"Hey, I got your message but ran into an issue: {error_msg}. Mind checking the backend logs?",
-                "model": requested_model if 'requested_model' in locals() else "error",
-                "language": language or "en"
+                "response": f"Hey, I got your message but ran into an issue: {self._error_message(e)}. Mind checking the backend logs?",
+                "model": requested_model,
+                "language": language or "en",
+                "error": str(e)
             }
-
+    
+    async def stream_message(
+        self,
+        message: str,
+        model: Optional[str] = None,
+        language: Optional[str] = None,
+        context: Optional[str] = None,
+        history: Optional[str] = None,
+        priority: str = INTERACTIVE,
+        served: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Send a text message to Gemini and yield response text chunks as they arrive.
+        
+        The router picks the model; if it fails before the first chunk the
+        next one is tried, since nothing has reached the client yet.
+        served, if given, gets "model" set to the model that produced the
+        chunks, which after failover may not be the one requested.
+        When Gemini is not configured the fallback response is yielded as a single chunk.
+        Errors from the API are raised to the caller.
+        """
+        fallback = self._not_configured_response(message, model, language)
+        if fallback:
+            if served is not None:
+                served["model"] = fallback["model"]
+            yield fallback["response"]
+            return
+        
+        full_prompt = self._build_prompt(message, language, context, history)
+        attempts = self._route(model or self.model_name)
+        breaker = self.resilience.breaker("gemini")
+        for attempt, model_name in enumerate(attempts):
+            breaker.allow()
+            started = False
+            judged = False
+            try:
+                async for text in self._stream_model(model_name, full_prompt, priority):
+                    if not started and served is not None:
+                        served["model"] = model_name
+                    started = True
+                    yield text
+                breaker.on_success()
+                judged = True
+            except (ExecutorSaturatedError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                breaker.on_failure(e)
+                judged = True
+                self.router.record_failure(model_name, e)
+                if started or attempt == len(attempts) - 1:
+                    raise
+                self.router.record_failover()
+                logger.warning(f"Stream on {model_name} failed before any output, retrying on {attempts[attempt + 1]}: {e}")
+                continue
+            finally:
+                if not judged:
+                    # Local limit, deadline or client gone - not Gemini's fault
+                    breaker.release()
+            # Stream latency depends on reply length, so only the outcome is recorded
+            self.router.record_success(model_name)
+            return
+    
+    async def _stream_model(self, model_name: str, full_prompt: str, priority: str = INTERACTIVE) -> AsyncIterator[str]:
+        """Stream one model's response chunks inside a Gemini executor slot, once the rate limiter admits it"""
+        gemini_model = self.registry.get_model(model_name)
+        prompt_tokens = estimate_tokens(full_prompt)
+        reserved = prompt_tokens + GENERATION_CONFIG["max_output_tokens"]
+        stage = f"Gemini stream on {model_name}"
+        await run_within(self.rate_limiter.acquire(reserved, priority), stage)
+        reply_tokens = 0
+        
+        try:
+            async with self.executor.slot():
+                if hasattr(gemini_model, "generate_content_async"):
+                    # The deadline bounds the wait for the stream to start, not its length
+                    response = await run_within(
+                        gemini_model.generate_content_async(
+                            full_prompt,
+                            generation_config=GENERATION_CONFIG,
+                            stream=True
+                        ),
+                        stage
+                    )
+                    async for chunk in response:
+                        text = _chunk_text(chunk)
+                        if text:
+                            reply_tokens += estimate_tokens(text)
+                            yield text
+                    return
+                
+                # Older SDKs only have a blocking stream iterator, so drain it on a
+                # Gemini worker thread and hand chunks back through a queue
+                loop = asyncio.get_event_loop()
+                queue: asyncio.Queue = asyncio.Queue()
+                stop = threading.Event()
+                
+                def produce():
+                    try:
+                        stream = gemini_model.generate_content(
+                            full_prompt,
+                            generation_config=GENERATION_CONFIG,
+                            stream=True
+                        )
+                        for chunk in stream:
+                            if stop.is_set():
+                                break
+                            text = _chunk_text(chunk)
+                            if text:
+                                loop.call_soon_threadsafe(queue.put_nowait, text)
+                        loop.call_soon_threadsafe(queue.put_nowait, _STREAM_END)
+                    except Exception as e:
+                        loop.call_soon_threadsafe(queue.put_nowait, e)
+                
+                producer = self.executor.submit(produce)
+                try:
+                    while True:
+                        item = await queue.get()
+                        if item is _STREAM_END:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        reply_tokens += estimate_tokens(item)
+                        yield item
+                finally:
+                    # Stops the worker thread early if the client went away
+                    stop.set()
+                    producer.cancel()
+        finally:
+            # Streams only charge the tokens actually delivered
+            self.rate_limiter.settle(reserved, prompt_tokens + reply_tokens)
 
 # Global client instance
 openai_client = OpenAIClient()
@@ -0,0 +1,226 @@
+"""
+Client-side Gemini quota: request/token buckets with a priority wait queue
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+
+from app.core.config import settings
+from app.services.gemini_executor import ExecutorSaturatedError
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Recent queue waits kept per class for the p95
+WAIT_WINDOW = 1000
+
+
+class QuotaWaitTimeoutError(ExecutorSaturatedError):
+    """Queued for Gemini quota past the request's deadline"""
+
+
+class TokenBucket:
+    """Continuously refilled bucket holding up to one minute of quota (disabled when per_minute is 0)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (requests larger than the bucket wait for a full one)"""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        if self.enabled:
+            self._refill(now)
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or charge extra (negative) once real usage is known"""
+        if self.enabled:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "priority", "enqueued_at")
+
+    def __init__(self, tokens: int, priority: str):
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.tokens = tokens
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class GeminiRateLimiter:
+    """
+    Keeps Gemini calls under the per-minute request (RPM) and token (TPM) quota.
+    Opt-in: with GEMINI_RPM and GEMINI_TPM left at 0, acquire() returns at once.
+
+    A call reserves one request plus its estimated tokens (prompt estimate
+    plus max output) before it takes an executor slot; settle() corrects
+    the token reservation once the reply length is known.
+
+    When quota is short, callers wait in a priority queue: interactive chat
+    is always admitted before background work (summaries, compaction), and
+    FIFO within a class. Each waiter has a deadline - by default a few
+    seconds for interactive calls and minutes for background ones - and is
+    dropped with QuotaWaitTimeoutError once it passes, rather than being
+    served an answer nobody is waiting for. That error is an
+    ExecutorSaturatedError, so routes answer 503 and background jobs
+    requeue exactly as when the executor is full.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        interactive_deadline: Optional[float] = None,
+        background_deadline: Optional[float] = None
+    ):
+        self.requests = TokenBucket(settings.GEMINI_RPM if rpm is None else rpm)
+        self.tokens = TokenBucket(settings.GEMINI_TPM if tpm is None else tpm)
+        self.deadlines = {
+            INTERACTIVE: interactive_deadline or settings.GEMINI_INTERACTIVE_DEADLINE,
+            BACKGROUND: background_deadline or settings.GEMINI_BACKGROUND_DEADLINE
+        }
+        self._heap: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._queued = {p: 0 for p in PRIORITIES}
+        self._admitted = {p: 0 for p in PRIORITIES}
+        self._dropped = {p: 0 for p in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=WAIT_WINDOW) for p in PRIORITIES}
+        self._total_wait = {p: 0.0 for p in PRIORITIES}
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests.enabled or self.tokens.enabled
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def _admit(self, tokens: int, priority: str, waited: float, now: float) -> None:
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+        self._admitted[priority] += 1
+        self._waits[priority].append(waited)
+        self._total_wait[priority] += waited
+
+    async def acquire(self, tokens: int, priority: str = INTERACTIVE, deadline: Optional[float] = None) -> None:
+        """
+        Reserve quota for one call, waiting behind more urgent work if needed.
+        deadline is seconds to wait at most (default: the class deadline).
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r} (expected one of {PRIORITIES})")
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        # Fast path only when nobody is queued, so arrivals cannot jump the queue
+        if not self._heap and self._wait_time(tokens, now) <= 0:
+            self._admit(tokens, priority, 0.0, now)
+            return
+
+        waiter = _Waiter(tokens, priority)
+        heapq.heappush(self._heap, (PRIORITIES.index(priority), next(self._seq), waiter))
+        self._queued[priority] += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+        timeout = deadline if deadline is not None else self.deadlines[priority]
+        try:
+            done, _ = await asyncio.wait({waiter.future}, timeout=timeout)
+        finally:
+            if not waiter.future.done():
+                # Deadline passed or the caller was cancelled - leave the queue
+                waiter.future.cancel()
+                self._queued[priority] -= 1
+        if not done:
+            self._dropped[priority] += 1
+            raise QuotaWaitTimeoutError(
+                f"Gemini quota exhausted: {priority} request waited {timeout:g}s for its turn. Please retry shortly."
+            )
+
+    def settle(self, reserved_tokens: int, used_tokens: int) -> None:
+        """Correct a token reservation with the tokens the call actually used"""
+        self.tokens.adjust(reserved_tokens - used_tokens)
+
+    async def _dispatch(self) -> None:
+        """Admit queued waiters in priority order as quota refills"""
+        while self._heap:
+            _, _, waiter = self._heap[0]
+            if waiter.future.done():
+                # Left the queue (deadline or cancellation) - already counted
+                heapq.heappop(self._heap)
+                continue
+            now = time.monotonic()
+            wait = self._wait_time(waiter.tokens, now)
+            if wait <= 0:
+                heapq.heappop(self._heap)
+                self._queued[waiter.priority] -= 1
+                self._admit(waiter.tokens, waiter.priority, now - waiter.enqueued_at, now)
+                waiter.future.set_result(None)
+                continue
+            # Sleep until quota refills, or until a new arrival that may be more urgent
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Bucket levels and per-class queue depth and wait times for health/inspection endpoints"""
+        now = time.monotonic()
+        classes = {}
+        for priority in PRIORITIES:
+            waits = sorted(self._waits[priority])
+            admitted = self._admitted[priority]
+            classes[priority] = {
+                "queued": self._queued[priority],
+                "admitted": admitted,
+                "dropped_stale": self._dropped[priority],
+                "deadline_seconds": self.deadlines[priority],
+                "avg_wait_ms": round(self._total_wait[priority] / admitted * 1000, 2) if admitted else 0.0,
+                "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+                "max_wait_ms": round(waits[-1] * 1000, 2) if waits else 0.0
+            }
+        # Refill before reporting so the levels are current
+        self.requests.wait_time(0, now)
+        self.tokens.wait_time(0, now)
+        return {
+            "enabled": self.enabled,
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "requests_available": round(self.requests.level, 1) if self.requests.enabled else None,
+            "tokens_available": round(self.tokens.level) if self.tokens.enabled else None,
+            "classes": classes
+        }
+
+
+# Global Gemini rate limiter instance
+gemini_rate_limiter = GeminiRateLimiter()
@@ -0,0 +1,234 @@
+"""
+Retries with jittered backoff and per-upstream circuit breakers
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+import logging
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, remaining
+from app.services.gemini_executor import ExecutorSaturatedError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Upstreams whose breakers are reported from startup, before their first call
+UPSTREAMS = ("vapi", "gemini")
+
+
+class CircuitOpenError(ExecutorSaturatedError):
+    """
+    The upstream's breaker is open, so the call was not attempted.
+    An ExecutorSaturatedError, so routes answer 503 and background jobs requeue.
+    """
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} is unavailable (circuit open); retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Fails calls to one upstream fast while it is down.
+
+    failure_threshold failures in a row open the breaker; calls are then
+    rejected with CircuitOpenError without touching the network. After
+    reset_timeout seconds it goes half-open and lets up to half_open_probes
+    calls through: a success closes it, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        half_open_probes: Optional[int] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.CIRCUIT_RESET_TIMEOUT
+        self.half_open_probes = half_open_probes or settings.CIRCUIT_HALF_OPEN_PROBES
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self._probes_in_flight = 0
+        self._opened = 0
+        self._rejected = 0
+        self._successes = 0
+        self._failures = 0
+
+    def allow(self) -> None:
+        """Admit one call or raise CircuitOpenError; every admitted call must end in on_success/on_failure/release"""
+        if self.state == OPEN:
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout:
+                self._rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout - waited)
+            self.state = HALF_OPEN
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self._rejected += 1
+                raise CircuitOpenError(self.name, 0)
+            self._probes_in_flight += 1
+
+    def release(self) -> None:
+        """An admitted call ended without a verdict (cancelled, or out of time locally)"""
+        if self.state == HALF_OPEN and self._probes_in_flight:
+            self._probes_in_flight -= 1
+
+    def on_success(self) -> None:
+        self.release()
+        self._successes += 1
+        self.consecutive_failures = 0
+        if self.state != CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = CLOSED
+
+    def on_failure(self, error: BaseException) -> None:
+        self.release()
+        self._failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)[:200]
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self._opened += 1
+                logger.warning(
+                    f"Circuit for {self.name} opened for {self.reset_timeout:.0f}s "
+                    f"after {self.consecutive_failures} failures (last error: {self.last_error})"
+                )
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        retry_in = self.reset_timeout - (time.monotonic() - self.opened_at) if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_in_seconds": round(max(0.0, retry_in), 1),
+            "times_opened": self._opened,
+            "rejected": self._rejected,
+            "successes": self._successes,
+            "failures": self._failures,
+            "last_error": self.last_error
+        }
+
+
+class ResilienceLayer:
+    """
+    Shared retry and circuit-breaker policy for upstream calls (Vapi, Gemini).
+
+    call() runs one upstream operation through that upstream's breaker.
+    Idempotent calls that fail with a retryable error are retried up to
+    attempts times in total, sleeping a "full jitter" backoff between tries
+    (uniform between 0 and base_delay * 2^n, capped at max_delay) so clients
+    that failed together do not retry in lockstep. Non-idempotent calls are
+    never retried. Neither retries nor backoff run past the request deadline,
+    and an open breaker stops further retries at once.
+    """
+
+    def __init__(
+        self,
+        attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None
+    ):
+        self.attempts = attempts or settings.UPSTREAM_RETRY_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else settings.UPSTREAM_RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else settings.UPSTREAM_RETRY_MAX_DELAY
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._retries: Dict[str, int] = {}
+        for upstream in UPSTREAMS:
+            self.breaker(upstream)
+
+    def breaker(self, upstream: str) -> CircuitBreaker:
+        breaker = self._breakers.get(upstream)
+        if breaker is None:
+            breaker = self._breakers[upstream] = CircuitBreaker(upstream)
+            self._retries[upstream] = 0
+        return breaker
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter delay before the given retry (1 = first retry)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    async def call(
+        self,
+        upstream: str,
+        fn: Callable[[], Awaitable[T]],
+        idempotent: bool = False,
+        failed: Optional[Callable[[T], bool]] = None
+    ) -> T:
+        """
+        Run fn() through the upstream's breaker, retrying idempotent calls.
+
+        Exceptions count as upstream failures, as do results for which
+        failed(result) is true (e.g. HTTP 5xx); such a result is returned
+        as-is once retries run out. CircuitOpenError is raised without
+        calling fn when the breaker is open.
+        """
+        breaker = self.breaker(upstream)
+        attempts = self.attempts if idempotent else 1
+        for attempt in range(1, attempts + 1):
+            breaker.allow()
+            try:
+                result = await fn()
+            except (ExecutorSaturatedError, DeadlineExceeded):
+                # Local back-pressure or our own budget - says nothing about the upstream
+                breaker.release()
+                raise
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                left = remaining()
+                if left is not None and left <= 0:
+                    # Cut short by the request deadline, not the upstream's fault
+                    breaker.release()
+                    raise
+                breaker.on_failure(e)
+                if attempt == attempts or not await self._wait_to_retry(upstream, attempt, e):
+                    raise
+                continue
+            if failed is not None and failed(result):
+                breaker.on_failure(Exception(f"{upstream} returned an error result"))
+                if attempt == attempts or not await self._wait_to_retry(upstream, attempt, None):
+                    return result
+                continue
+            breaker.on_success()
+            return result
+        raise RuntimeError("unreachable")
+
+    async def _wait_to_retry(self, upstream: str, attempt: int, error: Optional[BaseException]) -> bool:
+        """Sleep the backoff before the next try; False if the breaker opened or the deadline leaves no room"""
+        if self._breakers[upstream].state == OPEN:
+            return False
+        delay = self.backoff(attempt)
+        left = remaining()
+        if left is not None and left <= delay:
+            return False
+        self._retries[upstream] += 1
+        logger.info(f"Retrying {upstream} call in {delay * 1000:.0f} ms (attempt {attempt + 1}/{self.attempts}): {error}")
+        await asyncio.sleep(delay)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-upstream breaker state and retry counts for health/inspection endpoints"""
+        return {
+            name: {**breaker.get_stats(), "retries": self._retries[name]}
+            for name, breaker in self._breakers.items()
+        }
+
+
+# Global resilience layer instance
+resilience = ResilienceLayer()
@@ -0,0 +1,152 @@
+"""
+Response cache for repeated Gemini prompts
+"""
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Content hash of the parts that determine a response (model, language, prompt, ...)"""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Interface for response cache backends; a backend missing a method fails when constructed"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        ...
+
+
+class NullResponseCache(ResponseCache):
+    """Backend that never stores anything (RESPONSE_CACHE_BACKEND=none)"""
+
+    def __init__(self):
+        self._misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self._misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": "none", "hits": 0, "misses": self._misses}
+
+
+class LRUResponseCache(ResponseCache):
+    """
+    In-process LRU cache with a per-entry TTL and a total size bound in bytes.
+
+    Entry size is the UTF-8 length of the key plus the JSON-encoded value.
+    Least recently used entries are evicted until the new entry fits.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, size_bytes, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._expirations += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        size = len(key.encode("utf-8")) + len(json.dumps(value, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            logger.debug(f"Response too large to cache ({size} bytes)")
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        while self._entries and self._bytes + size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._evictions += 1
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, size, dict(value))
+        self._bytes += size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "evictions": self._evictions,
+            "expirations": self._expirations
+        }
+
+
+def create_response_cache() -> ResponseCache:
+    """Build the cache backend selected by RESPONSE_CACHE_BACKEND"""
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    if backend == "none":
+        return NullResponseCache()
+    if backend != "memory":
+        logger.warning(f"Unknown RESPONSE_CACHE_BACKEND '{backend}', using in-memory cache")
+    return LRUResponseCache(
+        max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+        ttl_seconds=settings.RESPONSE_CACHE_TTL
+    )
+
+
+# Global cache instance
+response_cache = create_response_cache()
@@ -0,0 +1,92 @@
+"""
+Single-flight coalescing of identical in-flight requests
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+import logging
+
+from app.core.deadline import request_deadline, run_within
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One shared execution and the number of callers still waiting on it"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts the work as a task; callers that
+    arrive while it is running await the same task and receive the same
+    result or exception. The key is forgotten once the task finishes, so
+    later calls start fresh work.
+
+    The shared task runs without a request deadline, so one caller's short
+    budget cannot fail everyone coalesced onto it; each caller instead
+    waits only as long as its own budget allows. When the last waiter has
+    gone (timed out or cancelled) the task is cancelled, releasing its
+    executor slot instead of finishing work nobody will read.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, _Call] = {}
+        self._calls = 0
+        self._executions = 0
+        self._collapsed = 0
+        self._abandoned = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]], stage: str = "coalesced call") -> Any:
+        """Run fn() for key, or join the call already running for key; stage names it in DeadlineExceeded"""
+        self._calls += 1
+        call = self._inflight.get(key)
+        if call is None:
+            self._executions += 1
+            call = _Call(asyncio.ensure_future(self._run_unbounded(fn)))
+            self._inflight[key] = call
+            call.task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self._collapsed += 1
+            logger.debug(f"Coalesced request onto in-flight call {key[:12]}")
+
+        call.waiters += 1
+        try:
+            # Shield so one waiter leaving does not cancel the shared call
+            return await run_within(asyncio.shield(call.task), stage)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._abandoned += 1
+                call.task.cancel()
+
+    @staticmethod
+    async def _run_unbounded(fn: Callable[[], Awaitable[Any]]) -> Any:
+        # The task copies the first caller's context; drop its deadline
+        with request_deadline(None):
+            return await fn()
+
+    def _forget(self, key: str, task: "asyncio.Task") -> None:
+        call = self._inflight.get(key)
+        if call is not None and call.task is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Coalescing counters for health/inspection endpoints"""
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self._calls,
+            "upstream_calls": self._executions,
+            "collapsed": self._collapsed,
+            "abandoned": self._abandoned,
+            "collapse_rate": round(self._collapsed / self._calls, 4) if self._calls else 0.0
+        }
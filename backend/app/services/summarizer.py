@@ -0,0 +1,255 @@
+"""
+Conversation summarization service using Gemini
+"""
+import asyncio
+import re
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.core.config import settings
+from app.services.extractive_summarizer import extractive_summarizer
+from app.services.gemini_executor import ExecutorSaturatedError
+from app.services.openai_client import estimate_tokens, openai_client
+from app.services.rate_limiter import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# Model used for memory summaries
+SUMMARY_MODEL = "gemini-1.5-flash"
+
+# Summaries should be deterministic so re-saving a transcript can hit the response cache
+SUMMARY_TEMPERATURE = 0.2
+
+# auto: Gemini within the latency budget, local extractive summary otherwise
+# llm: Gemini only; extractive: local only, no upstream call
+SUMMARY_MODES = ("auto", "llm", "extractive")
+
+# A line that starts a new speaker turn, e.g. "User: ..." or "AI Twin: ..."
+SPEAKER_TURN = re.compile(r"^\s*[A-Za-z][\w .'-]{0,40}:\s")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class SummarizationError(Exception):
+    """Raised when Gemini could not produce a summary"""
+
+    def __init__(self, message: str, response_text: Optional[str] = None):
+        super().__init__(message)
+        # User-facing text returned by the client alongside the error
+        self.response_text = response_text or message
+
+
+def split_turns(transcript: str) -> List[str]:
+    """Split a transcript into speaker turns (continuation lines stay with their turn)"""
+    turns: List[str] = []
+    for line in transcript.splitlines():
+        if not line.strip():
+            continue
+        if SPEAKER_TURN.match(line) or not turns:
+            turns.append(line.strip())
+        else:
+            turns[-1] += "\n" + line.strip()
+    return turns
+
+
+def _split_oversized(text: str, max_tokens: int) -> List[str]:
+    """Break a single turn that exceeds the budget at sentence, then word, boundaries"""
+    pieces: List[str] = []
+    current = ""
+    for sentence in SENTENCE_END.split(text):
+        if estimate_tokens(sentence) > max_tokens:
+            # One enormous sentence - fall back to word boundaries
+            words = sentence.split()
+            step = max(1, max_tokens * 4 // 6)  # ~6 chars per word incl. space
+            sub = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            sub = [sentence]
+        for part in sub:
+            candidate = f"{current} {part}".strip()
+            if current and estimate_tokens(candidate) > max_tokens:
+                pieces.append(current)
+                current = part
+            else:
+                current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """Pack speaker turns greedily into chunks of at most max_tokens (estimated)"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for turn in split_turns(transcript):
+        turn_tokens = estimate_tokens(turn)
+        parts = [turn] if turn_tokens <= max_tokens else _split_oversized(turn, max_tokens)
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class Summarizer:
+    """
+    Generates short summaries of conversation transcripts.
+
+    Transcripts that fit in one chunk are summarized with a single prompt.
+    Longer ones are split at speaker-turn boundaries, the chunks are
+    summarized concurrently (map), and the partial summaries are combined
+    into the final 2-3 sentence summary (reduce), so latency grows with
+    chunks / concurrency rather than transcript length.
+
+    In auto mode the local extractive summarizer is used when Gemini is
+    unconfigured, busy, failing, or slower than the latency budget.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        llm_budget: Optional[float] = None
+    ):
+        self.chunk_tokens = chunk_tokens or settings.SUMMARY_CHUNK_TOKENS
+        self.concurrency = concurrency or settings.SUMMARY_MAP_CONCURRENCY
+        self.llm_budget = llm_budget or settings.SUMMARY_LLM_BUDGET_SECONDS
+
+    def _build_prompt(self, transcript: str) -> str:
+        return f"""Please provide a concise summary (2-3 sentences) of this conversation transcript:
+
+{transcript}
+
+Summary:"""
+
+    def _build_chunk_prompt(self, chunk: str, index: int, total: int) -> str:
+        return f"""This is part {index} of {total} of a conversation transcript. Summarize this part in 2-3 sentences, keeping names, facts, preferences and decisions:
+
+{chunk}
+
+Summary:"""
+
+    def _build_reduce_prompt(self, partial_summaries: List[str]) -> str:
+        parts = "\n\n".join(f"Part {i}: {s}" for i, s in enumerate(partial_summaries, start=1))
+        return f"""These are summaries of consecutive parts of one conversation. Combine them into a concise summary (2-3 sentences) of the whole conversation:
+
+{parts}
+
+Summary:"""
+
+    def _clean(self, summary: str) -> str:
+        """Strip echoed prompt text from the model output"""
+        # Clean up summary if it contains extra text
+        if "Summary:" in summary:
+            summary = summary.split("Summary:")[-1].strip()
+        if "summary:" in summary.lower():
+            summary = summary.split("summary:")[-1].strip()
+        return summary
+
+    async def _complete(self, prompt: str) -> str:
+        """Run one summary prompt, raising SummarizationError on upstream failure"""
+        summary_response: Dict[str, Any] = await openai_client.send_message(
+            message=prompt,
+            model=SUMMARY_MODEL,
+            temperature=SUMMARY_TEMPERATURE,
+            # Summaries wait behind live chat when Gemini quota runs short
+            priority=BACKGROUND
+        )
+        if not openai_client.is_configured:
+            raise SummarizationError("Gemini is not configured", summary_response.get("response"))
+        if summary_response.get("error"):
+            raise SummarizationError(summary_response["error"], summary_response.get("response"))
+        return self._clean(summary_response.get("response", "No summary generated"))
+
+    async def _map(self, chunks: List[str]) -> List[str]:
+        """Summarize chunks concurrently, at most self.concurrency at a time"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def summarize_chunk(index: int, chunk: str) -> str:
+            async with semaphore:
+                return await self._complete(self._build_chunk_prompt(chunk, index, len(chunks)))
+
+        return await asyncio.gather(*[
+            summarize_chunk(i, chunk) for i, chunk in enumerate(chunks, start=1)
+        ])
+
+    def _group(self, partial_summaries: List[str]) -> List[List[str]]:
+        """Pack partial summaries into groups that each fit one reduce prompt"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for summary in partial_summaries:
+            tokens = estimate_tokens(summary)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _reduce(self, partial_summaries: List[str]) -> str:
+        """Combine partial summaries, in several rounds if they do not fit one prompt"""
+        while len(partial_summaries) > 1:
+            groups = self._group(partial_summaries)
+            if len(groups) == 1 or len(groups) == len(partial_summaries):
+                break
+            partial_summaries = await asyncio.gather(*[
+                self._complete(self._build_reduce_prompt(group)) for group in groups
+            ])
+        return await self._complete(self._build_reduce_prompt(partial_summaries))
+
+    async def _summarize_llm(self, transcript: str) -> str:
+        """Gemini summary, map-reduced over chunks for long transcripts"""
+        if estimate_tokens(transcript) <= self.chunk_tokens:
+            return await self._complete(self._build_prompt(transcript))
+
+        chunks = chunk_transcript(transcript, self.chunk_tokens)
+        logger.info(f"Summarizing long transcript in {len(chunks)} chunks (concurrency {self.concurrency})")
+        if len(chunks) == 1:
+            return await self._complete(self._build_prompt(chunks[0]))
+        partial_summaries = await self._map(chunks)
+        return await self._reduce(partial_summaries)
+
+    def summarize_extractive(self, transcript: str) -> Dict[str, str]:
+        """Instant local summary - no upstream call"""
+        return {"summary": extractive_summarizer.summarize(transcript), "method": "extractive"}
+
+    async def summarize(self, transcript: str, mode: str = "llm", raise_on_error: bool = False) -> Dict[str, str]:
+        """
+        Summarize a transcript in 2-3 sentences.
+
+        Returns {"summary": ..., "method": "llm" | "extractive"}.
+
+        In llm mode an upstream failure still returns the text Gemini's client
+        produced (the user-facing error message) by default. Background jobs
+        pass raise_on_error=True to get a SummarizationError instead, so they can retry.
+        """
+        if mode == "extractive":
+            return self.summarize_extractive(transcript)
+
+        if mode == "auto":
+            if not openai_client.is_configured:
+                return self.summarize_extractive(transcript)
+            try:
+                summary = await asyncio.wait_for(self._summarize_llm(transcript), timeout=self.llm_budget)
+                return {"summary": summary, "method": "llm"}
+            except (asyncio.TimeoutError, SummarizationError, ExecutorSaturatedError) as e:
+                logger.info(f"Gemini summary unavailable ({type(e).__name__}: {e}), using extractive summary")
+                return self.summarize_extractive(transcript)
+
+        try:
+            return {"summary": await self._summarize_llm(transcript), "method": "llm"}
+        except SummarizationError as e:
+            if raise_on_error:
+                raise
+            return {"summary": e.response_text, "method": "llm"}
+
+
+# Global summarizer instance
+summarizer = Summarizer()
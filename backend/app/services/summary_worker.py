@@ -0,0 +1,241 @@
+"""
+Background worker pool for queued memory summarization
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.sql import Select
+import logging
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Memory, SummaryJob
+from app.services.gemini_executor import ExecutorSaturatedError
+from app.services.openai_client import openai_client
+from app.services.summarizer import summarizer
+from app.services.vector_index import memory_index
+
+logger = logging.getLogger(__name__)
+
+
+def next_job_query(now: datetime) -> Select:
+    """Oldest pending job that is due - failed jobs wait out their backoff (plan-checked by app.query_plans)"""
+    return (
+        select(SummaryJob.id, SummaryJob.memory_id)
+        .where(
+            SummaryJob.status == "pending",
+            or_(SummaryJob.next_attempt_at.is_(None), SummaryJob.next_attempt_at <= now)
+        )
+        .order_by(SummaryJob.id)
+        .limit(1)
+    )
+
+
+class SummaryWorkerPool:
+    """
+    Processes SummaryJob rows in the background.
+
+    Memories saved in async mode start with a provisional extractive
+    summary; the worker replaces it with the Gemini summary.
+
+    Jobs live in the summary_jobs table, so anything still pending (or left
+    running by a crash) is picked up again after a restart. Workers claim a
+    job with a conditional UPDATE, so several workers - or processes - never
+    summarize the same memory twice. A failed job is retried with
+    exponential backoff (retry_base_delay doubling per attempt, up to
+    retry_max_delay) until max_attempts is used up.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retry_base_delay: Optional[float] = None,
+        retry_max_delay: Optional[float] = None
+    ):
+        self.workers = workers or settings.SUMMARY_WORKERS
+        self.poll_interval = poll_interval or settings.SUMMARY_POLL_INTERVAL
+        self.max_attempts = max_attempts or settings.SUMMARY_MAX_ATTEMPTS
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else settings.SUMMARY_RETRY_BASE_DELAY
+        self.retry_max_delay = retry_max_delay if retry_max_delay is not None else settings.SUMMARY_RETRY_MAX_DELAY
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._completed = 0
+        self._failed = 0
+
+    async def start(self) -> None:
+        """Requeue interrupted jobs and start the worker tasks"""
+        recovered = await self._recover_interrupted()
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted summary jobs")
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker_loop(i)))
+        logger.info(f"Started {self.workers} summary workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; in-progress jobs are requeued on next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a new job is enqueued"""
+        self._wakeup.set()
+
+    async def _recover_interrupted(self) -> int:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(SummaryJob)
+                .where(SummaryJob.status == "running")
+                .values(status="pending")
+            )
+            await db.commit()
+            return result.rowcount
+
+    async def _worker_loop(self, worker_id: int) -> None:
+        while True:
+            try:
+                claimed = await self._claim_next()
+                if claimed is None:
+                    await self._wait_for_work()
+                    continue
+                await self._process(*claimed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Summary worker {worker_id} error: {e}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _claim_next(self) -> Optional[Tuple[int, int, str]]:
+        """Atomically move the oldest due pending job to running; returns (job_id, memory_id, transcript)"""
+        async with AsyncSessionLocal() as db:
+            while True:
+                job = (await db.execute(next_job_query(datetime.now(timezone.utc)))).first()
+                if not job:
+                    return None
+
+                claimed = await db.execute(
+                    update(SummaryJob)
+                    .where(SummaryJob.id == job.id, SummaryJob.status == "pending")
+                    .values(status="running", attempts=SummaryJob.attempts + 1)
+                )
+                await db.commit()
+                if claimed.rowcount:
+                    transcript = await db.scalar(select(Memory.transcript).where(Memory.id == job.memory_id))
+                    return job.id, job.memory_id, transcript or ""
+                # Another worker won the race - try the next job
+
+    async def _process(self, job_id: int, memory_id: int, transcript: str) -> None:
+        if not openai_client.is_configured:
+            # Nothing to upgrade to - keep the provisional extractive summary
+            await self._finish(job_id, note="Gemini not configured - kept extractive summary")
+            return
+        try:
+            result = await summarizer.summarize(transcript, mode="llm", raise_on_error=True)
+        except ExecutorSaturatedError:
+            # Gemini is busy with interactive traffic - requeue without using up an attempt
+            await self._release(job_id)
+            await asyncio.sleep(self.poll_interval)
+            return
+        except Exception as e:
+            logger.warning(f"Summary job {job_id} for memory {memory_id} failed: {e}")
+            await self._finish(job_id, error=str(e))
+            return
+        await self._finish(job_id, summary=result["summary"])
+
+    async def _release(self, job_id: int) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(SummaryJob)
+                .where(SummaryJob.id == job_id)
+                .values(status="pending", attempts=SummaryJob.attempts - 1)
+            )
+            await db.commit()
+
+    async def _finish(
+        self,
+        job_id: int,
+        summary: Optional[str] = None,
+        error: Optional[str] = None,
+        note: Optional[str] = None
+    ) -> None:
+        """Record a job outcome: a new summary, a failure (retried later or failed), or done with a note"""
+        memory_id: Optional[int] = None
+        user_id: Optional[int] = None
+        async with AsyncSessionLocal() as db:
+            try:
+                job = await db.get(SummaryJob, job_id)
+                if not job:
+                    # Memory (and its job) was deleted while summarizing
+                    return
+
+                memory_id = job.memory_id
+                if summary is not None or note is not None:
+                    if summary is not None:
+                        await db.execute(
+                            update(Memory)
+                            .where(Memory.id == job.memory_id)
+                            .values(summary=summary)
+                        )
+                    job.status = "done"
+                    job.error = note
+                    self._completed += 1
+                    if summary is not None:
+                        user_id = await db.scalar(select(Memory.user_id).where(Memory.id == job.memory_id))
+                else:
+                    job.error = error
+                    if job.attempts >= self.max_attempts:
+                        job.status = "failed"
+                        self._failed += 1
+                    else:
+                        job.status = "pending"
+                        job.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay(job.attempts))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+        if summary is not None and user_id is not None:
+            memory_index.upsert(memory_id, user_id, summary)
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next try of a job that has failed attempts times"""
+        return min(self.retry_max_delay, self.retry_base_delay * 2 ** max(0, attempts - 1))
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue depth by job status plus worker counters"""
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(SummaryJob.status, func.count(SummaryJob.id))
+                .group_by(SummaryJob.status)
+            )
+            counts = dict(rows.all())
+            backing_off = await db.scalar(
+                select(func.count(SummaryJob.id))
+                .where(SummaryJob.status == "pending", SummaryJob.next_attempt_at > datetime.now(timezone.utc))
+            )
+
+        return {
+            "pending": counts.get("pending", 0),
+            "pending_retry_backoff": backing_off or 0,
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "workers": self.workers,
+            "workers_alive": sum(1 for t in self._tasks if not t.done()),
+            "completed_since_start": self._completed,
+            "failed_since_start": self._failed
+        }
+
+
+# Global worker pool instance
+summary_worker_pool = SummaryWorkerPool()
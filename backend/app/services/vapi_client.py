@@ -4,10 +4,19 @@ Vapi API client service using HTTP requests
 import httpx
 from typing import Dict, Any, Optional, List
 from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, check, upstream_timeout
+from app.services.endpoint_resolver import vapi_endpoints
+from app.services.http_clients import IDEMPOTENT_METHODS, http_clients, is_upstream_error
+from app.services.resilience import resilience
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Candidate paths per operation, in probe order; the resolver learns which one works
+ASSISTANT_MESSAGE_ENDPOINTS = ["/assistant/message", "/v1/assistant/message"]
+CALL_END_ENDPOINTS = ["/call/{call_id}/end", "/v1/call/{call_id}/end", "/call/phone/{call_id}/end"]
+CALL_STATUS_ENDPOINTS = ["/call/{call_id}", "/v1/call/{call_id}", "/call/phone/{call_id}"]
+
 
 class VapiClient:
     """Async HTTP client for Vapi API"""
@@ -17,6 +26,8 @@ class VapiClient:
         self.assistant_id = settings.VAPI_ASSISTANT_ID.strip() if settings.VAPI_ASSISTANT_ID else ""
         self.base_url = settings.VAPI_BASE_URL.rstrip('/')
         self.timeout = settings.API_TIMEOUT
+        self.endpoints = vapi_endpoints
+        self.resilience = resilience
         
         # Log configuration status (without exposing sensitive data)
         if self.api_key:
@@ -53,39 +64,51 @@ class VapiClient:
     ) -> Dict[str, Any]:
         """Make HTTP request to Vapi API"""
         url = f"{self.base_url}{endpoint}"
+        stage = f"Vapi {method} {endpoint}"
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.request(
+        # Shared keep-alive client, so repeat calls reuse pooled connections
+        client = http_clients.get("vapi")
+        try:
+            # Through the Vapi circuit breaker; reads are retried with backoff
+            response = await self.resilience.call(
+                "vapi",
+                lambda: client.request(
                     method=method,
                     url=url,
                     headers=self.headers,
                     json=data,
-                    params=params
-                )
-                
-                # Log response for debugging
-                logger.debug(f"Vapi API {method} {endpoint}: {response.status_code}")
-                
-                if response.status_code == 404:
-                    error_text = response.text
-                    logger.error(f"Vapi API 404 on {endpoint}: {error_text}")
-                    raise Exception(f"Vapi API endpoint not found (404): {endpoint}. Check if the endpoint is correct or if your API key has access.")
-                
-                response.raise_for_status()
-                return response.json() if response.content else {}
-            except httpx.HTTPStatusError as e:
-                error_detail = {}
-                try:
-                    error_detail = e.response.json() if e.response.content else {"error": str(e)}
-                except:
-                    error_detail = {"error": e.response.text if e.response.content else str(e)}
-                
-                logger.error(f"Vapi API error ({e.response.status_code}): {error_detail}")
-                raise Exception(f"Vapi API error ({e.response.status_code}): {error_detail}")
-            except httpx.RequestError as e:
-                logger.error(f"Vapi API request failed: {str(e)}")
-                raise Exception(f"Request failed: {str(e)}")
+                    params=params,
+                    # Never wait past the request's deadline
+                    timeout=upstream_timeout(self.timeout, stage)
+                ),
+                idempotent=method in IDEMPOTENT_METHODS,
+                failed=is_upstream_error
+            )
+            
+            # Log response for debugging
+            logger.debug(f"Vapi API {method} {endpoint}: {response.status_code}")
+            
+            if response.status_code == 404:
+                error_text = response.text
+                logger.error(f"Vapi API 404 on {endpoint}: {error_text}")
+                raise Exception(f"Vapi API endpoint not found (404): {endpoint}. Check if the endpoint is correct or if your API key has access.")
+            
+            response.raise_for_status()
+            return response.json() if response.content else {}
+        except httpx.HTTPStatusError as e:
+            error_detail = {}
+            try:
+                error_detail = e.response.json() if e.response.content else {"error": str(e)}
+            except:
+                error_detail = {"error": e.response.text if e.response.content else str(e)}
+            
+            logger.error(f"Vapi API error ({e.response.status_code}): {error_detail}")
+            raise Exception(f"Vapi API error ({e.response.status_code}): {error_detail}")
+        except httpx.RequestError as e:
+            # A timeout cut short by the deadline is reported as such
+            check(stage)
+            logger.error(f"Vapi API request failed: {str(e)}")
+            raise Exception(f"Request failed: {str(e)}")
     
     async def send_text_message(
         self,
@@ -118,14 +141,18 @@ class VapiClient:
             # Try different possible endpoints for text messaging
             # Note: Vapi primarily focuses on voice interactions, so text messaging may not be available
             try:
-                response = await self._request("POST", "/assistant/message", data=payload)
-            except Exception as e1:
-                try:
-                    response = await self._request("POST", "/v1/assistant/message", data=payload)
-                except Exception as e2:
-                    # If text messaging isn't supported, return helpful message
-                    logger.warning(f"Text messaging not available via Vapi API. Error: {str(e2)}")
-                    raise Exception("Text messaging is not directly supported by Vapi API. Vapi specializes in voice interactions. Please use the voice chat feature instead, or consider integrating with OpenAI's API directly for text chat functionality.")
+                response = await self.endpoints.call(
+                    "assistant.message",
+                    ASSISTANT_MESSAGE_ENDPOINTS,
+                    lambda endpoint: self._request("POST", endpoint, data=payload)
+                )
+            except DeadlineExceeded:
+                # Out of time - no fallback or mock response, the route answers 504
+                raise
+            except Exception as e:
+                # If text messaging isn't supported, return helpful message
+                logger.warning(f"Text messaging not available via Vapi API. Error: {str(e)}")
+                raise Exception("Text messaging is not directly supported by Vapi API. Vapi specializes in voice interactions. Please use the voice chat feature instead, or consider integrating with OpenAI's API directly for text chat functionality.")
             
             return {
                 "response": response.get("response", response.get("message", response.get("content", "No response available"))),
@@ -133,6 +160,8 @@ class VapiClient:
                 "model": model or "gpt-4",
                 "language": language or "en"
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error sending text message to Vapi: {e}")
             return {
@@ -227,6 +256,9 @@ class VapiClient:
                 "status": response.get("status", "queued"),
                 "websocket_url": response.get("websocketUrl") or response.get("websocket_url") or response.get("websocketURL")
             }
+        except DeadlineExceeded:
+            # Out of time - no fallback or mock response, the route answers 504
+            raise
         except Exception as e:
             logger.error(f"Error starting voice session: {e}")
             import uuid
@@ -249,30 +281,33 @@ class VapiClient:
             }
         
         try:
-            # Try different possible endpoints - start with /call/{id}/end
+            # Known-good endpoint first; the others only if it fails
             try:
-                response = await self._request("POST", f"/call/{session_id}/end", data={})
-            except Exception as e1:
-                try:
-                    response = await self._request("POST", f"/v1/call/{session_id}/end", data={})
-                except Exception as e2:
-                    try:
-                        # Try with /call/phone endpoint
-                        response = await self._request("POST", f"/call/phone/{session_id}/end", data={})
-                    except Exception as e3:
-                        # If all fail, return success anyway for demo purposes
-                        logger.warning(f"Could not stop call via API: {e3}")
-                        return {
-                            "id": session_id,
-                            "status": "stopped",
-                            "message": "Session stopped (endpoint not available)"
-                        }
+                response = await self.endpoints.call(
+                    "call.end",
+                    CALL_END_ENDPOINTS,
+                    lambda endpoint: self._request("POST", endpoint, data={}),
+                    call_id=session_id
+                )
+            except DeadlineExceeded:
+                # Out of time - no fallback or mock response, the route answers 504
+                raise
+            except Exception as e:
+                # If all fail, return success anyway for demo purposes
+                logger.warning(f"Could not stop call via API: {e}")
+                return {
+                    "id": session_id,
+                    "status": "stopped",
+                    "message": "Session stopped (endpoint not available)"
+                }
             
             return {
                 "id": session_id,
                 "status": response.get("status", "ended"),
                 "message": "Session stopped successfully"
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error stopping voice session: {e}")
             # Return success anyway for demo purposes
@@ -294,31 +329,34 @@ class VapiClient:
             }
         
         try:
-            # Try different possible endpoints - start with /call/{id}
+            # Known-good endpoint first, so status polling costs one request
             try:
-                response = await self._request("GET", f"/call/{session_id}")
-            except Exception as e1:
-                try:
-                    response = await self._request("GET", f"/v1/call/{session_id}")
-                except Exception as e2:
-                    try:
-                        # Try with /call/phone endpoint
-                        response = await self._request("GET", f"/call/phone/{session_id}")
-                    except Exception as e3:
-                        # If all fail, return demo status
-                        logger.warning(f"Could not get call status via API: {e3}")
-                        return {
-                            "id": session_id,
-                            "status": "active",
-                            "duration_seconds": 0.0,
-                            "note": "Status unavailable - endpoint not found"
-                        }
+                response = await self.endpoints.call(
+                    "call.status",
+                    CALL_STATUS_ENDPOINTS,
+                    lambda endpoint: self._request("GET", endpoint),
+                    call_id=session_id
+                )
+            except DeadlineExceeded:
+                # Out of time - no fallback or mock response, the route answers 504
+                raise
+            except Exception as e:
+                # If all fail, return demo status
+                logger.warning(f"Could not get call status via API: {e}")
+                return {
+                    "id": session_id,
+                    "status": "active",
+                    "duration_seconds": 0.0,
+                    "note": "Status unavailable - endpoint not found"
+                }
             
             return {
                 "id": session_id,
                 "status": response.get("status", "unknown"),
                 "duration_seconds": response.get("durationSeconds", response.get("duration_seconds", 0.0)) or 0.0
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting voice status: {e}")
             # Return a valid status for demo purposes
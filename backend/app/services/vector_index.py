@@ -0,0 +1,444 @@
+"""
+Memory-mapped vector index over memory summaries
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+import numpy as np
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models import Memory
+from app.services.embeddings import Embedder, embedder as default_embedder
+
+# Exclusive lock on the index directory: fcntl on POSIX, msvcrt on Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# On-disk layout version; an index written in another layout is rebuilt
+INDEX_FORMAT = 2
+
+# Rows reserved when the index is created; capacity doubles when full
+INITIAL_CAPACITY = 1024
+
+# User id written over deleted rows so searches skip them
+TOMBSTONE = -1
+
+# Memories checked (and re-embedded if new or edited) per batch when catching up with the database
+SYNC_BATCH_SIZE = 1000
+
+
+class IndexLockedError(RuntimeError):
+    """Another process has the index directory open"""
+
+
+def content_hash(text: str) -> int:
+    """64-bit fingerprint of the text a vector was embedded from"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class VectorIndex:
+    """
+    Per-user cosine search over L2-normalized float32 embeddings.
+
+    Vectors, memory ids, user ids and content hashes are four flat files in
+    one directory, memory-mapped so the OS page cache holds them rather than
+    the Python heap, with a small meta.json recording the row count. Rows
+    are appended (or overwritten in place when a memory's summary changes);
+    deletes leave a tombstone. The content hash lets sync() and upsert()
+    skip memories whose summary has not changed and re-embed edited ones.
+
+    Changes land in the mapping at once; flushing it and replacing
+    meta.json is batched flush_ms after the first change and done in a
+    worker thread, so saves never wait on the disk. meta.json is replaced
+    last, so a crash only loses the rows past the recorded count, and
+    sync() re-adds them on the next start.
+
+    One process owns the index: open() takes an exclusive lock on the
+    directory, and a second process (e.g. another uvicorn worker) gets
+    IndexLockedError. All other methods are synchronous and meant to be
+    called from the event loop thread, so reads never race a remap while
+    the files grow.
+    """
+
+    def __init__(self, path: str, embedder: Embedder, flush_ms: Optional[int] = None):
+        self.path = path
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.flush_interval = (flush_ms if flush_ms is not None else settings.VECTOR_INDEX_FLUSH_MS) / 1000
+        self.count = 0
+        self.capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        self._users: Optional[np.memmap] = None
+        self._hashes: Optional[np.memmap] = None
+        self._row_of: Dict[int, int] = {}
+        self._lock_file = None
+        # Pending background write, and ordering for meta.json written from several threads
+        self._persist_task: Optional[asyncio.Task] = None
+        self._persist_lock = threading.Lock()
+        self._snapshots = 0
+        self._persisted = 0
+        self._dirty = False
+        self._writes = 0
+        self._unchanged = 0
+        # Bumped whenever a user's rows change, so caches built on search results can tell they are stale
+        self._user_versions: Dict[int, int] = {}
+        self._searches = 0
+        self._upserts = 0
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def is_open(self) -> bool:
+        return self._vectors is not None
+
+    def open(self) -> None:
+        """Lock the directory and map the index files, creating or resetting them if needed"""
+        os.makedirs(self.path, exist_ok=True)
+        self._lock()
+        meta = self._read_meta()
+        if meta and (
+            meta.get("dim") != self.dim
+            or meta.get("embedder") != self.embedder.name
+            or meta.get("format") != INDEX_FORMAT
+        ):
+            logger.warning(
+                f"Vector index at {self.path} was built with {meta.get('embedder')}/{meta.get('dim')} "
+                f"(format {meta.get('format', 1)}), now {self.embedder.name}/{self.dim} "
+                f"(format {INDEX_FORMAT}) - rebuilding"
+            )
+            meta = None
+        if meta is None:
+            self.count, self.capacity = 0, INITIAL_CAPACITY
+            self._map(create=True)
+            self._write_meta()
+        else:
+            self.count, self.capacity = meta["count"], meta["capacity"]
+            self._map(create=False)
+        rows = np.flatnonzero(self._ids[:self.count] != TOMBSTONE)
+        self._row_of = dict(zip(np.asarray(self._ids[rows]).tolist(), rows.tolist()))
+
+    def _lock(self) -> None:
+        lock_file = open(self._file("index.lock"), "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise IndexLockedError(
+                f"Vector index at {self.path} is open in another process; run a single worker "
+                f"or give each process its own VECTOR_INDEX_DIR"
+            ) from None
+        self._lock_file = lock_file
+
+    def _unlock(self) -> None:
+        if self._lock_file is not None:
+            # Closing the file releases the lock on every platform
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._file("meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _meta(self) -> Dict[str, Any]:
+        return {
+            "format": INDEX_FORMAT,
+            "dim": self.dim,
+            "embedder": self.embedder.name,
+            "count": self.count,
+            "capacity": self.capacity
+        }
+
+    def _write_meta(self, meta: Optional[Dict[str, Any]] = None) -> None:
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta or self._meta(), f)
+        os.replace(tmp, self._file("meta.json"))
+
+    def _map(self, create: bool) -> None:
+        mode = "w+" if create else "r+"
+        self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+        self._ids = np.memmap(self._file("ids.i64"), dtype=np.int64, mode=mode, shape=(self.capacity,))
+        self._users = np.memmap(self._file("users.i64"), dtype=np.int64, mode=mode, shape=(self.capacity,))
+        self._hashes = np.memmap(self._file("hashes.i64"), dtype=np.int64, mode=mode, shape=(self.capacity,))
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.flush()
+        self._vectors = self._ids = self._users = self._hashes = None
+        for name, row_bytes in (("vectors.f32", self.dim * 4), ("ids.i64", 8), ("users.i64", 8), ("hashes.i64", 8)):
+            with open(self._file(name), "r+b") as f:
+                f.truncate(capacity * row_bytes)
+        self.capacity = capacity
+        self._map(create=False)
+
+    def flush(self) -> None:
+        if self.is_open:
+            self._flush_arrays(self._arrays())
+
+    def _arrays(self) -> Tuple[np.memmap, ...]:
+        return (self._vectors, self._ids, self._users, self._hashes)
+
+    @staticmethod
+    def _flush_arrays(arrays: Tuple[np.memmap, ...]) -> None:
+        for array in arrays:
+            array.flush()
+
+    def _persist(self, arrays: Tuple[np.memmap, ...], meta: Dict[str, Any], snapshot: int) -> None:
+        """Flush the mapping, then record its row count - from any thread"""
+        with self._persist_lock:
+            if snapshot <= self._persisted:
+                return  # A newer snapshot is already on disk
+            self._flush_arrays(arrays)
+            self._write_meta(meta)
+            self._persisted = snapshot
+            self._writes += 1
+
+    def _snapshot(self) -> Tuple[Tuple[np.memmap, ...], Dict[str, Any], int]:
+        # Taken on the event loop thread, so the row count matches what is already in the mapping
+        self._dirty = False
+        self._snapshots += 1
+        return self._arrays(), self._meta(), self._snapshots
+
+    def _changed(self) -> None:
+        """Persist soon: batched and off the event loop when one is running, right away otherwise"""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._persist(*self._snapshot())
+            return
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_task = loop.create_task(self._persist_later())
+
+    async def _persist_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        if not self.is_open or not self._dirty:
+            return
+        try:
+            await asyncio.to_thread(self._persist, *self._snapshot())
+        except Exception as e:
+            self._dirty = True
+            logger.warning(f"Failed to write vector index at {self.path}: {e}")
+
+    def close(self) -> None:
+        """Write pending changes, unmap the index files and release the lock"""
+        if self._persist_task is not None:
+            self._persist_task.cancel()
+            self._persist_task = None
+        if self.is_open:
+            # Waits for a write already running in a worker thread, then records the final count
+            self._persist(*self._snapshot())
+            self._vectors = self._ids = self._users = self._hashes = None
+        self._unlock()
+
+    def add_vectors(
+        self,
+        memory_ids: Sequence[int],
+        user_ids: Sequence[int],
+        vectors: np.ndarray,
+        hashes: Optional[Sequence[int]] = None
+    ) -> None:
+        """Insert or overwrite rows for precomputed, normalized vectors (hashes: content_hash of each text)"""
+        memory_ids = np.asarray(memory_ids, dtype=np.int64)
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        # Unknown content (0) never matches a real hash, so sync() re-embeds it
+        hashes = np.zeros(len(memory_ids), dtype=np.int64) if hashes is None else np.asarray(hashes, dtype=np.int64)
+
+        # Same memory twice in one batch - keep the last one
+        _, last = np.unique(memory_ids[::-1], return_index=True)
+        if len(last) != len(memory_ids):
+            keep = np.sort(len(memory_ids) - 1 - last)
+            memory_ids, user_ids, vectors, hashes = memory_ids[keep], user_ids[keep], vectors[keep], hashes[keep]
+
+        rows = np.fromiter(
+            (self._row_of.get(memory_id, -1) for memory_id in memory_ids.tolist()),
+            dtype=np.int64,
+            count=len(memory_ids)
+        )
+        existing = rows >= 0
+        if existing.any():
+            self._vectors[rows[existing]] = vectors[existing]
+            self._users[rows[existing]] = user_ids[existing]
+            self._hashes[rows[existing]] = hashes[existing]
+
+        new = ~existing
+        added = int(new.sum())
+        if added:
+            start, end = self.count, self.count + added
+            if end > self.capacity:
+                self._grow(end)
+            self._vectors[start:end] = vectors[new]
+            self._ids[start:end] = memory_ids[new]
+            self._users[start:end] = user_ids[new]
+            self._hashes[start:end] = hashes[new]
+            self._row_of.update(zip(memory_ids[new].tolist(), range(start, end)))
+            self.count = end
+
+        self._changed()
+        self._upserts += len(memory_ids)
+        for user_id in np.unique(user_ids).tolist():
+            self._bump(user_id)
+
+    def _is_current(self, memory_id: int, user_id: int, text_hash: int) -> bool:
+        row = self._row_of.get(memory_id)
+        return row is not None and int(self._hashes[row]) == text_hash and int(self._users[row]) == user_id
+
+    def add(self, items: Sequence[Tuple[int, int, str]]) -> int:
+        """
+        Embed and insert/overwrite (memory_id, user_id, text) items, skipping
+        those already indexed with the same text; returns the number embedded.
+        """
+        hashes = [content_hash(text) for _, _, text in items]
+        fresh = [
+            (item, text_hash) for item, text_hash in zip(items, hashes)
+            if not self._is_current(item[0], item[1], text_hash)
+        ]
+        self._unchanged += len(items) - len(fresh)
+        if not fresh:
+            return 0
+        memory_ids, user_ids, texts = zip(*(item for item, _ in fresh))
+        self.add_vectors(
+            memory_ids, user_ids, self.embedder.embed(list(texts)), [text_hash for _, text_hash in fresh]
+        )
+        return len(fresh)
+
+    def upsert(self, memory_id: int, user_id: int, text: str) -> None:
+        """
+        Index one memory after it is saved or its summary changes (a no-op if
+        the text is unchanged). Failures are logged, not raised - sync()
+        repairs the index on the next start.
+        """
+        if not self.is_open:
+            return
+        try:
+            self.add([(memory_id, user_id, text)])
+        except Exception as e:
+            logger.warning(f"Failed to index memory {memory_id}: {e}")
+
+    def remove(self, memory_id: int) -> None:
+        """Tombstone a deleted memory's row"""
+        if not self.is_open:
+            return
+        row = self._row_of.pop(memory_id, None)
+        if row is not None:
+            self._bump(int(self._users[row]))
+            self._users[row] = TOMBSTONE
+            self._ids[row] = TOMBSTONE
+            self._hashes[row] = 0
+            self._vectors[row] = 0.0
+            self._changed()
+
+    def _bump(self, user_id: int) -> None:
+        self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+
+    def user_version(self, user_id: int) -> int:
+        """Change counter for a user's indexed memories (resets on restart)"""
+        return self._user_versions.get(user_id, 0)
+
+    def search_vector(self, user_id: int, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Top-k (memory_id, cosine score) among one user's rows"""
+        self._searches += 1
+        if not self.is_open:
+            return []
+        rows = np.flatnonzero(self._users[:self.count] == user_id)
+        if not len(rows) or not query.any():
+            return []
+        if len(rows) * 4 > self.count:
+            # Most rows are this user's: one pass over the contiguous map beats gathering a copy
+            scores = (self._vectors[:self.count] @ query)[rows]
+        else:
+            scores = self._vectors[rows] @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self._ids[rows[i]]), float(scores[i])) for i in top]
+
+    def search(self, user_id: int, text: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k memories for a user by cosine similarity to the text's embedding"""
+        return self.search_vector(user_id, self.embedder.embed([text])[0], k)
+
+    async def sync(self, db) -> Dict[str, int]:
+        """
+        Bring the index in line with the memories table: embed memories that
+        are missing or whose summary (content hash) changed, and tombstone
+        rows whose memory is gone. Unchanged memories are only hashed.
+        """
+        db_ids = np.fromiter((await db.scalars(select(Memory.id))).all(), dtype=np.int64)
+        indexed = np.fromiter(self._row_of.keys(), dtype=np.int64, count=len(self._row_of))
+
+        stale = indexed[~np.isin(indexed, db_ids)]
+        for memory_id in stale.tolist():
+            self.remove(memory_id)
+
+        missing = int((~np.isin(db_ids, indexed)).sum())
+        embedded = 0
+        for start in range(0, len(db_ids), SYNC_BATCH_SIZE):
+            batch = db_ids[start:start + SYNC_BATCH_SIZE].tolist()
+            rows = await db.execute(
+                select(Memory.id, Memory.user_id, Memory.summary).where(Memory.id.in_(batch))
+            )
+            embedded += self.add([(row.id, row.user_id, row.summary) for row in rows])
+
+        return {"added": missing, "updated": embedded - missing, "removed": len(stale)}
+
+    async def start(self) -> None:
+        """
+        Open the index and catch up with rows written while it was closed.
+        If another process holds it, semantic search stays off here and
+        chat falls back to recent memories.
+        """
+        try:
+            self.open()
+        except IndexLockedError as e:
+            logger.error(f"{e} - semantic memory search disabled in this process")
+            return
+        async with AsyncSessionLocal() as db:
+            changes = await self.sync(db)
+        logger.info(
+            f"Vector index ready: {len(self._row_of)} memories ({self.embedder.name}, dim {self.dim}); "
+            f"synced +{changes['added']} ~{changes['updated']} -{changes['removed']}"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and counters for health/inspection endpoints"""
+        return {
+            "path": self.path,
+            "embedder": self.embedder.name,
+            "dim": self.dim,
+            "vectors": len(self._row_of),
+            "rows": self.count,
+            "capacity": self.capacity,
+            "bytes_mapped": self.capacity * (self.dim * 4 + 24),
+            "searches": self._searches,
+            "upserts": self._upserts,
+            "unchanged_skipped": self._unchanged,
+            "disk_writes": self._writes,
+            "write_pending": self._dirty
+        }
+
+
+# Global memory vector index instance
+memory_index = VectorIndex(settings.VECTOR_INDEX_DIR, default_embedder)
@@ -4,6 +4,9 @@ Voice cloning service using Vapi API
 import httpx
 from typing import Dict, Any, Optional
 from app.core.config import settings
+from app.core.deadline import check, upstream_timeout
+from app.services.http_clients import http_clients, is_upstream_error
+from app.services.resilience import resilience
 
 
 class VoiceCloneService:
@@ -42,21 +45,29 @@ class VoiceCloneService:
         if description:
             data["description"] = description
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
+        stage = "Vapi voice upload"
+        client = http_clients.get("vapi")
+        try:
+            response = await resilience.call(
+                "vapi",
+                lambda: client.post(
                     url,
                     headers={"Authorization": self.headers["Authorization"]},
                     files=files,
-                    data=data
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                error_detail = e.response.json() if e.response.content else {"error": str(e)}
-                raise Exception(f"Voice upload error: {error_detail}")
-            except httpx.RequestError as e:
-                raise Exception(f"Upload request failed: {str(e)}")
+                    data=data,
+                    timeout=upstream_timeout(self.timeout, stage)
+                ),
+                idempotent=False,
+                failed=is_upstream_error
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            error_detail = e.response.json() if e.response.content else {"error": str(e)}
+            raise Exception(f"Voice upload error: {error_detail}")
+        except httpx.RequestError as e:
+            check(stage)
+            raise Exception(f"Upload request failed: {str(e)}")
     
     async def create_voice_clone(
         self,
@@ -70,41 +81,57 @@ class VoiceCloneService:
         if name:
             payload["name"] = name
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
+        stage = "Vapi voice clone creation"
+        client = http_clients.get("vapi")
+        try:
+            response = await resilience.call(
+                "vapi",
+                lambda: client.post(
                     url,
                     headers={
                         "Authorization": self.headers["Authorization"],
                         "Content-Type": "application/json"
                     },
-                    json=payload
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                error_detail = e.response.json() if e.response.content else {"error": str(e)}
-                raise Exception(f"Voice clone creation error: {error_detail}")
-            except httpx.RequestError as e:
-                raise Exception(f"Clone request failed: {str(e)}")
+                    json=payload,
+                    timeout=upstream_timeout(self.timeout, stage)
+                ),
+                idempotent=False,
+                failed=is_upstream_error
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            error_detail = e.response.json() if e.response.content else {"error": str(e)}
+            raise Exception(f"Voice clone creation error: {error_detail}")
+        except httpx.RequestError as e:
+            check(stage)
+            raise Exception(f"Clone request failed: {str(e)}")
     
     async def get_clone_status(self, clone_id: str) -> Dict[str, Any]:
         """Get the status of a voice clone"""
         url = f"{self.base_url}/v1/voices/{clone_id}"
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.get(
+        stage = "Vapi clone status"
+        client = http_clients.get("vapi")
+        try:
+            response = await resilience.call(
+                "vapi",
+                lambda: client.get(
                     url,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                error_detail = e.response.json() if e.response.content else {"error": str(e)}
-                raise Exception(f"Status check error: {error_detail}")
-            except httpx.RequestError as e:
-                raise Exception(f"Status request failed: {str(e)}")
+                    headers=self.headers,
+                    timeout=upstream_timeout(self.timeout, stage)
+                ),
+                idempotent=True,
+                failed=is_upstream_error
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            error_detail = e.response.json() if e.response.content else {"error": str(e)}
+            raise Exception(f"Status check error: {error_detail}")
+        except httpx.RequestError as e:
+            check(stage)
+            raise Exception(f"Status request failed: {str(e)}")
     
     async def preview_voice(
         self,
@@ -116,23 +143,31 @@ class VoiceCloneService:
         
         payload = {"text": text}
         
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
+        stage = "Vapi voice preview"
+        client = http_clients.get("vapi")
+        try:
+            response = await resilience.call(
+                "vapi",
+                lambda: client.post(
                     url,
                     headers={
                         "Authorization": self.headers["Authorization"],
                         "Content-Type": "application/json"
                     },
-                    json=payload
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                error_detail = e.response.json() if e.response.content else {"error": str(e)}
-                raise Exception(f"Preview error: {error_detail}")
-            except httpx.RequestError as e:
-                raise Exception(f"Preview request failed: {str(e)}")
+                    json=payload,
+                    timeout=upstream_timeout(self.timeout, stage)
+                ),
+                idempotent=False,
+                failed=is_upstream_error
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            error_detail = e.response.json() if e.response.content else {"error": str(e)}
+            raise Exception(f"Preview error: {error_detail}")
+        except httpx.RequestError as e:
+            check(stage)
+            raise Exception(f"Preview request failed: {str(e)}")
 
 
 # Global service instance
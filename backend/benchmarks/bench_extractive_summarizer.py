@@ -0,0 +1,64 @@
+"""
+Benchmark for the local extractive summarizer
+
+Run from the backend directory:
+    python -m benchmarks.bench_extractive_summarizer [--words 10000] [--runs 50]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.services.extractive_summarizer import ExtractiveSummarizer
+
+TOPICS = [
+    "trip", "Paris", "budget", "flight", "hotel", "museum", "dinner", "train", "weather", "passport",
+    "project", "deadline", "meeting", "client", "design", "launch", "review", "database", "server", "bug",
+    "sister", "birthday", "gift", "cake", "party", "weekend", "concert", "tickets", "guitar", "band"
+]
+FILLER = ["I", "think", "we", "should", "maybe", "really", "the", "a", "about", "and", "then", "next", "for", "with"]
+
+
+def make_transcript(words: int, seed: int = 7) -> str:
+    """Synthetic two-speaker transcript of roughly the given word count"""
+    rng = random.Random(seed)
+    lines = []
+    count = 0
+    speakers = ["User", "AI"]
+    while count < words:
+        sentence_count = rng.randint(1, 3)
+        sentences = []
+        for _ in range(sentence_count):
+            length = rng.randint(6, 18)
+            sentence = [rng.choice(TOPICS) if rng.random() < 0.35 else rng.choice(FILLER) for _ in range(length)]
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            count += length
+        lines.append(f"{speakers[len(lines) % 2]}: {' '.join(sentences)}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    transcript = make_transcript(args.words)
+    summarizer = ExtractiveSummarizer()
+    summarizer.summarize(transcript)  # warm up regex and NumPy
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        summary = summarizer.summarize(transcript)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(f"Transcript: {len(transcript.split())} words, {len(transcript)} chars")
+    print(f"Runs: {args.runs}")
+    print(f"median {statistics.median(timings):.2f} ms | p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms | min {timings[0]:.2f} ms")
+    print(f"Summary: {summary[:200]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark for hedged Gemini generation against a simulated slow tail
+
+Run from the backend directory:
+    python -m benchmarks.bench_hedging [--requests 2000] [--stall-rate 0.03] [--budget 0.05]
+
+No API calls: the Gemini model is replaced by a stub that answers in
+10-20 ms, except for --stall-rate of calls that hang for --stall-ms.
+The same request stream is sent with hedging off and on, and the latency
+percentiles, extra upstream calls and hedge counters are compared.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List
+
+from app.services.hedging import HedgePolicy
+from app.services.model_router import ModelRouter
+from app.services.openai_client import openai_client
+from app.services.rate_limiter import GeminiRateLimiter
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """Stands in for a GenerativeModel with a fast body and a rare stall"""
+
+    calls = 0
+    cancelled = 0
+
+    def __init__(self, name: str, stall_rate: float, stall_ms: float):
+        self.name = name
+        self.stall_rate = stall_rate
+        self.stall_ms = stall_ms
+
+    async def generate_content_async(self, prompt: str, generation_config: Dict[str, Any] = None) -> _Response:
+        StubModel.calls += 1
+        stalled = random.random() < self.stall_rate
+        try:
+            await asyncio.sleep(self.stall_ms / 1000 if stalled else random.uniform(0.01, 0.02))
+        except asyncio.CancelledError:
+            StubModel.cancelled += 1
+            raise
+        return _Response(f"reply from {self.name}")
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run(args: argparse.Namespace, hedge: bool) -> None:
+    random.seed(args.seed)
+    StubModel.calls = StubModel.cancelled = 0
+    openai_client.router = ModelRouter(explore_rate=0.0)
+    openai_client.hedging = HedgePolicy(enabled=hedge, budget=args.budget, min_delay_ms=0)
+
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        start = time.perf_counter()
+        await openai_client.send_message(f"message {i}", use_cache=False, coalesce=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    for offset in range(0, args.requests, args.concurrency):
+        await asyncio.gather(*(one(i) for i in range(offset, min(offset + args.concurrency, args.requests))))
+
+    latencies.sort()
+    stats = openai_client.hedging.get_stats()
+    print(
+        f"hedging {'on ' if hedge else 'off'}: "
+        f"p50 {percentile(latencies, 0.5):.0f} ms | p95 {percentile(latencies, 0.95):.0f} ms | "
+        f"p99 {percentile(latencies, 0.99):.0f} ms | max {latencies[-1]:.0f} ms | "
+        f"upstream calls +{(StubModel.calls / args.requests - 1) * 100:.1f}% ({StubModel.cancelled} cancelled)"
+    )
+    if hedge:
+        print(
+            f"  hedged {stats['hedged']} ({stats['hedge_rate'] * 100:.1f}%), hedge wins {stats['hedge_wins']}, "
+            f"primary wins {stats['primary_wins']}, denied by budget {stats['denied_by_budget']}, "
+            f"delay {stats['delay_ms']} ms"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall-ms", type=float, default=1000)
+    parser.add_argument("--budget", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    openai_client.api_key = openai_client.api_key or "bench"
+    openai_client._not_configured_response = lambda *_: None
+    openai_client.registry.candidates = lambda requested: ["models/primary", "models/alternate"]
+    openai_client.registry.get_model = lambda name: StubModel(name, args.stall_rate, args.stall_ms)
+    # Measure hedging alone, without the free-tier quota throttling the stub
+    openai_client.rate_limiter = GeminiRateLimiter(rpm=0, tpm=0)
+
+    await run(args, hedge=False)
+    await run(args, hedge=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Benchmark for full-text memory search (SQLite FTS5)
+
+Run from the backend directory:
+    python -m benchmarks.bench_memory_search [--memories 5000] [--words 800] [--runs 50]
+
+Builds a scratch database in a temp directory; the app database is not touched.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.migrations import run_migrations
+from app.models import Memory, User
+from app.services.memory_search import build_match_query, memory_search
+from benchmarks.bench_extractive_summarizer import make_transcript
+
+QUERIES = ["paris hotel", "budget", "birthday cake", "database server bug", "conc"]
+
+
+def populate(url: str, memories: int, words: int) -> None:
+    engine = create_engine(url)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(id=1, name="Bench", email="bench@example.com"))
+        conn.execute(insert(Memory), [
+            {
+                "user_id": 1,
+                "assistant_id": "bench",
+                "transcript": make_transcript(words, seed=i),
+                "summary": make_transcript(40, seed=-i - 1)
+            }
+            for i in range(memories)
+        ])
+    engine.dispose()
+
+
+async def run(url: str, runs: int, limit: int) -> None:
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1))
+    async with AsyncSession(engine) as db:
+        for query in QUERIES:
+            match = build_match_query(query)
+            await memory_search.search(db, 1, match, limit)  # warm up page cache
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                hits = await memory_search.search(db, 1, match, limit)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(
+                f"{query!r:24} {len(hits):3} hits | median {statistics.median(timings):.2f} ms"
+                f" | p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms"
+            )
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memories", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=800, help="Words per transcript")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        start = time.perf_counter()
+        populate(url, args.memories, args.words)
+        print(f"Indexed {args.memories} memories x {args.words} words in {time.perf_counter() - start:.1f} s")
+        asyncio.run(run(url, args.runs, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark for the memory-mapped vector index
+
+Run from the backend directory:
+    python -m benchmarks.bench_vector_index [--vectors 1000000] [--users 1000] [--runs 50]
+
+Fills a scratch index in a temp directory with random unit vectors (embedding
+a million synthetic summaries would only benchmark the embedder), then times
+per-user top-k queries, a query over one user owning every row, incremental
+appends, and reopening the index from disk.
+"""
+import argparse
+import itertools
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_index import VectorIndex
+from benchmarks.bench_extractive_summarizer import make_transcript
+
+BATCH = 100_000
+
+
+def unit_vectors(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def timed(fn, runs: int) -> str:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return f"median {statistics.median(timings):.2f} ms | p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    embedder = HashingEmbedder(dim=args.dim)
+    summaries = [make_transcript(40, seed=i) for i in range(1000)]
+    start = time.perf_counter()
+    embedder.embed(summaries)
+    print(f"Hashing embedder: {1000 / (time.perf_counter() - start):.0f} summaries/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(tmp, embedder)
+        index.open()
+
+        load_seconds = 0.0
+        for offset in range(0, args.vectors, BATCH):
+            n = min(BATCH, args.vectors - offset)
+            ids = np.arange(offset + 1, offset + n + 1)
+            batch = unit_vectors(rng, n, args.dim)
+            start = time.perf_counter()
+            index.add_vectors(ids, ids % args.users, batch)
+            load_seconds += time.perf_counter() - start
+        print(
+            f"Loaded {args.vectors} x {args.dim} float32 vectors in {load_seconds:.1f} s "
+            f"({index.get_stats()['bytes_mapped'] / 2**20:.0f} MiB mapped)"
+        )
+
+        queries = unit_vectors(rng, args.runs, args.dim)
+        picks = itertools.count()
+
+        def per_user_query():
+            i = next(picks)
+            index.search_vector(i % args.users, queries[i % args.runs], args.k)
+
+        print(f"Per-user top-{args.k} ({args.vectors // args.users} rows/user): " + timed(per_user_query, args.runs))
+
+        appended = iter(range(args.vectors + 1, args.vectors + 1 + args.runs))
+        one = unit_vectors(rng, 1, args.dim)
+        print("Incremental append (1 vector): " + timed(
+            lambda: index.add_vectors([next(appended)], [0], one), args.runs
+        ))
+
+        index._users[:index.count] = 0  # every row belongs to user 0
+        print(f"Single user owning all {index.count} rows, top-{args.k}: " + timed(
+            lambda: index.search_vector(0, queries[0], args.k), max(5, args.runs // 10)
+        ))
+        index.close()
+
+        start = time.perf_counter()
+        reopened = VectorIndex(tmp, embedder)
+        reopened.open()
+        print(f"Reopen from disk: {(time.perf_counter() - start) * 1000:.0f} ms ({reopened.get_stats()['vectors']} vectors)")
+        reopened.close()
+
+
+if __name__ == "__main__":
+    main()